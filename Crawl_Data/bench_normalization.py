@@ -0,0 +1,213 @@
+"""
+Benchmark + correctness cho normalization (giá, rating, số đã bán / đánh giá)
+
+- Corpus: các chuỗi thật gặp trên Lazada, Tiki, CellphoneS, Điện Thoại Vui kèm
+  giá trị mong đợi; script thoát với mã 1 nếu có chuỗi parse sai, nên chạy lại
+  sau mỗi lần sửa pattern trong normalization.py
+- Throughput: normalize_prices / normalize_ratings / normalize_counts trên một
+  list lớn sinh từ corpus, so với cách parse cũ của crawler (findall + import re
+  trong vòng lặp, mỗi item một lần)
+
+Usage:
+    python bench_normalization.py
+    python bench_normalization.py --items 200000 --repeat 5
+    python bench_normalization.py --check-only
+"""
+
+import argparse
+import random
+import statistics
+import sys
+import time
+from typing import Callable, List, Tuple
+
+from normalization import (find_price, find_rating, find_review_count, find_sold_count, normalize_counts,
+                           normalize_prices, normalize_ratings, parse_count, parse_price, parse_rating)
+
+PRICE_CORPUS = [
+    ("29.990.000₫", 29990000),
+    ("29.990.000 ₫", 29990000),
+    ("1,290,000 VND", 1290000),
+    ("18990000.00", 18990000),
+    ("18.990.000,00 đ", 18990000),
+    ("₫ 740.000", 740000),
+    ("Giá: 1.090.000đ", 1090000),
+    ("29.990.000₫ 32.990.000₫", 29990000),
+    ("1290000", 1290000),
+    ("990", 990),
+    ("18990000", 18990000),
+    (18990000, 18990000),
+    (18990000.0, 18990000),
+    ("Liên hệ", 0),
+    ("", 0),
+    (None, 0),
+]
+
+RATING_CORPUS = [
+    ("4.8", 4.8),
+    ("4,5", 4.5),
+    ("4.8/5", 4.8),
+    ("5/5", 5.0),
+    ("4.5 sao", 4.5),
+    ("(120 đánh giá) 4.7", 4.7),
+    ("Rating: 3.9", 3.9),
+    ("4 ★", 4.0),
+    (4.66, 4.66),
+    (7, 0.0),
+    ("Chưa có đánh giá", 0.0),
+    (None, 0.0),
+]
+
+COUNT_CORPUS = [
+    ("1,2k đã bán", 1200),
+    ("1.2K sold", 1200),
+    ("Đã bán 3,4 nghìn", 3400),
+    ("10k+ đã bán", 10000),
+    ("1tr lượt mua", 1000000),
+    ("1.5 triệu", 1500000),
+    ("2.345 đã bán", 2345),
+    ("1,234 sold", 1234),
+    ("(123)", 123),
+    ("12 đánh giá", 12),
+    ("Đã bán 56", 56),
+    ("5 máy", 5),
+    ("128GB", 0),
+    ("1.5GB", 0),
+    ("256GB đã bán 12", 12),
+    (42, 42),
+    ("0", 0),
+    ("", 0),
+    (None, 0),
+]
+
+# Text cả item (không có node riêng cho từng trường)
+TEXT_CORPUS = [
+    (find_price, "iPhone 15 128GB\n18.990.000đ\n21.990.000đ", 18990000),
+    (find_price, "iPhone 15 128GB - Trả góp 0%", None),
+    (find_price, "Giá 1290000", 1290000),
+    (find_rating, "iPhone 15 4.5/5 sao (12 đánh giá)", 4.5),
+    (find_rating, "iPhone 15 128GB", 0.0),
+    (find_review_count, "iPhone 15 4.5/5 sao (12 đánh giá)", 12),
+    (find_review_count, "1,2k review", 1200),
+    (find_sold_count, "iPhone 15 - 1,2k đã bán", 1200),
+    (find_sold_count, "Bán: 50", 50),
+    (find_sold_count, "30 lượt mua", 30),
+    (find_sold_count, "iPhone 15 128GB", 0),
+]
+
+
+def check_corpus() -> List[str]:
+    failures = []
+    for parse, corpus in ((parse_price, PRICE_CORPUS), (parse_rating, RATING_CORPUS), (parse_count, COUNT_CORPUS)):
+        for raw, expected in corpus:
+            got = parse(raw)
+            if got != expected:
+                failures.append(f"{parse.__name__}({raw!r}) = {got!r}, mong đợi {expected!r}")
+    for find, text, expected in TEXT_CORPUS:
+        got = find(text)
+        if got != expected:
+            failures.append(f"{find.__name__}({text!r}) = {got!r}, mong đợi {expected!r}")
+
+    # batch API phải cho cùng kết quả với parse từng giá trị
+    for batch, parse, corpus in ((normalize_prices, parse_price, PRICE_CORPUS),
+                                 (normalize_ratings, parse_rating, RATING_CORPUS),
+                                 (normalize_counts, parse_count, COUNT_CORPUS)):
+        values = [raw for raw, _ in corpus] * 2
+        if batch(values) != [parse(v) for v in values]:
+            failures.append(f"{batch.__name__} khác với {parse.__name__} từng giá trị")
+    return failures
+
+
+# ----------------------------------------------------------------------
+# Cách parse cũ (trước normalization.py), giữ lại làm mốc so sánh
+# ----------------------------------------------------------------------
+def legacy_price(price) -> int:
+    if isinstance(price, str):
+        import re
+        price_numbers = re.findall(r'[\d,\.]+', price.replace('₫', '').replace('đ', ''))
+        if price_numbers:
+            try:
+                return int(price_numbers[0].replace(',', '').replace('.', ''))
+            except (ValueError, IndexError):
+                return 0
+        return 0
+    return price or 0
+
+
+def legacy_rating(text) -> float:
+    import re
+    match = re.search(r'(\d+\.?\d*)', str(text or ''))
+    if match:
+        rating = float(match.group(1))
+        if 0 <= rating <= 5:
+            return rating
+    return 0.0
+
+
+def legacy_count(text) -> int:
+    import re
+    match = re.search(r'(\d+)', str(text or ''))
+    return int(match.group(1)) if match else 0
+
+
+def sample_values(corpus: List[Tuple], items: int, seed: int = 0) -> List:
+    """List `items` giá trị: chuỗi trong corpus cộng biến thể số để tỉ lệ trùng gần với trang thật"""
+    rng = random.Random(seed)
+    raws = [raw for raw, _ in corpus]
+    values = []
+    for i in range(items):
+        raw = rng.choice(raws)
+        if isinstance(raw, str) and rng.random() < 0.5:
+            raw = f"{rng.randint(1, 999)}.{rng.randint(0, 999):03d}.000₫" if corpus is PRICE_CORPUS else f"{rng.randint(1, 999)} {raw}"
+        values.append(raw)
+    return values
+
+
+def time_call(fn: Callable[[], List], repeat: int) -> float:
+    fn()
+    samples = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn()
+        samples.append(time.perf_counter() - started)
+    return statistics.median(samples)
+
+
+def bench(items: int, repeat: int) -> List[Tuple[str, float, float]]:
+    rows = []
+    for name, corpus, legacy, batch in (
+        ("price", PRICE_CORPUS, legacy_price, normalize_prices),
+        ("rating", RATING_CORPUS, legacy_rating, normalize_ratings),
+        ("count", COUNT_CORPUS, legacy_count, normalize_counts),
+    ):
+        values = sample_values(corpus, items)
+        legacy_s = time_call(lambda: [legacy(v) for v in values], repeat)
+        batch_s = time_call(lambda: batch(values), repeat)
+        rows.append((name, items / legacy_s, items / batch_s))
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Kiểm tra corpus và đo throughput của normalization")
+    parser.add_argument("--items", type=int, default=100000, help="Số giá trị mỗi lần đo")
+    parser.add_argument("--repeat", type=int, default=5, help="Số lần đo mỗi biến thể")
+    parser.add_argument("--check-only", action="store_true", help="Chỉ kiểm tra corpus")
+    args = parser.parse_args()
+
+    failures = check_corpus()
+    total = len(PRICE_CORPUS) + len(RATING_CORPUS) + len(COUNT_CORPUS) + len(TEXT_CORPUS)
+    print(f"Corpus: {total - len(failures)}/{total} ok")
+    for failure in failures:
+        print(f"  SAI: {failure}")
+    if failures:
+        sys.exit(1)
+    if args.check_only:
+        return
+
+    print(f"\n{'field':<8} {'legacy items/s':>16} {'batch items/s':>16} {'speedup':>8}  (items={args.items})")
+    for name, legacy_rate, batch_rate in bench(args.items, args.repeat):
+        print(f"{name:<8} {legacy_rate:>16,.0f} {batch_rate:>16,.0f} {batch_rate / legacy_rate:>7.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,207 @@
+"""
+Benchmark HTML parser - so sánh tốc độ các backend của html_parser
+
+Đo trên HTML đã lưu (fixtures) của Lazada và trang listing theo selector
+trong shops_example.json:
+  - lazada legacy: BeautifulSoup + get_product_info_json (6 lần select toàn trang)
+  - lazada <backend>: LazadaCrawler.extract_products (một lượt duyệt card)
+  - listing <backend>: crawl_iphones.parse_listing
+Kết quả của mỗi backend được so với bản BeautifulSoup để bắt lệch.
+
+Fixtures: Crawl_Data/fixtures/lazada*.html và tiki*.html. Nếu chưa có file nào
+thì dùng trang tổng hợp (synthetic) cùng cấu trúc selector, được ghi rõ trong
+kết quả; số liệu đó chỉ để so sánh tương đối giữa các backend.
+
+Usage:
+    python bench_parsers.py
+    python bench_parsers.py --repeat 50 --fixtures ./fixtures
+    python bench_parsers.py --capture lazada "iphone 15"   # lưu HTML đã render (cần Chrome)
+    python bench_parsers.py --capture tiki "iphone 15"
+"""
+
+import argparse
+import glob
+import json
+import os
+import statistics
+import time
+from typing import Callable, Dict, List, Tuple
+from urllib.parse import quote_plus
+
+from html_parser import available_backends
+
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+DEFAULT_FIXTURES_DIR = os.path.join(SCRIPT_DIR, "fixtures")
+DEFAULT_SHOPS_FILE = os.path.join(os.path.dirname(SCRIPT_DIR), "shops_example.json")
+
+TIKI_SEARCH_URL = "https://tiki.vn/search?q={query}"
+
+
+# ----------------------------------------------------------------------
+# Fixtures
+# ----------------------------------------------------------------------
+def synthetic_lazada_page(cards: int = 40) -> str:
+    """Trang danh sách giả lập theo đúng selector Lazada mà crawler dùng"""
+    items = []
+    for i in range(cards):
+        items.append(f"""
+<div class="Bm3ON" data-qa-locator="product-item">
+  <div class="Ms6aG"><div class="picture-wrapper"><img src="//img.lazcdn.com/p/{i}.jpg" alt=""></div></div>
+  <div class="buTCk">
+    <div class="RfADt"><a href="//www.lazada.vn/products/iphone-15-{i}.html" title="Apple iPhone 15 128GB bản {i}">Apple iPhone 15 128GB bản {i}</a></div>
+    <div class="aBrP0"><span class="ooOxS">{18_990_000 + i * 1000:,} ₫</span></div>
+    <div class="WNoq3"><span class="IcOsH">-{i % 30}%</span></div>
+    <div class="qzqFw"><span class="_9-ogB">4.{i % 10}</span><span class="_1cEkb">({i * 3 + 1})</span></div>
+    <div class="_6uN7R"><span class="_1cEkb">{i * 7} Đã bán</span><span class="oa6ri">Hồ Chí Minh</span></div>
+  </div>
+  <script>window.__track__ && window.__track__({i});</script>
+</div>""")
+    return f"""<!DOCTYPE html><html><head><meta charset="utf-8"><title>iphone 15 | Lazada.vn</title></head>
+<body><div class="_17mcb">{''.join(items)}</div></body></html>"""
+
+
+def synthetic_listing_page(selectors: Dict[str, str], cards: int = 40) -> str:
+    """Trang listing giả lập khớp các selector đơn giản dạng `tag.class` trong shops_example.json"""
+    def _tag(selector: str, default_tag: str, attrs: str, body: str) -> str:
+        selector = (selector or default_tag).split()[-1]
+        tag, _, cls = selector.partition(".")
+        tag = tag or default_tag
+        return f'<{tag} class="{cls}" {attrs}>{body}</{tag}>'
+
+    items = []
+    for i in range(cards):
+        title = _tag(selectors.get("title"), "span", "", f"iPhone 15 Pro Max {i}")
+        price = _tag(selectors.get("price"), "span", "", f"{29_990_000 + i:,}đ")
+        link = _tag(selectors.get("link"), "a", f'href="/iphone-15-{i}.html"', "Xem")
+        items.append(_tag(selectors.get("list"), "div", "", title + price + link))
+    return f"<html><body><div class=\"listing\">{''.join(items)}</div></body></html>"
+
+
+def load_fixtures(directory: str, prefix: str) -> List[Tuple[str, str]]:
+    pages = []
+    for path in sorted(glob.glob(os.path.join(directory, f"{prefix}*.html"))):
+        with open(path, "r", encoding="utf-8") as f:
+            pages.append((os.path.basename(path), f.read()))
+    return pages
+
+
+def capture(platform: str, query: str, directory: str) -> str:
+    """Lưu HTML của trang tìm kiếm đầu tiên để dùng làm fixture"""
+    os.makedirs(directory, exist_ok=True)
+    if platform == "lazada":
+        from lazada_crawler_complete import LazadaCrawler
+        crawler = LazadaCrawler()
+        url = crawler.base_url.format(keyword=crawler.filter_keyword(query), page=1)
+        html = crawler.fetch_page_html(url)
+    else:
+        from http_client import http_get
+        html = http_get(TIKI_SEARCH_URL.format(query=quote_plus(query))).text
+
+    path = os.path.join(directory, f"{platform}_{'_'.join(query.split())}.html")
+    with open(path, "w", encoding="utf-8") as f:
+        f.write(html)
+    print(f"Đã lưu {len(html) / 1024:.0f} KB vào {path}")
+    return path
+
+
+# ----------------------------------------------------------------------
+# Benchmark
+# ----------------------------------------------------------------------
+def time_call(fn: Callable[[], List[Dict]], repeat: int) -> Tuple[float, List[Dict]]:
+    """Median thời gian (ms) của fn qua `repeat` lần chạy, cùng kết quả lần cuối"""
+    result = fn()  # warm-up: import backend, biên dịch selector
+    samples = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        result = fn()
+        samples.append((time.perf_counter() - started) * 1000)
+    return statistics.median(samples), result
+
+
+def _comparable(products: List[Dict]) -> List[Dict]:
+    """Bỏ các trường phụ thuộc thời điểm chạy trước khi so kết quả"""
+    return [{k: v for k, v in p.items() if k not in ("id", "timestamp")} for p in products]
+
+
+def bench_lazada(pages: List[Tuple[str, str]], backends: List[str], repeat: int) -> List[Dict]:
+    from bs4 import BeautifulSoup
+    from lazada_crawler_complete import LazadaCrawler
+
+    crawler = LazadaCrawler()
+    rows = []
+    for fixture, html in pages:
+        legacy_ms, legacy = time_call(
+            lambda: crawler.get_product_info_json(BeautifulSoup(html, "html.parser")), repeat)
+        rows.append({"fixture": fixture, "variant": "legacy bs4", "ms": legacy_ms,
+                     "items": len(legacy), "speedup": 1.0, "match": True})
+        for backend in backends:
+            ms, products = time_call(lambda: crawler.extract_products(html, backend), repeat)
+            rows.append({"fixture": fixture, "variant": f"single-pass {backend}", "ms": ms,
+                         "items": len(products), "speedup": legacy_ms / ms if ms else 0.0,
+                         "match": _comparable(products) == _comparable(legacy)})
+    return rows
+
+
+def bench_listing(pages: List[Tuple[str, str]], selectors: Dict[str, str],
+                  backends: List[str], repeat: int) -> List[Dict]:
+    from crawl_iphones import parse_listing
+
+    rows = []
+    for fixture, html in pages:
+        # bs4 (html.parser) là cách parse_listing làm trước đây nên dùng làm mốc
+        baseline_ms, baseline = time_call(lambda: parse_listing(html, selectors, "https://tiki.vn/", "bs4"), repeat)
+        for backend in backends:
+            ms, items = time_call(lambda: parse_listing(html, selectors, "https://tiki.vn/", backend), repeat)
+            rows.append({"fixture": fixture, "variant": f"parse_listing {backend}", "ms": ms,
+                         "items": len(items), "speedup": baseline_ms / ms if ms else 0.0,
+                         "match": items == baseline})
+    return rows
+
+
+def print_rows(title: str, rows: List[Dict]):
+    print(f"\n{title}")
+    print(f"{'fixture':<28} {'variant':<24} {'ms/page':>9} {'items':>6} {'speedup':>8}  match")
+    for row in rows:
+        print(f"{row['fixture'][:28]:<28} {row['variant']:<24} {row['ms']:>9.2f} {row['items']:>6} "
+              f"{row['speedup']:>7.1f}x  {'ok' if row['match'] else 'KHÁC'}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="So sánh tốc độ các backend parse HTML")
+    parser.add_argument("--fixtures", default=DEFAULT_FIXTURES_DIR, help="Thư mục chứa lazada*.html / tiki*.html")
+    parser.add_argument("--shops-file", default=DEFAULT_SHOPS_FILE, help="Lấy selector listing của shop 'tiki'")
+    parser.add_argument("--repeat", type=int, default=20, help="Số lần đo mỗi biến thể")
+    parser.add_argument("--backends", default=",".join(available_backends()),
+                        help="Danh sách backend, vd. selectolax,lxml,bs4")
+    parser.add_argument("--capture", nargs=2, metavar=("PLATFORM", "QUERY"),
+                        help="Lưu HTML (lazada|tiki) cho QUERY vào thư mục fixtures rồi thoát")
+    args = parser.parse_args()
+
+    if args.capture:
+        platform, query = args.capture
+        if platform not in ("lazada", "tiki"):
+            parser.error("PLATFORM phải là lazada hoặc tiki")
+        capture(platform, query, args.fixtures)
+        return
+
+    backends = [b.strip() for b in args.backends.split(",") if b.strip()]
+    print(f"Backends: {', '.join(backends)} (repeat={args.repeat})")
+
+    lazada_pages = load_fixtures(args.fixtures, "lazada")
+    if not lazada_pages:
+        print(f"Không có fixture Lazada trong {args.fixtures}, dùng trang synthetic")
+        lazada_pages = [("synthetic (lazada)", synthetic_lazada_page())]
+    print_rows("Lazada: legacy vs single-pass", bench_lazada(lazada_pages, backends, args.repeat))
+
+    with open(args.shops_file, "r", encoding="utf-8") as f:
+        selectors = json.load(f).get("tiki", {}).get("selectors", {})
+    tiki_pages = load_fixtures(args.fixtures, "tiki")
+    if not tiki_pages:
+        print(f"\nKhông có fixture Tiki trong {args.fixtures}, dùng trang synthetic")
+        tiki_pages = [("synthetic (listing)", synthetic_listing_page(selectors))]
+    print_rows("Listing (shops_example.json: tiki)",
+               bench_listing(tiki_pages, selectors, backends, args.repeat))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,276 @@
+"""
+Browser Pool - Chromium dùng chung cho các Playwright scraper
+
+Giữ sẵn N Chromium (async Playwright) đã khởi động và cấp cho mỗi crawl một
+BrowserContext mới, cô lập (cookie/cache riêng). Browser được recycle sau một
+số trang đã phục vụ hoặc khi bộ nhớ (RSS) tăng quá ngưỡng so với lúc khởi động,
+nên latency của crawl chỉ còn là thời gian tải trang chứ không phải thời gian
+spawn process.
+
+Usage:
+    pool = BrowserPool(size=2)
+    await pool.start()
+    async with pool.context() as context:
+        page = await context.new_page()
+        ...
+    await pool.close()
+"""
+
+import asyncio
+import os
+import time
+from contextlib import asynccontextmanager
+from typing import Dict, List, Optional
+
+
+BROWSER_POOL_SIZE = int(os.getenv("CRAWL_BROWSER_POOL_SIZE", "2"))
+BROWSER_MAX_CONTEXTS = int(os.getenv("CRAWL_BROWSER_MAX_CONTEXTS", "4"))
+BROWSER_MAX_PAGES = int(os.getenv("CRAWL_BROWSER_MAX_PAGES", "200"))
+BROWSER_MAX_MEMORY_GROWTH_MB = float(os.getenv("CRAWL_BROWSER_MAX_MEMORY_GROWTH_MB", "512"))
+
+LAUNCH_ARGS = ["--disable-dev-shm-usage", "--no-sandbox"]
+
+
+def _pid_rss_bytes(pid: int) -> Optional[int]:
+    """RSS của một process; dùng psutil nếu có, nếu không đọc /proc (Linux)"""
+    try:
+        import psutil
+        return psutil.Process(pid).memory_info().rss
+    except ImportError:
+        pass
+    except Exception:
+        return None
+    try:
+        with open(f"/proc/{pid}/statm") as f:
+            resident_pages = int(f.read().split()[1])
+        return resident_pages * os.sysconf("SC_PAGE_SIZE")
+    except Exception:
+        return None
+
+
+class _PooledBrowser:
+    def __init__(self, browser, slot: int):
+        self.browser = browser
+        self.slot = slot
+        self.launched_at = time.time()
+        self.active_contexts = 0
+        self.pages_served = 0
+        self.baseline_rss: Optional[int] = None
+        self.last_rss: Optional[int] = None
+        self.retiring = False
+
+
+class BrowserPool:
+    """Pool các Chromium đã khởi động sẵn, cấp BrowserContext riêng cho mỗi crawl"""
+
+    def __init__(
+        self,
+        size: int = BROWSER_POOL_SIZE,
+        max_contexts_per_browser: int = BROWSER_MAX_CONTEXTS,
+        max_pages_per_browser: int = BROWSER_MAX_PAGES,
+        max_memory_growth_mb: float = BROWSER_MAX_MEMORY_GROWTH_MB,
+        headless: bool = True,
+    ):
+        self.size = max(1, size)
+        self.max_contexts_per_browser = max(1, max_contexts_per_browser)
+        self.max_pages_per_browser = max_pages_per_browser
+        self.max_memory_growth_bytes = int(max_memory_growth_mb * 1024 * 1024) if max_memory_growth_mb else 0
+        self.headless = headless
+        self._playwright = None
+        self._browsers: List[_PooledBrowser] = []
+        self._cond: Optional[asyncio.Condition] = None
+        self._started = False
+        self._closed = False
+        self._recycled = 0
+        self._launches = 0
+
+    async def start(self):
+        """Khởi động Playwright và pre-warm đủ `size` browser"""
+        if self._cond is None:
+            self._cond = asyncio.Condition()
+        async with self._cond:
+            if self._closed:
+                raise RuntimeError("BrowserPool đã đóng")
+            if self._started:
+                return
+            from playwright.async_api import async_playwright
+            self._playwright = await async_playwright().start()
+            launched = await asyncio.gather(*(self._launch(slot) for slot in range(self.size)),
+                                            return_exceptions=True)
+            errors = [r for r in launched if isinstance(r, BaseException)]
+            if errors:
+                # Không để lại Chromium / driver process của Playwright khi khởi động lỗi
+                for pooled in launched:
+                    if not isinstance(pooled, BaseException):
+                        try:
+                            await pooled.browser.close()
+                        except Exception:
+                            pass
+                try:
+                    await self._playwright.stop()
+                except Exception:
+                    pass
+                self._playwright = None
+                raise errors[0]
+            self._browsers = list(launched)
+            self._started = True
+            print(f"Browser pool sẵn sàng với {len(self._browsers)} Chromium")
+
+    async def _launch(self, slot: int) -> _PooledBrowser:
+        browser = await self._playwright.chromium.launch(headless=self.headless, args=LAUNCH_ARGS)
+        self._launches += 1
+        pooled = _PooledBrowser(browser, slot)
+        pooled.baseline_rss = await self._browser_rss(browser)
+        pooled.last_rss = pooled.baseline_rss
+        return pooled
+
+    async def _browser_rss(self, browser) -> Optional[int]:
+        """Tổng RSS của các process thuộc browser (lấy pid qua CDP SystemInfo)"""
+        try:
+            cdp = await browser.new_browser_cdp_session()
+            try:
+                info = await cdp.send("SystemInfo.getProcessInfo")
+            finally:
+                await cdp.detach()
+        except Exception:
+            return None
+        total = 0
+        for proc in info.get("processInfo", []):
+            rss = _pid_rss_bytes(proc.get("id"))
+            if rss is None:
+                return None
+            total += rss
+        return total
+
+    def _pick(self) -> Optional[_PooledBrowser]:
+        candidates = [
+            b for b in self._browsers
+            if not b.retiring and b.browser.is_connected()
+            and b.active_contexts < self.max_contexts_per_browser
+        ]
+        if not candidates:
+            return None
+        return min(candidates, key=lambda b: b.active_contexts)
+
+    def _free_slot(self) -> int:
+        used = {b.slot for b in self._browsers}
+        slot = 0
+        while slot in used:
+            slot += 1
+        return slot
+
+    @asynccontextmanager
+    async def context(self, **context_options):
+        """Cấp một BrowserContext mới trên browser ít tải nhất; đóng context khi xong"""
+        if self._closed:
+            raise RuntimeError("BrowserPool đã đóng")
+        if not self._started:
+            await self.start()
+
+        async with self._cond:
+            pooled = self._pick()
+            while pooled is None:
+                # Bù lại slot của browser đã crash hoặc khởi động lại thất bại
+                self._browsers = [
+                    b for b in self._browsers
+                    if b.browser.is_connected() or b.active_contexts
+                ]
+                if len(self._browsers) < self.size:
+                    self._browsers.append(await self._launch(self._free_slot()))
+                else:
+                    await self._cond.wait()
+                pooled = self._pick()
+            pooled.active_contexts += 1
+
+        context = None
+        try:
+            context = await pooled.browser.new_context(**context_options)
+
+            def _count_page(_page, pooled=pooled):
+                pooled.pages_served += 1
+
+            context.on("page", _count_page)
+            yield context
+        finally:
+            if context is not None:
+                try:
+                    await context.close()
+                except Exception:
+                    pass
+            await self._release(pooled)
+
+    async def _release(self, pooled: _PooledBrowser):
+        if not pooled.retiring and await self._should_recycle(pooled):
+            pooled.retiring = True
+        async with self._cond:
+            pooled.active_contexts -= 1
+            replace = pooled.retiring and pooled.active_contexts == 0 and not self._closed
+            self._cond.notify_all()
+        if replace:
+            await self._recycle(pooled)
+
+    async def _should_recycle(self, pooled: _PooledBrowser) -> bool:
+        if not pooled.browser.is_connected():
+            return True
+        if self.max_pages_per_browser and pooled.pages_served >= self.max_pages_per_browser:
+            return True
+        if self.max_memory_growth_bytes and pooled.baseline_rss is not None:
+            pooled.last_rss = await self._browser_rss(pooled.browser)
+            if pooled.last_rss is not None and pooled.last_rss - pooled.baseline_rss > self.max_memory_growth_bytes:
+                return True
+        return False
+
+    async def _recycle(self, pooled: _PooledBrowser):
+        """Đóng browser cũ và thay bằng một browser mới ở cùng slot"""
+        try:
+            await pooled.browser.close()
+        except Exception:
+            pass
+        try:
+            fresh = await self._launch(pooled.slot)
+        except Exception as e:
+            print(f"Lỗi khi khởi động lại browser slot {pooled.slot}: {e}")
+            fresh = None
+        async with self._cond:
+            self._browsers = [b for b in self._browsers if b is not pooled]
+            if fresh is not None:
+                self._browsers.append(fresh)
+            self._recycled += 1
+            self._cond.notify_all()
+
+    def stats(self) -> Dict:
+        """Thống kê trạng thái pool cho việc theo dõi"""
+        return {
+            "size": self.size,
+            "launches": self._launches,
+            "recycled": self._recycled,
+            "browsers": [
+                {
+                    "slot": b.slot,
+                    "connected": b.browser.is_connected(),
+                    "active_contexts": b.active_contexts,
+                    "pages_served": b.pages_served,
+                    "uptime_seconds": round(time.time() - b.launched_at, 1),
+                    "rss_mb": round(b.last_rss / (1024 * 1024), 1) if b.last_rss else None,
+                    "retiring": b.retiring,
+                }
+                for b in self._browsers
+            ],
+        }
+
+    async def close(self):
+        """Đóng tất cả browser và dừng Playwright"""
+        self._closed = True
+        for pooled in list(self._browsers):
+            try:
+                await pooled.browser.close()
+            except Exception:
+                pass
+        self._browsers = []
+        if self._playwright is not None:
+            try:
+                await self._playwright.stop()
+            except Exception:
+                pass
+            self._playwright = None
+        self._started = False
@@ -0,0 +1,136 @@
+"""
+Circuit Breaker - ngắt tạm thời platform đang lỗi / chậm
+
+Mỗi platform có một CircuitBreaker:
+  - closed: crawl bình thường, đếm số lần lỗi/timeout liên tiếp
+  - open: sau `failure_threshold` lần lỗi liên tiếp; bỏ qua platform (orchestrator
+    trả về dữ liệu cache) trong `reset_timeout` giây
+  - half_open: hết reset_timeout thì cho đúng một crawl thử; thành công thì đóng
+    lại, lỗi thì mở tiếp
+
+LatencyTracker giữ cửa sổ latency gần nhất để tính p95 cho hedged request.
+"""
+
+import math
+import os
+import threading
+import time
+from collections import deque
+from typing import Dict, Optional
+
+
+BREAKER_FAILURE_THRESHOLD = int(os.getenv("CRAWL_BREAKER_FAILURES", "3"))
+BREAKER_RESET_TIMEOUT = float(os.getenv("CRAWL_BREAKER_RESET_SECONDS", "60"))
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+
+class CircuitOpenError(Exception):
+    """Platform đang bị ngắt bởi circuit breaker"""
+
+
+class CircuitBreaker:
+    def __init__(self, name: str, failure_threshold: int = BREAKER_FAILURE_THRESHOLD,
+                 reset_timeout: float = BREAKER_RESET_TIMEOUT):
+        self.name = name
+        self.failure_threshold = max(1, failure_threshold)
+        self.reset_timeout = reset_timeout
+        self._state = CLOSED
+        self._consecutive_failures = 0
+        self._opened_at: Optional[float] = None
+        self._trial_in_flight = False
+        self._trips = 0
+        self._rejected = 0
+        self._last_error: Optional[str] = None
+        self._lock = threading.Lock()
+
+    @property
+    def state(self) -> str:
+        with self._lock:
+            return self._current_state()
+
+    def _current_state(self) -> str:
+        if self._state == OPEN and time.time() - self._opened_at >= self.reset_timeout:
+            self._state = HALF_OPEN
+            self._trial_in_flight = False
+        return self._state
+
+    def allow_request(self) -> bool:
+        """True nếu được phép crawl; ở half_open chỉ cho một crawl thử"""
+        with self._lock:
+            state = self._current_state()
+            if state == CLOSED:
+                return True
+            if state == HALF_OPEN and not self._trial_in_flight:
+                self._trial_in_flight = True
+                return True
+            self._rejected += 1
+            return False
+
+    def would_allow(self) -> bool:
+        """Như allow_request nhưng không chiếm lượt thử của half_open"""
+        with self._lock:
+            state = self._current_state()
+            return state == CLOSED or (state == HALF_OPEN and not self._trial_in_flight)
+
+    def record_success(self):
+        with self._lock:
+            self._state = CLOSED
+            self._consecutive_failures = 0
+            self._trial_in_flight = False
+
+    def release_trial(self):
+        """Crawl bị hủy (không thành công cũng không lỗi): trả lại lượt thử của half_open"""
+        with self._lock:
+            self._trial_in_flight = False
+
+    def record_failure(self, error: Optional[BaseException] = None):
+        with self._lock:
+            self._consecutive_failures += 1
+            if error is not None:
+                self._last_error = f"{type(error).__name__}: {error}"
+            state = self._current_state()
+            if state == HALF_OPEN or self._consecutive_failures >= self.failure_threshold:
+                if state != OPEN:
+                    self._trips += 1
+                    print(f"Circuit breaker {self.name} mở sau {self._consecutive_failures} lỗi liên tiếp")
+                self._state = OPEN
+                self._opened_at = time.time()
+                self._trial_in_flight = False
+
+    def stats(self) -> Dict:
+        with self._lock:
+            state = self._current_state()
+            return {
+                "state": state,
+                "trips": self._trips,
+                "consecutive_failures": self._consecutive_failures,
+                "rejected": self._rejected,
+                "opened_at": self._opened_at if state != CLOSED else None,
+                "last_error": self._last_error,
+            }
+
+
+class LatencyTracker:
+    """Cửa sổ latency (ms) của các crawl thành công gần nhất"""
+
+    def __init__(self, window: int = 100):
+        self._samples = deque(maxlen=window)
+        self._lock = threading.Lock()
+
+    def add(self, latency_ms: float):
+        with self._lock:
+            self._samples.append(latency_ms)
+
+    def __len__(self) -> int:
+        return len(self._samples)
+
+    def percentile(self, pct: float) -> Optional[float]:
+        with self._lock:
+            if not self._samples:
+                return None
+            ordered = sorted(self._samples)
+        index = min(len(ordered) - 1, max(0, math.ceil(pct / 100 * len(ordered)) - 1))
+        return ordered[index]
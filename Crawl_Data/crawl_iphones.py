@@ -1,33 +1,59 @@
 """
-Simple crawler for iPhone listings using requests + BeautifulSoup.
+Simple crawler for iPhone listings using requests + CSS selectors (html_parser:
+selectolax / lxml / BeautifulSoup, chosen with CRAWL_HTML_PARSER).
 Configure shop selectors in `shops_example.json`.
 Outputs CSV or JSON.
 """
 import argparse
 import csv
 import json
+import os
 import time
-from typing import Dict, List
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
 
 import requests
-from bs4 import BeautifulSoup
 from urllib.parse import urljoin
 import re
 
+try:
+    from html_parser import parse_html
+    from http_cache import cache_stats, cached_get
+    from http_client import http_get
+    from rate_limiter import HostRateLimiter, TokenBucket
+    from stream_writers import CHECKPOINT_PAGES, open_writer
+except ImportError:
+    from Crawl_Data.html_parser import parse_html
+    from Crawl_Data.http_cache import cache_stats, cached_get
+    from Crawl_Data.http_client import http_get
+    from Crawl_Data.rate_limiter import HostRateLimiter, TokenBucket
+    from Crawl_Data.stream_writers import CHECKPOINT_PAGES, open_writer
+
 
 HEADERS = {
     "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36"
 }
 
+# --fetch-pages: number of product pages fetched in parallel, and per-host request rate
+DETAIL_CONCURRENCY = int(os.getenv("CRAWL_DETAIL_CONCURRENCY", "4"))
+HOST_RATE_PER_SECOND = float(os.getenv("CRAWL_HOST_RATE_PER_SECOND", "4"))
+
 
-def fetch(url: str, timeout: int = 10) -> requests.Response:
-    resp = requests.get(url, headers=HEADERS, timeout=timeout)
+def fetch(url: str, timeout: int = 10, stream: bool = False) -> requests.Response:
+    if stream:
+        # Body is left unread so a large JSON listing can be parsed straight off
+        # the socket (extract_json_products); the cache stores whole bodies, so skip it
+        resp = http_get(url, headers=HEADERS, timeout=timeout, stream=True)
+        resp.streamed = True
+    else:
+        # Goes through the on-disk HTTP cache so re-crawls revalidate instead of re-downloading
+        resp = cached_get(url, headers=HEADERS, timeout=timeout)
     resp.raise_for_status()
     return resp
 
 
-def parse_listing(html: str, selectors: Dict[str, str], base_url: str = None) -> List[Dict]:
-    soup = BeautifulSoup(html, "html.parser")
+def parse_listing(html: str, selectors: Dict[str, str], base_url: str = None, backend: str = None) -> List[Dict]:
+    soup = parse_html(html, backend)
     items = []
     list_selector = selectors.get("list")
     if not list_selector:
@@ -40,13 +66,13 @@ def parse_listing(html: str, selectors: Dict[str, str], base_url: str = None) ->
             link_el = el.select_one(selectors.get("link", "a"))
             seller_el = el.select_one(selectors.get("seller", ""))
 
-            title = title_el.get_text(strip=True) if title_el else ""
-            price = price_el.get_text(strip=True) if price_el else ""
+            title = title_el.text(strip=True) if title_el else ""
+            price = price_el.text(strip=True) if price_el else ""
             link = link_el.get("href") if link_el else None
             if link and base_url:
                 # make relative links absolute
                 link = urljoin(base_url, link)
-            seller = seller_el.get_text(strip=True) if seller_el else ""
+            seller = seller_el.text(strip=True) if seller_el else ""
             image_el = el.select_one(selectors.get("image", "")) if selectors else None
             image = None
             if image_el:
@@ -77,71 +103,181 @@ def is_json_response(resp: requests.Response) -> bool:
     return text.startswith("{") or text.startswith("[")
 
 
+# Tên key (chữ thường) có thể chứa từng trường của một sản phẩm trong JSON API, theo thứ tự ưu tiên
+JSON_FIELD_KEYS = {
+    "link": ("url", "product_url", "link", "path", "url_path"),
+    "image": ("thumbnail_url", "thumbnail", "image", "image_url", "images"),
+    "title": ("name", "title", "product_name"),
+    "price": ("price", "current_price", "final_price", "list_price"),
+}
+JSON_MAX_DEPTH = int(os.getenv("CRAWL_JSON_MAX_DEPTH", "64"))
+JSON_MAX_NODES = int(os.getenv("CRAWL_JSON_MAX_NODES", "200000"))
+# Response lớn hơn ngưỡng này (theo Content-Length, hoặc không rõ độ dài) được parse
+# dạng stream (ijson) thẳng từ socket khi shop có json_path
+JSON_STREAM_MIN_BYTES = int(float(os.getenv("CRAWL_JSON_STREAM_MIN_MB", "5")) * 1024 * 1024)
+
+
+def _is_price(value) -> bool:
+    return isinstance(value, (int, float)) or (isinstance(value, str) and value.strip().isdigit())
+
+
+class JsonProductExtractor:
+    """
+    Extract product-like dicts (link, image, title, price) from API JSON.
+
+    - json_path ("data", "mods.listItems"...): products are read only from the
+      list at that path, without walking the rest of the payload.
+    - Without a path (or when the path yields nothing) the payload is walked
+      iteratively with an explicit stack, bounded by max_depth / max_nodes, and
+      the path of the list holding the most products is learned for later pages.
+    - The key -> field mapping is memoized per object shape (tuple of keys), so
+      the thousands of items in one response sharing a shape are mapped once.
+    """
+
+    def __init__(self, json_path: str = None, max_depth: int = JSON_MAX_DEPTH, max_nodes: int = JSON_MAX_NODES):
+        self.json_path = json_path or None
+        self.max_depth = max_depth
+        self.max_nodes = max_nodes
+        self._mappings: Dict[tuple, Dict[str, str]] = {}
+
+    def _mapping(self, obj: Dict) -> Dict[str, str]:
+        shape = tuple(obj)
+        mapping = self._mappings.get(shape)
+        if mapping is None:
+            lower = {}
+            for k in shape:
+                if isinstance(k, str):
+                    lower.setdefault(k.lower(), k)
+            mapping = {}
+            for field, candidates in JSON_FIELD_KEYS.items():
+                mapping[field] = tuple(lower[c] for c in candidates if c in lower)
+            self._mappings[shape] = mapping
+        return mapping
+
+    def map_product(self, obj: Dict, base_url: str = None) -> Optional[Dict]:
+        """Product dict for `obj`, or None when it has no usable link"""
+        mapping = self._mapping(obj)
+        link = next((obj[k] for k in mapping["link"] if isinstance(obj[k], str)), None)
+        if not link:
+            return None
+        image = None
+        for k in mapping["image"]:
+            v = obj[k]
+            if isinstance(v, str):
+                image = v
+                break
+            if isinstance(v, list) and v:
+                image = v[0]
+                break
+        title = next((obj[k] for k in mapping["title"] if isinstance(obj[k], str)), None)
+        price = next((obj[k] for k in mapping["price"] if _is_price(obj[k])), None)
+        if base_url:
+            link = urljoin(base_url, link)
+        return {"link": link, "image": image, "title": title, "price": price}
+
+    def _at_path(self, obj, path: str):
+        for key in path.split("."):
+            if not isinstance(obj, dict) or key not in obj:
+                return None
+            obj = obj[key]
+        return obj if isinstance(obj, list) else None
+
+    def _from_items(self, items, base_url: str = None) -> List[Dict]:
+        products = []
+        for item in items:
+            if isinstance(item, dict):
+                product = self.map_product(item, base_url)
+                if product:
+                    products.append(product)
+        return products
+
+    def walk(self, obj, base_url: str = None) -> List[Dict]:
+        """Duyệt toàn bộ JSON bằng stack (pre-order, giữ thứ tự như bản đệ quy cũ)"""
+        products: List[Dict] = []
+        per_list: Dict[tuple, int] = {}
+        stack = [(obj, (), 0)]
+        visited = 0
+        while stack:
+            o, path, depth = stack.pop()
+            visited += 1
+            if visited > self.max_nodes:
+                print(f"  JSON quá lớn, dừng sau {self.max_nodes} node")
+                break
+            if isinstance(o, dict):
+                product = self.map_product(o, base_url)
+                if product:
+                    products.append(product)
+                    if path and isinstance(path[-1], int):
+                        per_list[path[:-1]] = per_list.get(path[:-1], 0) + 1
+                children = list(o.items())
+            elif isinstance(o, list):
+                children = list(enumerate(o))
+            else:
+                continue
+            if depth >= self.max_depth:
+                continue
+            for key, value in reversed(children):
+                if isinstance(value, (dict, list)):
+                    stack.append((value, path + (key,), depth + 1))
+
+        if per_list and not self.json_path:
+            best = max(per_list, key=per_list.get)
+            if best and all(isinstance(k, str) for k in best):
+                self.json_path = ".".join(best)
+                print(f"  Learned JSON path '{self.json_path}' (set \"json_path\" in the shop config to skip discovery)")
+        return products
+
+    def extract(self, obj, base_url: str = None) -> List[Dict]:
+        if self.json_path:
+            items = self._at_path(obj, self.json_path)
+            products = self._from_items(items, base_url) if items else []
+            if products:
+                return products
+        return self.walk(obj, base_url)
+
+    def extract_stream(self, fp, base_url: str = None) -> List[Dict]:
+        """
+        Parse a large response incrementally with ijson, materializing one item
+        of json_path at a time instead of the whole document. Falls back to
+        json.load when ijson isn't installed or the shop has no json_path.
+        """
+        try:
+            import ijson
+        except ImportError:
+            ijson = None
+        if ijson is None or not self.json_path:
+            return self.extract(json.load(fp), base_url)
+        return self._from_items(ijson.items(fp, self.json_path + ".item", use_float=True), base_url)
+
+
 def extract_products_from_json(obj, base_url: str = None) -> List[Dict]:
-    """Recursively search JSON and return product-like dicts with keys link, image, title, price when possible."""
-    products: List[Dict] = []
-
-    def _walk(o):
-        if isinstance(o, dict):
-            # heuristics: if dict looks like a product
-            keys_lower = {k.lower(): v for k, v in o.items()}
-            link = None
-            image = None
-            title = None
-            price = None
-
-            # common url fields
-            for k in ("url", "product_url", "link", "path", "url_path"):
-                if k in keys_lower and isinstance(keys_lower[k], str):
-                    link = keys_lower[k]
-                    break
-
-            # image fields
-            for k in ("thumbnail_url", "thumbnail", "image", "image_url", "images"):
-                if k in keys_lower:
-                    v = keys_lower[k]
-                    if isinstance(v, str):
-                        image = v
-                        break
-                    elif isinstance(v, list) and v:
-                        image = v[0]
-                        break
-
-            # title/price
-            for k in ("name", "title", "product_name"):
-                if k in keys_lower and isinstance(keys_lower[k], str):
-                    title = keys_lower[k]
-                    break
-            for k in ("price", "current_price", "final_price", "list_price"):
-                if k in keys_lower and (isinstance(keys_lower[k], int) or isinstance(keys_lower[k], float) or (isinstance(keys_lower[k], str) and keys_lower[k].strip().isdigit())):
-                    price = keys_lower[k]
-                    break
-
-            if link:
-                # normalize
-                if isinstance(link, str) and base_url:
-                    link = urljoin(base_url, link)
-                products.append({"link": link, "image": image, "title": title, "price": price})
-
-            # continue walking child values for nested products
-            for v in o.values():
-                _walk(v)
-        elif isinstance(o, list):
-            for item in o:
-                _walk(item)
-
-    _walk(obj)
-    return products
-
-
-# Note: extract_products_from_json(obj, base_url) is defined above and used to pull
-# link/image/title/price from typical API JSON shapes. The duplicate/older
-# implementation was removed to avoid confusion.
-
-
-def parse_product_page(html: str, selectors: Dict[str, str], base_url: str = None) -> Dict:
+    """Search JSON and return product-like dicts with keys link, image, title, price when possible."""
+    return JsonProductExtractor().extract(obj, base_url)
+
+
+def extract_json_products(resp: requests.Response, extractor: JsonProductExtractor, base_url: str = None) -> List[Dict]:
+    """
+    Products from a JSON response. A response fetched with fetch(stream=True)
+    whose body is still unread, large (or of unknown length) and whose JSON
+    path is known is parsed incrementally from the socket, so neither the body
+    nor the parsed document is held in memory.
+    """
+    length = resp.headers.get("Content-Length")
+    large = length is None or not length.isdigit() or int(length) >= JSON_STREAM_MIN_BYTES
+    # is_json_response only reads the body when the Content-Type isn't JSON
+    unread = getattr(resp, "streamed", False) and "application/json" in resp.headers.get("Content-Type", "")
+    if extractor.json_path and unread and large:
+        resp.raw.decode_content = True
+        try:
+            return extractor.extract_stream(resp.raw, base_url)
+        finally:
+            resp.close()
+    return extractor.extract(resp.json(), base_url)
+
+
+def parse_product_page(html: str, selectors: Dict[str, str], base_url: str = None, backend: str = None) -> Dict:
     
-    soup = BeautifulSoup(html, "html.parser")
+    soup = parse_html(html, backend)
     # title
     title = ""
     price = ""
@@ -154,15 +290,15 @@ def parse_product_page(html: str, selectors: Dict[str, str], base_url: str = Non
         if title_sel:
             el = soup.select_one(title_sel)
             if el:
-                title = el.get_text(strip=True)
+                title = el.text(strip=True)
         if price_sel:
             el = soup.select_one(price_sel)
             if el:
-                price = el.get_text(strip=True)
+                price = el.text(strip=True)
         if seller_sel:
             el = soup.select_one(seller_sel)
             if el:
-                seller = el.get_text(strip=True)
+                seller = el.text(strip=True)
 
     # fallbacks using meta tags
     if not title:
@@ -177,7 +313,7 @@ def parse_product_page(html: str, selectors: Dict[str, str], base_url: str = Non
             price = meta_price.get("content").strip()
         else:
             # try to find a number with currency nearby
-            txt = soup.get_text(separator=" ")
+            txt = soup.text(separator=" ")
             m = re.search(r"([\d\.,]+)\s*(₫|VND|đ|USD|VNĐ)", txt)
             if m:
                 price = m.group(1) + " " + m.group(2)
@@ -204,73 +340,123 @@ def parse_product_page(html: str, selectors: Dict[str, str], base_url: str = Non
     return {"title": title, "price": price, "link": base_url, "seller": seller, "image": image}
 
 
-def crawl(shop_conf: Dict, pages: int = 1, delay: float = 1.0, query: str = None) -> List[Dict]:
-    results = []
+def page_url(shop_conf: Dict, page: int, query: str = None) -> str:
     base_url = shop_conf.get("url")
-    selectors = shop_conf.get("selectors", {})
-
-    for page in range(1, pages + 1):
-        # Support URLs with named {page} or positional {} placeholders (e.g. API: q={} & page={})
+    # Support URLs with named {page} or positional {} placeholders (e.g. API: q={} & page={})
+    try:
+        return base_url.format(page=page)
+    except (IndexError, KeyError):
+        # fallback to positional formatting
+        q = query or shop_conf.get("query") or "iphone"
         try:
-            url = base_url.format(page=page)
-        except (IndexError, KeyError):
-            # fallback to positional formatting
-            q = query or shop_conf.get("query") or "iphone"
-            try:
-                url = base_url.format(q, page)
-            except Exception:
-                # last resort: try to replace literal tokens
-                url = base_url.replace("{page}", str(page)).replace("{}", str(page)).replace("{q}", q)
+            return base_url.format(q, page)
+        except Exception:
+            # last resort: try to replace literal tokens
+            return base_url.replace("{page}", str(page)).replace("{}", str(page)).replace("{q}", q)
+
+
+def fetch_detail(candidate: Dict, selectors: Dict[str, str], limiter: HostRateLimiter) -> Optional[Dict]:
+    """Fetch and parse one product page; None when it fails"""
+    link = candidate.get("link")
+    if not link:
+        return None
+    try:
+        limiter.acquire(link)
+        p_resp = fetch(link)
+        return parse_product_page(p_resp.text, selectors, base_url=link)
+    except Exception:
+        return None
+
+
+def iter_pages(shop_conf: Dict, pages: int = 1, delay: float = 1.0, query: str = None,
+               concurrency: int = DETAIL_CONCURRENCY, rate_per_second: float = HOST_RATE_PER_SECOND,
+               skip_pages: Iterable[int] = ()) -> Iterator[Tuple[int, List[Dict]]]:
+    """
+    Crawl `pages` listing pages of a shop, yielding (page, items) as each page is done.
+
+    Listing page N+1 is fetched in the background while page N is processed
+    (and its product pages fetched, with fetch_pages). Listing requests are
+    spaced at least `delay` seconds apart; every request also goes through a
+    per-host token bucket of `rate_per_second`, and up to `concurrency`
+    product pages are fetched at once. Pages in `skip_pages` (already saved
+    by a resumed run) are not fetched.
+    """
+    skip = set(skip_pages)
+    todo = [page for page in range(1, pages + 1) if page not in skip]
+    if not todo:
+        return
+    selectors = shop_conf.get("selectors", {})
+    # one extractor per crawl so the learned JSON path and key mappings carry across pages
+    extractor = JsonProductExtractor(shop_conf.get("json_path"))
+    limiter = HostRateLimiter(rate_per_second, burst=max(1, concurrency))
+    listing_bucket = TokenBucket(1.0 / delay, burst=1) if delay > 0 else None
+    fetched = 0
+    started = time.perf_counter()
+
+    def fetch_listing(url: str) -> requests.Response:
+        if listing_bucket:
+            listing_bucket.acquire()
+        limiter.acquire(url)
         print(f"Fetching {url}")
-        resp = fetch(url)
-
-        # If the search endpoint returns JSON (API), try to extract product info directly from JSON
-        if is_json_response(resp):
-            try:
-                j = resp.json()
-                products = extract_products_from_json(j)
-                if products:
+        return fetch(url, stream=bool(shop_conf.get("json_path")))
+
+    with ThreadPoolExecutor(max_workers=1) as listing_pool, \
+            ThreadPoolExecutor(max_workers=max(1, concurrency)) as detail_pool:
+        next_listing = listing_pool.submit(fetch_listing, page_url(shop_conf, todo[0], query))
+        for i, page in enumerate(todo):
+            url = page_url(shop_conf, page, query)
+            resp = next_listing.result()
+            fetched += 1
+            if i + 1 < len(todo):
+                next_listing = listing_pool.submit(fetch_listing, page_url(shop_conf, todo[i + 1], query))
+            page_items = []
+
+            # If the search endpoint returns JSON (API), try to extract product info directly from JSON
+            if is_json_response(resp):
+                try:
+                    products = extract_json_products(resp, extractor, base_url=url)
+                except Exception:
+                    print("  Failed to parse JSON response")
+                    products = []
+                if not products:
+                    print("  No product data found in JSON response")
+                elif shop_conf.get("fetch_pages", False):
+                    # resolve details by fetching product pages in parallel
+                    max_fetch = shop_conf.get("max_fetch", 10)
+                    candidates = [c for c in products if c.get("link")][:max_fetch]
+                    details = detail_pool.map(lambda c: fetch_detail(c, selectors, limiter), candidates)
+                    resolved = []
+                    for c, prod in zip(candidates, details):
+                        if prod is not None:
+                            fetched += 1
+                            resolved.append(prod)
+                        else:
+                            # keep the entry with whatever data we have
+                            resolved.append({"title": c.get("title") or "", "price": c.get("price") or "", "link": c.get("link"), "seller": "", "image": c.get("image")})
+                    print(f"  Extracted {len(resolved)} product candidates from JSON on page {page}")
+                    page_items.extend(resolved)
+                else:
                     # limit products if configured
                     max_products = shop_conf.get("max_products") or 0
                     if max_products:
                         products = products[:max_products]
                     print(f"  Parsed {len(products)} products directly from JSON on page {page}")
-                    results.extend([{**p, "link": urljoin(url, p.get("link") or "")} for p in products])
-                else:
-                    # fallback: try to find product-like entries (with link) in JSON
-                    candidates = extract_products_from_json(j, base_url=url)
-                    if candidates:
-                        fetch_pages = shop_conf.get("fetch_pages", False)
-                        max_fetch = shop_conf.get("max_fetch", 10)
-                        resolved = []
-                        count = 0
-                        for c in candidates:
-                            link = c.get("link")
-                            if fetch_pages and count >= max_fetch:
-                                break
-                            if fetch_pages and link:
-                                try:
-                                    p_resp = fetch(link)
-                                    prod = parse_product_page(p_resp.text, selectors, base_url=link)
-                                    resolved.append(prod)
-                                    count += 1
-                                    time.sleep(0.3)
-                                except Exception:
-                                    # keep the entry with whatever data we have
-                                    resolved.append({"title": c.get("title") or "", "price": c.get("price") or "", "link": link, "seller": "", "image": c.get("image")})
-                            else:
-                                resolved.append({"title": c.get("title") or "", "price": c.get("price") or "", "link": link, "seller": "", "image": c.get("image")})
-                        print(f"  Extracted {len(resolved)} product candidates from JSON on page {page}")
-                        results.extend(resolved)
-                    else:
-                        print("  No product data found in JSON response")
-            except Exception:
-                print("  Failed to parse JSON response")
-        else:
-            items = parse_listing(resp.text, selectors, base_url=url)
-            print(f"  Found {len(items)} items on page {page}")
-            results.extend(items)
-        time.sleep(delay)
+                    page_items.extend(products)
+            else:
+                items = parse_listing(resp.text, selectors, base_url=url)
+                print(f"  Found {len(items)} items on page {page}")
+                page_items.extend(items)
+            yield page, page_items
+
+    elapsed = time.perf_counter() - started
+    print(f"Fetched {fetched} pages in {elapsed:.1f}s ({fetched / elapsed if elapsed else 0:.2f} pages/s)")
+
+
+def crawl(shop_conf: Dict, pages: int = 1, delay: float = 1.0, query: str = None, **kwargs) -> List[Dict]:
+    """Crawl all pages and return every item (see iter_pages for the streaming form)"""
+    results = []
+    for _, items in iter_pages(shop_conf, pages=pages, delay=delay, query=query, **kwargs):
+        results.extend(items)
     return results
 
 
@@ -302,12 +488,16 @@ def main():
     parser.add_argument("shop", help="Shop key from shops config (e.g. shop1)")
     parser.add_argument("--shops-file", default="shops_example.json", help="Path to shops config JSON")
     parser.add_argument("--pages", type=int, default=1, help="Number of pages to crawl")
-    parser.add_argument("--delay", type=float, default=1.0, help="Delay between requests in seconds")
-    parser.add_argument("--out", default="out.csv", help="Output file (json or csv)")
+    parser.add_argument("--delay", type=float, default=1.0, help="Minimum delay between listing page requests in seconds")
+    parser.add_argument("--out", default="out.csv", help="Output file: .csv or .jsonl (streamed, add .gz to compress) or .json")
+    parser.add_argument("--resume", action="store_true", help="Continue an interrupted .csv/.jsonl run, skipping pages already saved")
+    parser.add_argument("--checkpoint-pages", type=int, default=CHECKPOINT_PAGES, help="fsync the output every N pages")
     parser.add_argument("--query", "-q", default=None, help="Search query (used for API-style endpoints)")
     parser.add_argument("--fetch-pages", action="store_true", help="When JSON is returned, fetch product pages to parse details")
     parser.add_argument("--max-products", type=int, default=0, help="Limit products parsed directly from JSON (0 = no limit)")
     parser.add_argument("--max-fetch", type=int, default=10, help="Max number of individual product pages to fetch when --fetch-pages is used")
+    parser.add_argument("--concurrency", type=int, default=DETAIL_CONCURRENCY, help="Product pages fetched in parallel when --fetch-pages is used")
+    parser.add_argument("--rate", type=float, default=HOST_RATE_PER_SECOND, help="Max requests per second to one host (0 = no limit)")
     args = parser.parse_args()
 
     shops = load_shops(args.shops_file)
@@ -325,20 +515,26 @@ def main():
     if args.max_fetch:
         shop_conf["max_fetch"] = args.max_fetch
 
-    items = crawl(shop_conf, pages=args.pages, delay=args.delay, query=args.query)
-
     # If user provided a relative path, save it relative to the script directory
     out_path = args.out
     if not (out_path.startswith("/") or out_path.startswith("\\") or ":" in out_path):
         # relative path -> place next to this script
-        import os
         script_dir = os.path.dirname(os.path.abspath(__file__))
         out_path = os.path.join(script_dir, out_path)
 
+    crawl_kwargs = dict(pages=args.pages, delay=args.delay, query=args.query,
+                        concurrency=args.concurrency, rate_per_second=args.rate)
     if out_path.lower().endswith(":json") or out_path.lower().endswith(".json"):
-        save_json(items, out_path)
+        # a JSON array can only be written once the crawl is over
+        save_json(crawl(shop_conf, **crawl_kwargs), out_path)
     else:
-        save_csv(items, out_path)
+        # CSV / JSONL (optionally .gz) are appended page by page with fsync checkpoints
+        with open_writer(out_path, resume=args.resume, checkpoint_pages=args.checkpoint_pages) as writer:
+            if writer.completed_pages:
+                print(f"Resuming: skipping pages {sorted(writer.completed_pages)} already in {out_path}")
+            for page, items in iter_pages(shop_conf, skip_pages=writer.completed_pages, **crawl_kwargs):
+                writer.write_page(page, items)
+    print(f"HTTP cache: {cache_stats()}")
 
 
 if __name__ == "__main__":
@@ -0,0 +1,573 @@
+"""
+Asyncio Crawl Orchestrator
+Điều phối tất cả crawler trên một event loop dùng chung
+
+Mọi request crawl (kể cả từ nhiều request chat đồng thời) được đưa vào một
+event loop chạy nền duy nhất. Mỗi platform có một ngân sách concurrency toàn
+cục (semaphore), Tiki đi qua một async HTTP client dùng chung, CellphoneS và
+Điện Thoại Vui dùng async Playwright trên browser pool dùng chung (mỗi crawl
+một BrowserContext riêng, xem browser_pool.py). Lazada (Selenium, blocking)
+chạy trong worker thread với driver mượn từ selenium_driver_pool và vẫn bị
+giới hạn bởi semaphore của nó.
+
+Trước mỗi platform là query cache (query_cache.py): hit còn hạn trả về ngay,
+hit đã cũ trả về ngay và được làm mới ở nền, còn các request giống nhau đang
+chạy đồng thời chỉ tạo một lần crawl (single-flight).
+
+Kết quả có thể nhận dần theo từng platform khi xong (crawl_stream / stream)
+thay vì chờ platform chậm nhất.
+
+Danh sách crawler lấy từ crawler_registry: engine (http/playwright/selenium)
+quyết định cách chạy, các crawler cùng cost class (vd. browser) chia chung số
+slot CRAWL_SLOTS_<COST_CLASS>, và platform bị tắt trong bảng platforms được bỏ qua.
+
+Mỗi platform có deadline (CRAWL_DEADLINE_<PLATFORM>, tính từ lúc crawl đã có
+slot, thời gian xếp hàng chờ slot không bị tính) và circuit breaker
+(circuit_breaker.py): breaker mở thì platform bị bỏ qua và dữ liệu cache được
+dùng thay. Với các platform trong CRAWL_HEDGE_PLATFORMS, crawl chạy quá p95
+latency sẽ được chạy song song thêm một lần, lần nào xong trước thì dùng.
+
+Usage:
+    from crawl_orchestrator import get_orchestrator
+    summary = get_orchestrator().run(get_orchestrator().crawl("iPhone 15"))
+"""
+
+import asyncio
+import atexit
+import os
+import queue
+import sys
+import threading
+import time
+from datetime import datetime
+from typing import AsyncIterator, Dict, Iterator, List, Optional, Tuple
+
+from browser_pool import BrowserPool
+from circuit_breaker import CircuitBreaker, CircuitOpenError, LatencyTracker
+from crawler_registry import COST_CLASS_SLOTS, CRAWLERS, CrawlerSpec, disabled_platforms, enabled_crawlers, get_crawler
+from http_client import HTTPX_AVAILABLE, connection_stats, create_async_client
+from crawl_tiki_product import headers as TIKI_HEADERS
+from query_cache import CACHE_ENABLED, MISS, STALE, QueryCache, normalize_query
+from selenium_driver_pool import get_driver_pool
+
+
+# Ngân sách concurrency toàn cục cho từng platform (CRAWL_CONCURRENCY_<PLATFORM>, xem crawler_registry)
+PLATFORM_CONCURRENCY = {key: spec.concurrency for key, spec in CRAWLERS.items()}
+
+# Thời gian tối đa (giây) cho một lần crawl của từng platform
+PLATFORM_DEADLINES = {key: spec.deadline for key, spec in CRAWLERS.items()}
+
+# Platform được phép hedge (vd. "tiki,cellphones"); mặc định tắt
+HEDGE_PLATFORMS = {p.strip() for p in os.getenv("CRAWL_HEDGE_PLATFORMS", "").split(",") if p.strip()}
+HEDGE_PERCENTILE = float(os.getenv("CRAWL_HEDGE_PERCENTILE", "95"))
+# Cần đủ số mẫu latency này trước khi p95 đáng tin để hedge
+HEDGE_MIN_SAMPLES = int(os.getenv("CRAWL_HEDGE_MIN_SAMPLES", "20"))
+
+
+class CrawlDeadlineExceeded(Exception):
+    """Crawl của một platform vượt quá deadline (không tính thời gian chờ slot)"""
+
+
+# (platform key, tên hiển thị) theo thứ tự báo cáo
+PLATFORMS = [(key, spec.display_name) for key, spec in CRAWLERS.items()]
+
+
+class CrawlStream:
+    """Iterator (sync) nhận kết quả từng platform do loop nền đẩy vào ngay khi xong"""
+
+    _DONE = object()
+
+    def __init__(self):
+        self._queue: "queue.Queue" = queue.Queue()
+        self.finished = False
+
+    def _put(self, event: Dict):
+        self._queue.put(event)
+
+    def _close(self):
+        self._queue.put(self._DONE)
+
+    def next(self, timeout: Optional[float] = None) -> Optional[Dict]:
+        """Kết quả platform tiếp theo; None nếu hết `timeout`, StopIteration khi đã xong hết"""
+        if self.finished:
+            raise StopIteration
+        try:
+            item = self._queue.get(timeout=timeout)
+        except queue.Empty:
+            return None
+        if item is self._DONE:
+            self.finished = True
+            raise StopIteration
+        return item
+
+    def __iter__(self) -> Iterator[Dict]:
+        while True:
+            try:
+                yield self.next()
+            except StopIteration:
+                return
+
+
+class CrawlOrchestrator:
+    """Chạy các crawler trên một event loop nền với giới hạn concurrency theo platform"""
+
+    def __init__(self, concurrency: Optional[Dict[str, int]] = None,
+                 cache: Optional[QueryCache] = None,
+                 deadlines: Optional[Dict[str, float]] = None,
+                 hedge_platforms: Optional[set] = None):
+        self.concurrency = dict(PLATFORM_CONCURRENCY)
+        if concurrency:
+            self.concurrency.update(concurrency)
+        self.deadlines = dict(PLATFORM_DEADLINES)
+        if deadlines:
+            self.deadlines.update(deadlines)
+        self.hedge_platforms = set(HEDGE_PLATFORMS if hedge_platforms is None else hedge_platforms)
+        self._breakers = {platform: CircuitBreaker(platform) for platform, _ in PLATFORMS}
+        self._latency = {platform: LatencyTracker() for platform, _ in PLATFORMS}
+        self._hedges: Dict[str, int] = {platform: 0 for platform, _ in PLATFORMS}
+        self._hedge_wins: Dict[str, int] = {platform: 0 for platform, _ in PLATFORMS}
+        self.cache = cache if cache is not None else (QueryCache() if CACHE_ENABLED else None)
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._thread: Optional[threading.Thread] = None
+        self._start_lock = threading.Lock()
+        self.cost_slots = dict(COST_CLASS_SLOTS)
+        # Các object dưới đây chỉ được dùng trên loop thread
+        self._semaphores: Dict[str, asyncio.Semaphore] = {}
+        self._cost_semaphores: Dict[str, Optional[asyncio.Semaphore]] = {}
+        self._cost_in_use: Dict[str, int] = {cost_class: 0 for cost_class in self.cost_slots}
+        self._http_client = None
+        self._browser_pool = BrowserPool()
+        self._inflight: Dict[Tuple[str, str], asyncio.Task] = {}
+        self._background: set = set()
+
+    # ------------------------------------------------------------------
+    # Event loop nền
+    # ------------------------------------------------------------------
+    def _ensure_loop(self) -> asyncio.AbstractEventLoop:
+        with self._start_lock:
+            if self._loop is not None and self._thread is not None and self._thread.is_alive():
+                return self._loop
+
+            # Playwright cần subprocess support; trên Windows phải dùng Proactor loop
+            if sys.platform.startswith("win"):
+                loop = asyncio.ProactorEventLoop()
+            else:
+                loop = asyncio.new_event_loop()
+
+            def _run_loop():
+                asyncio.set_event_loop(loop)
+                loop.run_forever()
+
+            self._loop = loop
+            self._thread = threading.Thread(target=_run_loop, name="crawl-orchestrator", daemon=True)
+            self._thread.start()
+            return loop
+
+    def run(self, coro, timeout: Optional[float] = None):
+        """Chạy coroutine trên loop nền và chờ kết quả (sync wrapper)"""
+        loop = self._ensure_loop()
+        if threading.current_thread() is self._thread:
+            raise RuntimeError("CrawlOrchestrator.run() không được gọi từ chính loop thread; hãy await coroutine")
+        future = asyncio.run_coroutine_threadsafe(coro, loop)
+        return future.result(timeout)
+
+    # ------------------------------------------------------------------
+    # Tài nguyên dùng chung (chỉ gọi trên loop thread)
+    # ------------------------------------------------------------------
+    def _semaphore(self, platform: str) -> asyncio.Semaphore:
+        sem = self._semaphores.get(platform)
+        if sem is None:
+            sem = asyncio.Semaphore(max(1, self.concurrency.get(platform, 1)))
+            self._semaphores[platform] = sem
+        return sem
+
+    def _cost_semaphore(self, cost_class: str) -> Optional[asyncio.Semaphore]:
+        if cost_class not in self._cost_semaphores:
+            slots = self.cost_slots.get(cost_class, 0)
+            self._cost_semaphores[cost_class] = asyncio.Semaphore(slots) if slots > 0 else None
+        return self._cost_semaphores[cost_class]
+
+    async def _get_http_client(self):
+        if self._http_client is None:
+            if not HTTPX_AVAILABLE:
+                return None
+            self._http_client = create_async_client(headers=TIKI_HEADERS)
+        return self._http_client
+
+    def warm_up(self):
+        """Khởi động sẵn browser pool và Chrome driver trên loop nền (không chờ kết quả)"""
+        loop = self._ensure_loop()
+        loop.call_soon_threadsafe(loop.run_in_executor, None, get_driver_pool().warm_up)
+        future = asyncio.run_coroutine_threadsafe(self._browser_pool.start(), loop)
+
+        def _report(fut):
+            if fut.exception() is not None:
+                print(f"Không thể khởi động browser pool: {fut.exception()}")
+
+        future.add_done_callback(_report)
+        return future
+
+    def browser_pool_stats(self) -> Dict:
+        return self._browser_pool.stats()
+
+    def driver_pool_stats(self) -> Dict:
+        return get_driver_pool().stats()
+
+    def http_stats(self) -> Dict:
+        return connection_stats()
+
+    def cache_stats(self) -> Dict:
+        return self.cache.stats() if self.cache is not None else {}
+
+    def registry_stats(self) -> Dict:
+        """Khai báo của từng crawler, trạng thái bật/tắt và số slot cost class đang dùng"""
+        disabled = disabled_platforms()
+        crawlers = {}
+        for key, spec in CRAWLERS.items():
+            data = spec.describe()
+            data["enabled"] = key not in disabled
+            crawlers[key] = data
+        slots = {
+            cost_class: {"slots": limit or None, "in_use": self._cost_in_use.get(cost_class, 0)}
+            for cost_class, limit in self.cost_slots.items()
+        }
+        return {"crawlers": crawlers, "cost_classes": slots}
+
+    def breaker_stats(self) -> Dict:
+        """Trạng thái circuit breaker, p95 latency và số lần hedge của từng platform"""
+        stats = {}
+        for platform, breaker in self._breakers.items():
+            data = breaker.stats()
+            p95 = self._latency[platform].percentile(95)
+            data.update({
+                "deadline_seconds": self.deadlines.get(platform),
+                "latency_samples": len(self._latency[platform]),
+                "p95_ms": round(p95) if p95 is not None else None,
+                "hedging": platform in self.hedge_platforms,
+                "hedges": self._hedges[platform],
+                "hedge_wins": self._hedge_wins[platform],
+            })
+            stats[platform] = data
+        return stats
+
+    # ------------------------------------------------------------------
+    # Crawl từng platform
+    # ------------------------------------------------------------------
+    async def _run_http(self, spec: CrawlerSpec, product_name: str, metrics: Dict) -> List[Dict]:
+        client = await self._get_http_client()
+        return await spec.crawl(product_name, client=client)
+
+    async def _run_selenium(self, spec: CrawlerSpec, product_name: str, metrics: Dict) -> List[Dict]:
+        # Selenium là blocking API nên chạy trong worker thread
+        return await asyncio.to_thread(spec.crawl, product_name, metrics)
+
+    async def _run_playwright(self, spec: CrawlerSpec, product_name: str, metrics: Dict) -> List[Dict]:
+        async with self._browser_pool.context() as context:
+            return await spec.crawl(product_name, context=context, metrics=metrics)
+
+    async def crawl_platform(self, platform: str, product_name: str,
+                             metrics: Optional[Dict] = None) -> List[Dict]:
+        """
+        Crawl một platform trong giới hạn concurrency của nó.
+
+        `metrics` (nếu có) nhận timings của crawl: time_to_first_product_ms và
+        time_to_settle_ms (Playwright scraper tự đo theo page readiness; các
+        platform khác lấy theo thời điểm có kết quả), và với các crawler dùng
+        browser là `resources` (request bị chặn, byte tiết kiệm/đã tải, page load).
+
+        Deadline của platform chỉ bắt đầu khi đã giữ cả slot platform lẫn slot
+        cost class: crawl chỉ đang xếp hàng (tải của chính app) không bị tính
+        là platform lỗi trong circuit breaker. Thời gian chờ slot nằm ở
+        metrics["queue_ms"].
+        """
+        if metrics is None:
+            metrics = {}
+        spec = get_crawler(platform)
+        run_engine = getattr(self, f"_run_{spec.engine}")
+        deadline = self.deadlines.get(platform)
+        queued_at = time.perf_counter()
+        # Giữ slot của platform trước rồi mới tới slot cost class, để crawl đang
+        # chờ platform của nó không chiếm slot browser của platform khác
+        async with self._semaphore(platform):
+            cost_semaphore = self._cost_semaphore(spec.cost_class)
+            if cost_semaphore is not None:
+                await cost_semaphore.acquire()
+            self._cost_in_use[spec.cost_class] = self._cost_in_use.get(spec.cost_class, 0) + 1
+            try:
+                started_at = time.perf_counter()
+                metrics["queue_ms"] = round((started_at - queued_at) * 1000)
+                try:
+                    products = await asyncio.wait_for(run_engine(spec, product_name, metrics), timeout=deadline)
+                except asyncio.TimeoutError as e:
+                    # Lazada chạy trong worker thread nên thread vẫn chạy tới khi Selenium trả về
+                    raise CrawlDeadlineExceeded(f"{platform} vượt quá deadline {deadline:g}s") from e
+                result = spec.normalize(products)
+                elapsed_ms = round((time.perf_counter() - started_at) * 1000)
+            finally:
+                self._cost_in_use[spec.cost_class] -= 1
+                if cost_semaphore is not None:
+                    cost_semaphore.release()
+        metrics["elapsed_ms"] = elapsed_ms
+        if metrics.get("time_to_first_product_ms") is None and result:
+            metrics["time_to_first_product_ms"] = elapsed_ms
+        metrics.setdefault("time_to_settle_ms", elapsed_ms)
+        return result
+
+    def _hedge_delay(self, platform: str) -> Optional[float]:
+        """Số giây chờ trước khi hedge (p95 latency), None nếu không hedge"""
+        if platform not in self.hedge_platforms:
+            return None
+        tracker = self._latency[platform]
+        if len(tracker) < HEDGE_MIN_SAMPLES:
+            return None
+        return tracker.percentile(HEDGE_PERCENTILE) / 1000
+
+    async def _crawl_hedged(self, platform: str, product_name: str, metrics: Dict) -> List[Dict]:
+        hedge_after = self._hedge_delay(platform)
+        if hedge_after is None:
+            return await self.crawl_platform(platform, product_name, metrics)
+
+        primary_metrics: Dict = {}
+        primary = asyncio.ensure_future(self.crawl_platform(platform, product_name, primary_metrics))
+        attempts = {primary: ("primary", primary_metrics)}
+        try:
+            done, _ = await asyncio.wait({primary}, timeout=hedge_after)
+            if not done:
+                hedge_metrics: Dict = {}
+                hedge = asyncio.ensure_future(self.crawl_platform(platform, product_name, hedge_metrics))
+                attempts[hedge] = ("hedge", hedge_metrics)
+                self._hedges[platform] += 1
+                metrics["hedged"] = True
+            pending = set(attempts)
+            error = None
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.exception() is None:
+                        label, attempt_metrics = attempts[task]
+                        metrics.update(attempt_metrics)
+                        if metrics.get("hedged"):
+                            metrics["hedge_winner"] = label
+                            if label == "hedge":
+                                self._hedge_wins[platform] += 1
+                        return task.result()
+                    error = task.exception()
+            raise error
+        finally:
+            for task in attempts:
+                if not task.done():
+                    task.cancel()
+
+    async def _crawl_guarded(self, platform: str, product_name: str, metrics: Dict) -> List[Dict]:
+        """Crawl (deadline áp trong crawl_platform) và cập nhật circuit breaker / latency"""
+        breaker = self._breakers[platform]
+        if not breaker.allow_request():
+            raise CircuitOpenError(f"Circuit breaker của {platform} đang mở")
+        started_at = time.perf_counter()
+        try:
+            result = await self._crawl_hedged(platform, product_name, metrics)
+        except asyncio.CancelledError:
+            # bị hủy giữa chừng (vd. quorum/deadline của crawl_all_platforms_partial):
+            # không tính là lỗi, nhưng lượt thử half_open phải được trả lại
+            breaker.release_trial()
+            raise
+        except Exception as e:
+            # gồm cả CrawlDeadlineExceeded
+            breaker.record_failure(e)
+            raise
+        breaker.record_success()
+        self._latency[platform].add((time.perf_counter() - started_at) * 1000)
+        return result
+
+    async def _crawl_and_store(self, platform: str, product_name: str) -> Tuple[List[Dict], Dict]:
+        metrics: Dict = {}
+        result = await self._crawl_guarded(platform, product_name, metrics)
+        # Kết quả rỗng thường là do trang lỗi/chặn bot nên không cache
+        if result and self.cache is not None:
+            self.cache.put(product_name, platform, result, metrics)
+        return result, metrics
+
+    async def crawl_platform_single_flight(self, platform: str, product_name: str,
+                                           metrics: Optional[Dict] = None) -> List[Dict]:
+        """Crawl platform; các lời gọi trùng (query, platform) khi đang chạy dùng chung một crawl"""
+        key = (normalize_query(product_name), platform)
+        task = self._inflight.get(key)
+        coalesced = task is not None
+        if task is None:
+            task = asyncio.ensure_future(self._crawl_and_store(platform, product_name))
+            self._inflight[key] = task
+            task.add_done_callback(lambda _t, key=key: self._inflight.pop(key, None))
+        # shield: request bị hủy không được hủy crawl mà request khác đang chờ
+        result, crawl_metrics = await asyncio.shield(task)
+        if metrics is not None:
+            metrics.update(crawl_metrics)
+            if coalesced:
+                metrics["coalesced"] = True
+        return list(result)
+
+    def _refresh_in_background(self, platform: str, product_name: str):
+        if (normalize_query(product_name), platform) in self._inflight:
+            return
+        if not self._breakers[platform].would_allow():
+            return
+        task = asyncio.ensure_future(self.crawl_platform_single_flight(platform, product_name))
+        self._background.add(task)
+
+        def _done(fut):
+            self._background.discard(fut)
+            if not fut.cancelled() and fut.exception() is not None:
+                print(f"Lỗi khi làm mới cache {platform} cho '{product_name}': {fut.exception()}")
+
+        task.add_done_callback(_done)
+
+    async def crawl_platform_cached(self, platform: str, product_name: str,
+                                    metrics: Optional[Dict] = None) -> List[Dict]:
+        """
+        Lấy kết quả của platform qua query cache: còn hạn thì trả về ngay, đã cũ
+        thì trả về ngay và làm mới ở nền, không có thì crawl (single-flight).
+        Khi circuit breaker của platform đang mở, trả về entry cache gần nhất
+        bất kể tuổi (nếu có).
+        """
+        if metrics is None:
+            metrics = {}
+        if self.cache is None:
+            return await self.crawl_platform_single_flight(platform, product_name, metrics)
+        state, entry = self.cache.get(product_name, platform)
+        if state == MISS:
+            try:
+                result = await self.crawl_platform_single_flight(platform, product_name, metrics)
+            except CircuitOpenError:
+                entry = self.cache.peek(product_name, platform)
+                if entry is None:
+                    raise
+                metrics["cache"] = "breaker_fallback"
+                metrics["cache_age_seconds"] = round(entry.age(), 1)
+                return list(entry.products)
+            metrics["cache"] = MISS
+            return result
+        metrics["cache"] = state
+        metrics["cache_age_seconds"] = round(entry.age(), 1)
+        if state == STALE:
+            self._refresh_in_background(platform, product_name)
+        return list(entry.products)
+
+    async def _crawl_event(self, platform: str, display_name: str, product_name: str,
+                           use_cache: bool = True) -> Dict:
+        metrics: Dict = {}
+        crawl_func = self.crawl_platform_cached if use_cache else self.crawl_platform_single_flight
+        event = {"platform": platform, "crawler": display_name, "timings": metrics}
+        try:
+            result = await crawl_func(platform, product_name, metrics)
+        except Exception as e:
+            event.update({"count": 0, "products": [], "error": str(e)})
+        else:
+            event.update({"count": len(result), "products": result})
+        return event
+
+    async def crawl_stream(self, product_name: str, use_cache: bool = True) -> AsyncIterator[Dict]:
+        """
+        Chạy tất cả crawler đồng thời và yield kết quả của từng platform ngay khi xong:
+        {"platform", "crawler", "count", "products", "timings"[, "error"]}
+        """
+        crawlers = enabled_crawlers()
+        print(f"Bắt đầu crawl sản phẩm '{product_name}' từ {len(crawlers)} trang web...")
+        skipped = [spec.display_name for spec in CRAWLERS.values() if spec not in crawlers]
+        if skipped:
+            print(f"Bỏ qua (đã tắt trong bảng platforms): {', '.join(skipped)}")
+
+        pending = [
+            self._crawl_event(spec.key, spec.display_name, product_name, use_cache)
+            for spec in crawlers
+        ]
+        for next_done in asyncio.as_completed(pending):
+            event = await next_done
+            crawler_name = event["crawler"]
+            if "error" in event:
+                print(f"Lỗi khi crawl từ {crawler_name}: {event['error']}")
+            else:
+                metrics = event["timings"]
+                cache_note = f" (cache: {metrics['cache']})" if metrics.get("cache", MISS) != MISS else ""
+                print(f"Hoàn thành crawl từ {crawler_name}: {event['count']} sản phẩm{cache_note}")
+            yield event
+
+    def stream(self, product_name: str, use_cache: bool = True) -> CrawlStream:
+        """Bản sync của crawl_stream: trả về CrawlStream nhận kết quả từ loop nền"""
+        loop = self._ensure_loop()
+        result_stream = CrawlStream()
+
+        async def _pump():
+            try:
+                async for event in self.crawl_stream(product_name, use_cache):
+                    result_stream._put(event)
+            finally:
+                result_stream._close()
+
+        asyncio.run_coroutine_threadsafe(_pump(), loop)
+        return result_stream
+
+    async def crawl(self, product_name: str, use_cache: bool = True) -> Dict:
+        """
+        Chạy tất cả crawler đồng thời và tổng hợp kết quả
+        (cùng format với run_all_crawlers_parallel).
+
+        use_cache=False bỏ qua cache khi đọc (vẫn ghi kết quả mới vào cache).
+        """
+        start_time = time.time()
+        all_products = []
+        crawler_results = {}
+
+        async for event in self.crawl_stream(product_name, use_cache):
+            crawler_results[event["crawler"]] = {
+                key: event[key] for key in ("count", "products", "error", "timings") if key in event
+            }
+            all_products.extend(event["products"])
+
+        total_time = time.time() - start_time
+
+        return {
+            "search_query": product_name,
+            "timestamp": datetime.now().isoformat(),
+            "total_products": len(all_products),
+            "execution_time_seconds": round(total_time, 2),
+            "crawler_results": crawler_results,
+            "products": all_products
+        }
+
+    async def aclose(self):
+        """Hủy các lần làm mới cache ở nền, đóng HTTP client và browser pool dùng chung"""
+        for task in list(self._background):
+            task.cancel()
+        if self._http_client is not None:
+            try:
+                await self._http_client.aclose()
+            except Exception:
+                pass
+            self._http_client = None
+        await self._browser_pool.close()
+
+    def shutdown(self, timeout: float = 10.0):
+        """Giải phóng tài nguyên và dừng loop nền"""
+        if self._loop is None or self._thread is None or not self._thread.is_alive():
+            return
+        try:
+            self.run(self.aclose(), timeout=timeout)
+        except Exception as e:
+            print(f"Lỗi khi đóng crawl orchestrator: {e}")
+        if self.cache is not None:
+            self.cache.close()
+        self._loop.call_soon_threadsafe(self._loop.stop)
+        self._thread.join(timeout=timeout)
+
+
+_orchestrator: Optional[CrawlOrchestrator] = None
+_orchestrator_lock = threading.Lock()
+
+
+def get_orchestrator() -> CrawlOrchestrator:
+    """Trả về orchestrator dùng chung cho toàn process"""
+    global _orchestrator
+    with _orchestrator_lock:
+        if _orchestrator is None:
+            _orchestrator = CrawlOrchestrator()
+            atexit.register(_orchestrator.shutdown)
+        return _orchestrator
@@ -1,85 +1,264 @@
-from typing import List, Dict
-import requests
+import asyncio
+import math
+import os
+import re
+from typing import AsyncIterator, List, Dict, Optional
 from datetime import datetime
 
+try:
+    from http_cache import async_cached_get, cached_get
+    from http_client import HTTPX_AVAILABLE, create_async_client
+    from rate_limiter import AsyncTokenBucket
+except ImportError:
+    from Crawl_Data.http_cache import async_cached_get, cached_get
+    from Crawl_Data.http_client import HTTPX_AVAILABLE, create_async_client
+    from Crawl_Data.rate_limiter import AsyncTokenBucket
+
 # Tiki API configuration (copied so this module is independent)
 TIKI_API_URL = "https://tiki.vn/api/v2/products"
 headers = {
     "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36"
 }
 
-def crawl_tiki_product(product_name: str) -> List[Dict]:
-    """
-    Crawl product information from Tiki API and process it directly
-    Returns a list of processed products ready for vector database and analysis
-    """
+# Deep crawl (phân trang) cho việc xây catalog
+TIKI_PAGE_SIZE = int(os.getenv("CRAWL_TIKI_PAGE_SIZE", "40"))
+TIKI_PAGE_CONCURRENCY = int(os.getenv("CRAWL_TIKI_PAGE_CONCURRENCY", "4"))
+TIKI_RATE_PER_SECOND = float(os.getenv("CRAWL_TIKI_RATE_PER_SECOND", "5"))
+# Sản phẩm phải chứa ít nhất tỉ lệ này số từ của query mới được coi là liên quan
+TIKI_MIN_RELEVANCE = float(os.getenv("CRAWL_TIKI_MIN_RELEVANCE", "0.5"))
+# Dừng phân trang khi tỉ lệ sản phẩm liên quan của một trang thấp hơn ngưỡng này
+TIKI_STOP_RATIO = float(os.getenv("CRAWL_TIKI_STOP_RATIO", "0.2"))
+
+_TOKEN_RE = re.compile(r"\w+", re.UNICODE)
+
+def _parse_tiki_products(data: Dict, start_index: int = 1, verbose: bool = True) -> List[Dict]:
+    """Chuẩn hóa JSON trả về từ Tiki API thành list dict sản phẩm"""
+    products = []
+    current_time = datetime.now().isoformat()
+
+    for idx, item in enumerate(data.get("data", []), start_index):
+        # Skip invalid or incomplete products
+        required_fields = ["name", "price", "url_path"]
+        if not all(item.get(field) for field in required_fields):
+            continue
+
+        # Process price information
+        current_price = item.get('price', 0)
+        original_price = item.get('original_price', current_price)
+        discount_rate = item.get('discount_rate', 0)
+
+        # Process seller information
+        seller_info = item.get("seller", {})
+        seller_name = seller_info.get("name", item.get("seller_name", "Unknown Seller"))
+
+        # Create unique product ID
+        product_id = f"tiki_{int(datetime.now().timestamp())}_{idx}"
+
+        # Build product information dictionary
+        product = {
+            "id": product_id,  # Add unique ID
+            "name": item.get("name").strip(),
+            "price": current_price,
+            "original_price": original_price,
+            "discount": f"-{discount_rate}%" if discount_rate > 0 else "Không giảm giá",
+            "seller": seller_name,
+            "rating": f"{item.get('rating_average', 0):.1f}",
+            "review_count": item.get("review_count", 0),
+            "url": f"https://tiki.vn/{item.get('url_path')}",
+            "timestamp": current_time,
+            "platform": "tiki"
+        }
+
+        # Add badges and promotions if available
+        badges = item.get("badge", {})
+        if badges:
+            product["badges"] = [badge.get("text", "") for badge in badges if badge.get("text")]
+
+        # Add shipping info if available
+        if item.get("shipping_text"):
+            product["shipping"] = item.get("shipping_text")
+
+        products.append(product)
+
+    if not verbose:
+        return products
+    if products:
+        print(f"Tìm thấy {len(products)} sản phẩm phù hợp trên Tiki")
+    else:
+        print("Không tìm thấy sản phẩm nào phù hợp trên Tiki")
+    return products
+
+
+def _search_params(product_name: str, limit: int = 5, page: Optional[int] = None) -> Dict:
     params = {
         "q": product_name,
-        "limit": 5,  # Increased for better coverage
+        "limit": limit,  # Increased for better coverage
         "sort": "score,price,asc",  # Sort by relevance and price
         "aggregations": 1
     }
-    
+    if page is not None:
+        params["page"] = page
+    return params
+
+
+def _tokens(text: str) -> set:
+    return set(_TOKEN_RE.findall(text.casefold()))
+
+
+def _relevance(query_tokens: set, name: str) -> float:
+    """Tỉ lệ từ của query xuất hiện trong tên sản phẩm"""
+    if not query_tokens:
+        return 1.0
+    return len(query_tokens & _tokens(name)) / len(query_tokens)
+
+
+def crawl_tiki_product(product_name: str) -> List[Dict]:
+    """
+    Crawl product information from Tiki API and process it directly
+    Returns a list of processed products ready for vector database and analysis
+    """
+    params = _search_params(product_name)
+
     try:
-        response = requests.get(TIKI_API_URL, headers=headers, params=params)
+        response = cached_get(TIKI_API_URL, params=params, headers=headers)
         if response.status_code == 200:
-            data = response.json()
-            products = []
-            current_time = datetime.now().isoformat()
-            
-            for idx, item in enumerate(data.get("data", []), 1):
-                # Skip invalid or incomplete products
-                required_fields = ["name", "price", "url_path"]
-                if not all(item.get(field) for field in required_fields):
-                    continue
-                
-                # Process price information
-                current_price = item.get('price', 0)
-                original_price = item.get('original_price', current_price)
-                discount_rate = item.get('discount_rate', 0)
-                
-                # Process seller information
-                seller_info = item.get("seller", {})
-                seller_name = seller_info.get("name", item.get("seller_name", "Unknown Seller"))
-                
-                # Create unique product ID
-                product_id = f"tiki_{int(datetime.now().timestamp())}_{idx}"
-                
-                # Build product information dictionary
-                product = {
-                    "id": product_id,  # Add unique ID
-                    "name": item.get("name").strip(),
-                    "price": current_price,
-                    "original_price": original_price,
-                    "discount": f"-{discount_rate}%" if discount_rate > 0 else "Không giảm giá",
-                    "seller": seller_name,
-                    "rating": f"{item.get('rating_average', 0):.1f}",
-                    "review_count": item.get("review_count", 0),
-                    "url": f"https://tiki.vn/{item.get('url_path')}",
-                    "timestamp": current_time,
-                    "platform": "tiki"
-                }
-                
-                # Add badges and promotions if available
-                badges = item.get("badge", {})
-                if badges:
-                    product["badges"] = [badge.get("text", "") for badge in badges if badge.get("text")]
-                    
-                # Add shipping info if available
-                if item.get("shipping_text"):
-                    product["shipping"] = item.get("shipping_text")
-                
-                products.append(product)
-            
-            if products:
-                print(f"Tìm thấy {len(products)} sản phẩm phù hợp trên Tiki")
-                return products
-            else:
-                print("Không tìm thấy sản phẩm nào phù hợp trên Tiki")
-                return []
+            return _parse_tiki_products(response.json())
 
         print(f"Tiki API trả về mã lỗi {response.status_code}")
         return []
     except Exception as e:
         print(f"Lỗi khi crawl dữ liệu từ Tiki: {e}")
         return []
+
+
+async def crawl_tiki_product_async(product_name: str, client=None) -> List[Dict]:
+    """
+    Async variant of crawl_tiki_product for the asyncio crawl orchestrator.
+
+    Uses a pooled httpx.AsyncClient (shared `client` when given, see
+    http_client.create_async_client) so the request runs on the caller's event
+    loop, through the on-disk HTTP cache (http_cache). Falls back to the blocking crawler in a worker thread when httpx
+    isn't installed.
+
+    Unlike crawl_tiki_product, errors (including non-2xx responses) are raised
+    so the orchestrator's circuit breaker counts them.
+    """
+    if not HTTPX_AVAILABLE:
+        return await asyncio.to_thread(crawl_tiki_product, product_name)
+
+    params = _search_params(product_name)
+    try:
+        if client is None:
+            async with create_async_client(headers=headers) as own_client:
+                response = await async_cached_get(own_client, TIKI_API_URL, params=params)
+        else:
+            response = await async_cached_get(client, TIKI_API_URL, params=params, headers=headers)
+        if response.status_code == 200:
+            return _parse_tiki_products(response.json())
+
+        print(f"Tiki API trả về mã lỗi {response.status_code}")
+        response.raise_for_status()
+        return []
+    except Exception as e:
+        print(f"Lỗi khi crawl dữ liệu từ Tiki: {e}")
+        raise
+
+
+async def iter_tiki_products_async(product_name: str, max_results: int = 200,
+                                   page_size: int = TIKI_PAGE_SIZE,
+                                   concurrency: int = TIKI_PAGE_CONCURRENCY,
+                                   rate_per_second: float = TIKI_RATE_PER_SECOND,
+                                   client=None) -> AsyncIterator[Dict]:
+    """
+    Deep crawl Tiki: yield từng sản phẩm (cùng schema với crawl_tiki_product)
+    qua nhiều trang kết quả.
+
+    Trang 1 cho biết tổng số trang; các trang sau được tải song song theo từng
+    đợt `concurrency` trang, trong giới hạn `rate_per_second` request/giây.
+    Sản phẩm được yield theo thứ tự trang; việc phân trang dừng khi trang hiện
+    tại có quá ít sản phẩm liên quan tới query (kết quả đã xếp theo score).
+    """
+    own_client = client is None
+    if own_client:
+        client = create_async_client(headers=headers)
+    bucket = AsyncTokenBucket(rate_per_second, burst=max(1, concurrency))
+    query_tokens = _tokens(product_name)
+
+    async def _fetch_page(page: int) -> Dict:
+        await bucket.acquire()
+        response = await async_cached_get(client, TIKI_API_URL, headers=headers,
+                                          params=_search_params(product_name, limit=page_size, page=page))
+        if response.status_code != 200:
+            print(f"Tiki API trả về mã lỗi {response.status_code} (trang {page})")
+            return {}
+        return response.json()
+
+    def _relevant_products(data: Dict, page: int):
+        products = _parse_tiki_products(data, start_index=(page - 1) * page_size + 1, verbose=False)
+        relevant = [p for p in products if _relevance(query_tokens, p["name"]) >= TIKI_MIN_RELEVANCE]
+        keep_going = bool(products) and len(relevant) / len(products) >= TIKI_STOP_RATIO
+        return relevant, keep_going
+
+    yielded = 0
+    try:
+        first = await _fetch_page(1)
+        paging = first.get("paging") or {}
+        last_page = paging.get("last_page") or 1
+        last_page = min(last_page, max(1, math.ceil(max_results / page_size)))
+
+        relevant, keep_going = _relevant_products(first, 1)
+        for product in relevant[:max_results]:
+            yield product
+            yielded += 1
+
+        next_page = 2
+        while keep_going and yielded < max_results and next_page <= last_page:
+            pages = list(range(next_page, min(last_page, next_page + concurrency - 1) + 1))
+            next_page = pages[-1] + 1
+            results = await asyncio.gather(*(_fetch_page(page) for page in pages), return_exceptions=True)
+            for page, data in zip(pages, results):
+                if isinstance(data, Exception):
+                    print(f"Lỗi khi tải trang {page} từ Tiki: {data}")
+                    keep_going = False
+                    break
+                relevant, keep_going = _relevant_products(data, page)
+                for product in relevant[:max_results - yielded]:
+                    yield product
+                    yielded += 1
+                if not keep_going or yielded >= max_results:
+                    break
+    finally:
+        if own_client:
+            await client.aclose()
+
+
+async def crawl_tiki_products_deep_async(product_name: str, max_results: int = 200, **kwargs) -> List[Dict]:
+    return [product async for product in iter_tiki_products_async(product_name, max_results, **kwargs)]
+
+
+def crawl_tiki_products_deep(product_name: str, max_results: int = 200, **kwargs) -> List[Dict]:
+    """Bản sync của iter_tiki_products_async, trả về list sản phẩm"""
+    products = asyncio.run(crawl_tiki_products_deep_async(product_name, max_results, **kwargs))
+    print(f"Tìm thấy {len(products)} sản phẩm phù hợp trên Tiki (deep crawl)")
+    return products
+
+
+def main():
+    import argparse
+    import json
+
+    parser = argparse.ArgumentParser(description="Crawl sản phẩm từ Tiki API")
+    parser.add_argument("query", help="Tên sản phẩm cần tìm")
+    parser.add_argument("--max-results", type=int, default=5,
+                        help="Số sản phẩm tối đa; lớn hơn 5 sẽ phân trang song song")
+    args = parser.parse_args()
+
+    if args.max_results > 5:
+        products = crawl_tiki_products_deep(args.query, args.max_results)
+    else:
+        products = crawl_tiki_product(args.query)
+    print(json.dumps(products, ensure_ascii=False, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,211 @@
+"""
+Crawler Registry - khai báo các crawler thay vì hard-code trong orchestrator
+
+Mỗi platform khai báo một CrawlerSpec:
+  - engine: http (async HTTP client dùng chung), playwright (BrowserContext từ
+    browser pool) hoặc selenium (blocking, chạy trong worker thread)
+  - cost_class: light / browser; các crawler cùng cost class chia chung số slot
+    (CRAWL_SLOTS_<COST_CLASS>, vd. chỉ 3 crawl dùng browser chạy cùng lúc)
+  - concurrency, deadline, cache_ttl mặc định (override bằng biến môi trường)
+  - crawl / sync_crawl / normalizer dạng "module:function", chỉ import khi dùng
+    nên module này nhẹ (query_cache đọc TTL từ đây mà không kéo theo Selenium)
+
+Platform có thể bật/tắt trong bảng `platforms` của backend (status khác
+'active' là tắt) mà không cần sửa code; platform không có trong bảng vẫn bật.
+
+Usage:
+    from crawler_registry import enabled_crawlers
+    for spec in enabled_crawlers():
+        print(spec.key, spec.engine, spec.cost_class)
+"""
+
+import importlib
+import os
+import re
+import sqlite3
+import threading
+import time
+import unicodedata
+from typing import Callable, Dict, List, Optional, Set
+from urllib.parse import urlparse
+
+ENGINE_HTTP = "http"
+ENGINE_PLAYWRIGHT = "playwright"
+ENGINE_SELENIUM = "selenium"
+
+COST_LIGHT = "light"
+COST_BROWSER = "browser"
+
+# Số crawl đồng thời tối đa cho mỗi cost class (0 = không giới hạn)
+COST_CLASS_SLOTS = {
+    COST_LIGHT: int(os.getenv("CRAWL_SLOTS_LIGHT", "0")),
+    COST_BROWSER: int(os.getenv("CRAWL_SLOTS_BROWSER", "3")),
+}
+
+# Bảng platforms của backend (cùng DB_PATH với backend/config.py)
+PLATFORMS_DB_PATH = os.getenv("CRAWL_PLATFORMS_DB", os.getenv("DB_PATH", "chatbot_database.db"))
+PLATFORMS_REFRESH_SECONDS = float(os.getenv("CRAWL_PLATFORMS_REFRESH_SECONDS", "30"))
+
+
+def _env_number(name: str, default: float, cast=float):
+    return cast(os.getenv(name, str(default)))
+
+
+class CrawlerSpec:
+    """Khai báo một crawler; các callable được import lười qua đường dẫn "module:function" """
+
+    def __init__(self, key: str, display_name: str, engine: str, cost_class: str,
+                 crawl: str, sync_crawl: str, domain: str,
+                 concurrency: int = 1, deadline: float = 20.0, cache_ttl: float = 1800.0,
+                 normalizer: str = "normalization:normalize_products"):
+        env_key = key.upper()
+        self.key = key
+        self.display_name = display_name
+        self.engine = engine
+        self.cost_class = cost_class
+        self.domain = domain
+        self.concurrency = _env_number(f"CRAWL_CONCURRENCY_{env_key}", concurrency, int)
+        self.deadline = _env_number(f"CRAWL_DEADLINE_{env_key}", deadline)
+        self.cache_ttl = _env_number(f"CRAWL_CACHE_TTL_{env_key}", cache_ttl)
+        self._paths = {"crawl": crawl, "sync_crawl": sync_crawl, "normalizer": normalizer}
+        self._resolved: Dict[str, Callable] = {}
+
+    def _resolve(self, name: str) -> Callable:
+        func = self._resolved.get(name)
+        if func is None:
+            module_name, _, attr = self._paths[name].partition(":")
+            try:
+                module = importlib.import_module(module_name)
+            except ImportError:
+                module = importlib.import_module(f"Crawl_Data.{module_name}")
+            func = self._resolved[name] = getattr(module, attr)
+        return func
+
+    @property
+    def crawl(self) -> Callable:
+        """Hàm async, chữ ký tùy engine (xem CrawlOrchestrator._run_<engine>)"""
+        return self._resolve("crawl")
+
+    @property
+    def sync_crawl(self) -> Callable:
+        """Hàm blocking crawl(product_name) -> List[Dict], dùng khi không có event loop"""
+        return self._resolve("sync_crawl")
+
+    def normalize(self, products: List[Dict]) -> List[Dict]:
+        """Chuẩn hóa cả list sản phẩm một lượt: normalizer(products, platform) -> products"""
+        return self._resolve("normalizer")(products, self.key)
+
+    def describe(self) -> Dict:
+        return {
+            "display_name": self.display_name,
+            "engine": self.engine,
+            "cost_class": self.cost_class,
+            "concurrency": self.concurrency,
+            "deadline_seconds": self.deadline,
+            "cache_ttl_seconds": self.cache_ttl,
+        }
+
+
+def crawl_lazada(product_name: str, metrics: Optional[Dict] = None) -> List[Dict]:
+    from lazada_crawler_complete import LazadaCrawler
+    # lỗi được raise: orchestrator đếm vào circuit breaker, run_crawler trả về list rỗng
+    return LazadaCrawler().crawl_lazada_products(product_name, metrics, raise_errors=True)
+
+
+# Theo thứ tự báo cáo
+CRAWLERS: Dict[str, CrawlerSpec] = {}
+
+
+def register(spec: CrawlerSpec) -> CrawlerSpec:
+    """Thêm (hoặc thay) một crawler trong registry"""
+    CRAWLERS[spec.key] = spec
+    return spec
+
+
+register(CrawlerSpec(
+    "tiki", "Tiki", ENGINE_HTTP, COST_LIGHT, domain="tiki.vn",
+    crawl="crawl_tiki_product:crawl_tiki_product_async",
+    sync_crawl="crawl_tiki_product:crawl_tiki_product",
+    concurrency=8, deadline=10, cache_ttl=900,
+))
+register(CrawlerSpec(
+    "lazada", "Lazada", ENGINE_SELENIUM, COST_BROWSER, domain="lazada.vn",
+    crawl="crawler_registry:crawl_lazada",
+    sync_crawl="crawler_registry:crawl_lazada",
+    concurrency=1, deadline=30, cache_ttl=1800,
+))
+register(CrawlerSpec(
+    "cellphones", "CellphoneS", ENGINE_PLAYWRIGHT, COST_BROWSER, domain="cellphones.com.vn",
+    crawl="scrape_cellphones_playwright:scrape_cellphones_products_async",
+    sync_crawl="scrape_cellphones_playwright:scrape_cellphones_products",
+    concurrency=2, deadline=20, cache_ttl=1800,
+))
+register(CrawlerSpec(
+    "dienthoaivui", "Điện Thoại Vui", ENGINE_PLAYWRIGHT, COST_BROWSER, domain="dienthoaivui.com.vn",
+    crawl="scrape_dienthoaivui_playwright_search:scrape_dienthoaivui_products_async",
+    sync_crawl="scrape_dienthoaivui_playwright_search:scrape_dienthoaivui_products",
+    concurrency=2, deadline=20, cache_ttl=1800,
+))
+
+
+def get_crawler(key: str) -> CrawlerSpec:
+    return CRAWLERS[key]
+
+
+# ----------------------------------------------------------------------
+# Bật/tắt theo bảng platforms
+# ----------------------------------------------------------------------
+def _slug(text: str) -> str:
+    text = unicodedata.normalize("NFKD", (text or "").casefold().replace("đ", "d"))
+    return re.sub(r"[^a-z0-9]", "", "".join(c for c in text if not unicodedata.combining(c)))
+
+
+def _host(url: str) -> str:
+    host = urlparse(url if "//" in (url or "") else f"//{url}").netloc.lower()
+    return host[4:] if host.startswith("www.") else host
+
+
+_disabled: Set[str] = set()
+_disabled_loaded_at = 0.0
+_disabled_lock = threading.Lock()
+
+
+def _load_disabled(db_path: str) -> Set[str]:
+    if not os.path.exists(db_path):
+        return set()
+    conn = sqlite3.connect(db_path, timeout=5)
+    try:
+        rows = conn.execute("SELECT name, url, status FROM platforms").fetchall()
+    except sqlite3.Error:
+        return set()
+    finally:
+        conn.close()
+
+    disabled = set()
+    for name, url, status in rows:
+        if (status or "active").strip().lower() == "active":
+            continue
+        for spec in CRAWLERS.values():
+            if _slug(name) in (spec.key, _slug(spec.display_name)) or _host(url) == spec.domain:
+                disabled.add(spec.key)
+    return disabled
+
+
+def disabled_platforms(db_path: Optional[str] = None, refresh: bool = False) -> Set[str]:
+    """Các platform bị tắt trong bảng platforms (đọc lại tối đa mỗi CRAWL_PLATFORMS_REFRESH_SECONDS)"""
+    global _disabled, _disabled_loaded_at
+    if db_path is not None:
+        return _load_disabled(db_path)
+    with _disabled_lock:
+        if refresh or time.monotonic() - _disabled_loaded_at >= PLATFORMS_REFRESH_SECONDS:
+            try:
+                _disabled = _load_disabled(PLATFORMS_DB_PATH)
+            except sqlite3.Error as e:
+                print(f"Không đọc được bảng platforms: {e}")
+            _disabled_loaded_at = time.monotonic()
+        return set(_disabled)
+
+
+def enabled_crawlers() -> List[CrawlerSpec]:
+    disabled = disabled_platforms()
+    return [spec for spec in CRAWLERS.values() if spec.key not in disabled]
@@ -0,0 +1,213 @@
+"""
+HTML Parser - lớp parse HTML có thể thay backend cho các crawler dùng CSS selector
+
+Backend (chọn bằng CRAWL_HTML_PARSER hoặc tham số `backend`):
+  - selectolax: parser C (lexbor/modest), nhanh nhất
+  - lxml: lxml.html + selector CSS được biên dịch sẵn thành XPath (cssselect)
+  - bs4: BeautifulSoup với html.parser (pure Python, giữ để so sánh / fallback)
+  - auto (mặc định): backend nhanh nhất đang cài
+
+Mọi backend trả về node có cùng API tối thiểu: select / select_one / text / get.
+Selector được biên dịch một lần và cache lại (lxml, bs4/soupsieve).
+
+Usage:
+    root = parse_html(html)
+    for card in root.select("._17mcb .Bm3ON"):
+        name = card.select_one(".RfADt a")
+        title = name.get("title") if name else ""
+"""
+
+import os
+from functools import lru_cache
+from typing import List, Optional
+
+
+HTML_PARSER_BACKEND = os.getenv("CRAWL_HTML_PARSER", "auto")
+
+BACKENDS = ("selectolax", "lxml", "bs4")
+
+
+class Node:
+    """API chung của một element HTML cho mọi backend"""
+
+    def select(self, css: str) -> List["Node"]:
+        raise NotImplementedError
+
+    def select_one(self, css: str) -> Optional["Node"]:
+        found = self.select(css)
+        return found[0] if found else None
+
+    def get(self, attr: str, default=None):
+        raise NotImplementedError
+
+    def text(self, separator: str = "", strip: bool = False) -> str:
+        """
+        Text của node và con cháu, cùng ngữ nghĩa với BeautifulSoup.get_text
+        (strip=True bỏ khoảng trắng từng đoạn và bỏ đoạn rỗng). Riêng bs4 bỏ
+        qua nội dung <script>/<style>, selectolax và lxml thì không.
+        """
+        raise NotImplementedError
+
+
+# ----------------------------------------------------------------------
+# selectolax
+# ----------------------------------------------------------------------
+_SEPARATOR_MARK = "\x00"
+
+
+class _SelectolaxNode(Node):
+    __slots__ = ("_node",)
+
+    def __init__(self, node):
+        self._node = node
+
+    def select(self, css: str) -> List[Node]:
+        if not css:
+            return []
+        return [_SelectolaxNode(n) for n in self._node.css(css)]
+
+    def select_one(self, css: str) -> Optional[Node]:
+        if not css:
+            return None
+        node = self._node.css_first(css)
+        return _SelectolaxNode(node) if node is not None else None
+
+    def get(self, attr: str, default=None):
+        value = self._node.attributes.get(attr)
+        return default if value is None else value
+
+    def text(self, separator: str = "", strip: bool = False) -> str:
+        if not strip:
+            return self._node.text(deep=True, separator=separator)
+        # Bỏ fragment rỗng giống BeautifulSoup (text(strip=True) của selectolax giữ lại chúng)
+        raw = self._node.text(deep=True, separator=_SEPARATOR_MARK, strip=True)
+        return separator.join(s for s in raw.split(_SEPARATOR_MARK) if s)
+
+
+def _parse_selectolax(html: str) -> Node:
+    try:
+        from selectolax.lexbor import LexborHTMLParser as HTMLParser
+    except ImportError:
+        from selectolax.parser import HTMLParser
+    tree = HTMLParser(html)
+    return _SelectolaxNode(tree.root if tree.root is not None else tree.body)
+
+
+# ----------------------------------------------------------------------
+# lxml
+# ----------------------------------------------------------------------
+@lru_cache(maxsize=512)
+def _lxml_selector(css: str):
+    from lxml.cssselect import CSSSelector
+    return CSSSelector(css, translator="html")
+
+
+class _LxmlNode(Node):
+    __slots__ = ("_el",)
+
+    def __init__(self, el):
+        self._el = el
+
+    def select(self, css: str) -> List[Node]:
+        if not css:
+            return []
+        return [_LxmlNode(el) for el in _lxml_selector(css)(self._el)]
+
+    def get(self, attr: str, default=None):
+        return self._el.get(attr, default)
+
+    def text(self, separator: str = "", strip: bool = False) -> str:
+        strings = self._el.itertext()
+        if strip:
+            strings = (s.strip() for s in strings)
+            strings = (s for s in strings if s)
+        return separator.join(strings)
+
+
+def _parse_lxml(html: str) -> Node:
+    import lxml.html
+    return _LxmlNode(lxml.html.document_fromstring(html) if html.strip() else lxml.html.fromstring("<html/>"))
+
+
+# ----------------------------------------------------------------------
+# BeautifulSoup
+# ----------------------------------------------------------------------
+@lru_cache(maxsize=512)
+def _soupsieve_selector(css: str):
+    import soupsieve
+    return soupsieve.compile(css)
+
+
+class _BS4Node(Node):
+    __slots__ = ("_tag",)
+
+    def __init__(self, tag):
+        self._tag = tag
+
+    def select(self, css: str) -> List[Node]:
+        if not css:
+            return []
+        return [_BS4Node(t) for t in _soupsieve_selector(css).select(self._tag)]
+
+    def select_one(self, css: str) -> Optional[Node]:
+        if not css:
+            return None
+        tag = _soupsieve_selector(css).select_one(self._tag)
+        return _BS4Node(tag) if tag is not None else None
+
+    def get(self, attr: str, default=None):
+        return self._tag.get(attr, default)
+
+    def text(self, separator: str = "", strip: bool = False) -> str:
+        return self._tag.get_text(separator=separator, strip=strip)
+
+
+def _parse_bs4(html: str) -> Node:
+    from bs4 import BeautifulSoup
+    return _BS4Node(BeautifulSoup(html, "html.parser"))
+
+
+_PARSERS = {
+    "selectolax": _parse_selectolax,
+    "lxml": _parse_lxml,
+    "bs4": _parse_bs4,
+}
+
+_REQUIRED_MODULES = {
+    "selectolax": ("selectolax",),
+    "lxml": ("lxml.html", "lxml.cssselect", "cssselect"),
+    "bs4": ("bs4",),
+}
+
+
+@lru_cache(maxsize=None)
+def backend_available(backend: str) -> bool:
+    for module in _REQUIRED_MODULES.get(backend, ()):
+        try:
+            __import__(module)
+        except ImportError:
+            return False
+    return backend in _PARSERS
+
+
+def available_backends() -> List[str]:
+    return [b for b in BACKENDS if backend_available(b)]
+
+
+@lru_cache(maxsize=None)
+def resolve_backend(backend: Optional[str] = None) -> str:
+    """Tên backend sẽ dùng; 'auto' chọn backend nhanh nhất đang cài"""
+    backend = (backend or HTML_PARSER_BACKEND or "auto").lower()
+    if backend != "auto":
+        if not backend_available(backend):
+            raise ValueError(f"HTML parser backend '{backend}' không khả dụng")
+        return backend
+    for candidate in BACKENDS:
+        if backend_available(candidate):
+            return candidate
+    raise ImportError("Cần cài selectolax, lxml hoặc beautifulsoup4 để parse HTML")
+
+
+def parse_html(html: str, backend: Optional[str] = None) -> Node:
+    """Parse HTML bằng backend được chọn và trả về node gốc"""
+    return _PARSERS[resolve_backend(backend)](html or "")
@@ -0,0 +1,358 @@
+"""
+HTTP Cache - cache response trên đĩa cho các crawler dùng requests/httpx
+
+  - Body lưu theo nội dung (sha256) nên các URL trả về cùng nội dung dùng chung file
+  - Index (SQLite) lưu URL -> body hash, status, header, ETag/Last-Modified
+  - Còn trong TTL thì trả từ đĩa; hết TTL thì gửi request điều kiện
+    (If-None-Match / If-Modified-Since), 304 thì dùng lại body đã có
+  - TTL mặc định CRAWL_HTTP_CACHE_TTL, override theo host bằng
+    CRAWL_HTTP_CACHE_HOST_TTLS="tiki.vn=120,example.com=3600"
+  - Tổng dung lượng body bị giới hạn (CRAWL_HTTP_CACHE_MAX_MB), vượt thì xóa
+    entry ít được dùng gần đây nhất (LRU)
+  - Đếm hit/miss/revalidate và số byte được phục vụ từ cache
+
+Usage:
+    response = cached_get(url, params=params, headers=headers)       # requests.Response
+    response = await async_cached_get(client, url, params=params)    # httpx.Response
+"""
+
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from typing import Dict, Optional, Tuple
+from urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
+
+try:
+    from http_client import async_http_get, http_get
+except ImportError:
+    from Crawl_Data.http_client import async_http_get, http_get
+
+
+HTTP_CACHE_ENABLED = os.getenv("CRAWL_HTTP_CACHE_ENABLED", "1").lower() not in ("0", "false", "no")
+HTTP_CACHE_DIR = os.getenv("CRAWL_HTTP_CACHE_DIR", os.path.join(os.path.dirname(os.path.abspath(__file__)), ".http_cache"))
+HTTP_CACHE_TTL = float(os.getenv("CRAWL_HTTP_CACHE_TTL", "300"))
+HTTP_CACHE_MAX_BYTES = int(float(os.getenv("CRAWL_HTTP_CACHE_MAX_MB", "200")) * 1024 * 1024)
+
+
+def _parse_host_ttls(value: str) -> Dict[str, float]:
+    ttls = {}
+    for item in value.split(","):
+        host, _, ttl = item.partition("=")
+        if host.strip() and ttl.strip():
+            try:
+                ttls[host.strip().lower()] = float(ttl)
+            except ValueError:
+                print(f"Bỏ qua TTL không hợp lệ trong CRAWL_HTTP_CACHE_HOST_TTLS: {item}")
+    return ttls
+
+
+HTTP_CACHE_HOST_TTLS = _parse_host_ttls(os.getenv("CRAWL_HTTP_CACHE_HOST_TTLS", "tiki.vn=120"))
+
+# Header của response được lưu lại cùng body
+_STORED_HEADERS = ("content-type", "etag", "last-modified", "cache-control")
+
+
+def _full_url(url: str, params: Optional[Dict] = None) -> str:
+    """URL kèm query đã sắp xếp, dùng làm khóa cache"""
+    parts = urlsplit(url)
+    query = parse_qsl(parts.query, keep_blank_values=True)
+    if params:
+        query.extend((str(k), str(v)) for k, v in params.items() if v is not None)
+    return urlunsplit((parts.scheme, parts.netloc.lower(), parts.path, urlencode(sorted(query)), ""))
+
+
+class CacheRecord:
+    def __init__(self, row: sqlite3.Row):
+        self.url = row["url"]
+        self.body_hash = row["body_hash"]
+        self.status = row["status"]
+        self.headers = json.loads(row["headers"] or "{}")
+        self.etag = row["etag"]
+        self.last_modified = row["last_modified"]
+        self.stored_at = row["stored_at"]
+        self.size = row["size"]
+
+
+class HttpCache:
+    """Cache response HTTP trên đĩa: body theo nội dung + index SQLite"""
+
+    def __init__(self, cache_dir: str = HTTP_CACHE_DIR, default_ttl: float = HTTP_CACHE_TTL,
+                 host_ttls: Optional[Dict[str, float]] = None, max_bytes: int = HTTP_CACHE_MAX_BYTES):
+        self.cache_dir = cache_dir
+        self.default_ttl = default_ttl
+        self.host_ttls = dict(HTTP_CACHE_HOST_TTLS if host_ttls is None else host_ttls)
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._conn: Optional[sqlite3.Connection] = None
+        self._stats = {"hits": 0, "misses": 0, "revalidated": 0, "stores": 0, "evictions": 0,
+                       "bytes_from_cache": 0, "bytes_downloaded": 0}
+
+    # ------------------------------------------------------------------
+    # Lưu trữ
+    # ------------------------------------------------------------------
+    def _connection(self) -> sqlite3.Connection:
+        if self._conn is None:
+            os.makedirs(os.path.join(self.cache_dir, "bodies"), exist_ok=True)
+            conn = sqlite3.connect(os.path.join(self.cache_dir, "index.db"), check_same_thread=False)
+            conn.row_factory = sqlite3.Row
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute('''
+                CREATE TABLE IF NOT EXISTS http_cache (
+                    url TEXT PRIMARY KEY,
+                    body_hash TEXT NOT NULL,
+                    status INTEGER NOT NULL,
+                    headers TEXT,
+                    etag TEXT,
+                    last_modified TEXT,
+                    stored_at REAL NOT NULL,
+                    last_access REAL NOT NULL,
+                    size INTEGER NOT NULL
+                )
+            ''')
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_http_cache_last_access ON http_cache(last_access)")
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_http_cache_body_hash ON http_cache(body_hash)")
+            conn.commit()
+            self._conn = conn
+        return self._conn
+
+    def _body_path(self, body_hash: str) -> str:
+        return os.path.join(self.cache_dir, "bodies", body_hash[:2], body_hash)
+
+    def _read_body(self, body_hash: str) -> Optional[bytes]:
+        try:
+            with open(self._body_path(body_hash), "rb") as f:
+                return f.read()
+        except OSError:
+            return None
+
+    def _write_body(self, body: bytes) -> str:
+        body_hash = hashlib.sha256(body).hexdigest()
+        path = self._body_path(body_hash)
+        if not os.path.exists(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+            with open(tmp_path, "wb") as f:
+                f.write(body)
+            os.replace(tmp_path, path)
+        return body_hash
+
+    def _delete_body_if_unused(self, conn: sqlite3.Connection, body_hash: str):
+        if conn.execute("SELECT 1 FROM http_cache WHERE body_hash = ? LIMIT 1", (body_hash,)).fetchone():
+            return
+        try:
+            os.remove(self._body_path(body_hash))
+        except OSError:
+            pass
+
+    def ttl_for(self, url: str) -> float:
+        host = urlsplit(url).hostname or ""
+        while host:
+            if host in self.host_ttls:
+                return self.host_ttls[host]
+            _, _, host = host.partition(".")
+        return self.default_ttl
+
+    def lookup(self, url: str) -> Tuple[Optional[CacheRecord], Optional[bytes]]:
+        with self._lock:
+            conn = self._connection()
+            row = conn.execute("SELECT * FROM http_cache WHERE url = ?", (url,)).fetchone()
+            if row is None:
+                return None, None
+            record = CacheRecord(row)
+            body = self._read_body(record.body_hash)
+            if body is None:
+                conn.execute("DELETE FROM http_cache WHERE url = ?", (url,))
+                conn.commit()
+                return None, None
+            conn.execute("UPDATE http_cache SET last_access = ? WHERE url = ?", (time.time(), url))
+            conn.commit()
+            return record, body
+
+    def store(self, url: str, status: int, headers, body: bytes):
+        cache_control = (headers.get("Cache-Control") or "").lower()
+        if "no-store" in cache_control:
+            return
+        stored_headers = {k: headers[k] for k in headers.keys() if k.lower() in _STORED_HEADERS}
+        with self._lock:
+            conn = self._connection()
+            old = conn.execute("SELECT body_hash FROM http_cache WHERE url = ?", (url,)).fetchone()
+            body_hash = self._write_body(body)
+            now = time.time()
+            conn.execute(
+                "INSERT OR REPLACE INTO http_cache "
+                "(url, body_hash, status, headers, etag, last_modified, stored_at, last_access, size) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (url, body_hash, status, json.dumps(stored_headers), headers.get("ETag"),
+                 headers.get("Last-Modified"), now, now, len(body)),
+            )
+            if old is not None and old["body_hash"] != body_hash:
+                self._delete_body_if_unused(conn, old["body_hash"])
+            conn.commit()
+            self._stats["stores"] += 1
+            self._evict(conn, keep_url=url)
+
+    def touch(self, url: str):
+        """Entry vừa được server xác nhận còn mới (304)"""
+        with self._lock:
+            now = time.time()
+            self._connection().execute(
+                "UPDATE http_cache SET stored_at = ?, last_access = ? WHERE url = ?", (now, now, url)
+            )
+            self._conn.commit()
+
+    def _evict(self, conn: sqlite3.Connection, keep_url: Optional[str] = None):
+        if not self.max_bytes:
+            return
+        # Body dùng chung chỉ tính một lần
+        total = conn.execute(
+            "SELECT COALESCE(SUM(size), 0) FROM (SELECT body_hash, MAX(size) AS size FROM http_cache GROUP BY body_hash)"
+        ).fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        rows = conn.execute(
+            "SELECT url, body_hash, size FROM http_cache WHERE url != ? ORDER BY last_access", (keep_url or "",)
+        ).fetchall()
+        for row in rows:
+            conn.execute("DELETE FROM http_cache WHERE url = ?", (row["url"],))
+            if not conn.execute("SELECT 1 FROM http_cache WHERE body_hash = ? LIMIT 1", (row["body_hash"],)).fetchone():
+                total -= row["size"]
+            self._delete_body_if_unused(conn, row["body_hash"])
+            self._stats["evictions"] += 1
+            if total <= self.max_bytes:
+                break
+        conn.commit()
+
+    # ------------------------------------------------------------------
+    # Luồng request
+    # ------------------------------------------------------------------
+    def plan(self, url: str, params: Optional[Dict] = None, headers: Optional[Dict] = None):
+        """
+        Tra cache trước khi gửi request.
+
+        Trả về (key, record, body, request_headers): record còn mới thì caller dùng
+        body luôn (request_headers là None); ngược lại gửi request với request_headers
+        (có thêm header điều kiện nếu có ETag/Last-Modified).
+        """
+        key = _full_url(url, params)
+        record, body = self.lookup(key)
+        if record is not None and time.time() - record.stored_at <= self.ttl_for(key):
+            self._count_hit("hits", len(body))
+            return key, record, body, None
+        request_headers = dict(headers or {})
+        if record is not None:
+            if record.etag:
+                request_headers["If-None-Match"] = record.etag
+            if record.last_modified:
+                request_headers["If-Modified-Since"] = record.last_modified
+        return key, record, body, request_headers
+
+    def _count_hit(self, counter: str, size: int):
+        with self._lock:
+            self._stats[counter] += 1
+            self._stats["bytes_from_cache"] += size
+
+    def settle(self, key: str, record: Optional[CacheRecord], status: int, headers, body: Optional[bytes]) -> bool:
+        """
+        Xử lý response thật: 304 -> True (caller dùng body đã cache), 200 -> lưu cache.
+        """
+        if status == 304 and record is not None:
+            self.touch(key)
+            self._count_hit("revalidated", record.size)
+            return True
+        with self._lock:
+            self._stats["misses"] += 1
+            if body is not None:
+                self._stats["bytes_downloaded"] += len(body)
+        if status == 200 and body is not None:
+            self.store(key, status, headers, body)
+        return False
+
+    def stats(self) -> Dict:
+        with self._lock:
+            data = dict(self._stats)
+            try:
+                row = self._connection().execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM http_cache").fetchone()
+                data.update({"entries": row[0], "stored_bytes": row[1]})
+            except sqlite3.Error:
+                pass
+        lookups = data["hits"] + data["misses"] + data["revalidated"]
+        data["hit_ratio"] = round((data["hits"] + data["revalidated"]) / lookups, 3) if lookups else None
+        return data
+
+    def close(self):
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+
+
+_cache: Optional[HttpCache] = None
+_cache_lock = threading.Lock()
+
+
+def get_http_cache() -> HttpCache:
+    """HttpCache dùng chung cho cả process"""
+    global _cache
+    with _cache_lock:
+        if _cache is None:
+            _cache = HttpCache()
+        return _cache
+
+
+def _requests_response(url: str, record: CacheRecord, body: bytes):
+    import requests
+    from requests.structures import CaseInsensitiveDict
+
+    response = requests.Response()
+    response.status_code = record.status
+    response.url = url
+    response.headers = CaseInsensitiveDict(record.headers)
+    response._content = body
+    response.encoding = requests.utils.get_encoding_from_headers(response.headers) or "utf-8"
+    response.from_cache = True
+    return response
+
+
+def cached_get(url: str, params: Optional[Dict] = None, headers: Optional[Dict] = None, **kwargs):
+    """http_get đi qua cache trên đĩa; trả về requests.Response (response.from_cache khi lấy từ cache)"""
+    if not HTTP_CACHE_ENABLED:
+        return http_get(url, params=params, headers=headers, **kwargs)
+    cache = get_http_cache()
+    key, record, body, request_headers = cache.plan(url, params, headers)
+    if request_headers is None:
+        return _requests_response(url, record, body)
+    response = http_get(url, params=params, headers=request_headers, **kwargs)
+    if cache.settle(key, record, response.status_code, response.headers,
+                    response.content if response.status_code == 200 else None):
+        return _requests_response(url, record, body)
+    response.from_cache = False
+    return response
+
+
+async def async_cached_get(client, url: str, params: Optional[Dict] = None,
+                           headers: Optional[Dict] = None, **kwargs):
+    """Bản async của cached_get trên httpx.AsyncClient; trả về httpx.Response"""
+    import httpx
+
+    def _from_cache(record: CacheRecord, body: bytes):
+        return httpx.Response(record.status, headers=record.headers, content=body,
+                              request=httpx.Request("GET", url, params=params))
+
+    if not HTTP_CACHE_ENABLED:
+        return await async_http_get(client, url, params=params, headers=headers, **kwargs)
+    cache = get_http_cache()
+    key, record, body, request_headers = cache.plan(url, params, headers)
+    if request_headers is None:
+        return _from_cache(record, body)
+    response = await async_http_get(client, url, params=params, headers=request_headers, **kwargs)
+    if cache.settle(key, record, response.status_code, response.headers,
+                    response.content if response.status_code == 200 else None):
+        return _from_cache(record, body)
+    return response
+
+
+def cache_stats() -> Dict:
+    return get_http_cache().stats() if HTTP_CACHE_ENABLED else {}
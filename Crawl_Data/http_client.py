@@ -0,0 +1,240 @@
+"""
+HTTP Client - connection pool keep-alive dùng chung cho các crawler gọi API/HTTP
+
+  - Sync: một requests.Session cho cả process (HTTPAdapter với pool size tùy chỉnh)
+  - Async: httpx.AsyncClient với giới hạn connection/keep-alive tương ứng
+  - Timeout mặc định cho mọi request (connect/read)
+  - Retry có backoff + jitter với 429/5xx và lỗi kết nối, tôn trọng Retry-After
+  - Accept-Encoding gzip/deflate, thêm br khi có module brotli
+  - Thống kê số request / số connection mới để kiểm tra tỉ lệ dùng lại connection
+
+Usage:
+    response = http_get(TIKI_API_URL, params=params, headers=headers)
+
+    client = create_async_client(headers=headers)
+    response = await async_http_get(client, TIKI_API_URL, params=params)
+"""
+
+import asyncio
+import importlib.util
+import os
+import random
+import threading
+import time
+from typing import Dict, Optional
+
+import requests
+from requests.adapters import HTTPAdapter
+
+
+HTTP_POOL_CONNECTIONS = int(os.getenv("CRAWL_HTTP_POOL_CONNECTIONS", "10"))
+HTTP_POOL_MAXSIZE = int(os.getenv("CRAWL_HTTP_POOL_MAXSIZE", "20"))
+HTTP_KEEPALIVE_EXPIRY = float(os.getenv("CRAWL_HTTP_KEEPALIVE_EXPIRY", "60"))
+HTTP_CONNECT_TIMEOUT = float(os.getenv("CRAWL_HTTP_CONNECT_TIMEOUT", "5"))
+HTTP_READ_TIMEOUT = float(os.getenv("CRAWL_HTTP_READ_TIMEOUT", "15"))
+HTTP_RETRIES = int(os.getenv("CRAWL_HTTP_RETRIES", "3"))
+HTTP_BACKOFF = float(os.getenv("CRAWL_HTTP_BACKOFF", "0.5"))
+HTTP_BACKOFF_MAX = float(os.getenv("CRAWL_HTTP_BACKOFF_MAX", "8"))
+
+RETRY_STATUSES = frozenset({429, 500, 502, 503, 504})
+
+
+def _accept_encoding() -> str:
+    # requests/httpx chỉ giải nén br khi có brotli (hoặc brotlicffi)
+    for module in ("brotli", "brotlicffi"):
+        try:
+            __import__(module)
+            return "gzip, deflate, br"
+        except ImportError:
+            continue
+    return "gzip, deflate"
+
+
+ACCEPT_ENCODING = _accept_encoding()
+
+
+class HttpStats:
+    """Đếm request, retry và connection mới của một client"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.requests = 0
+        self.new_connections = 0
+        self.retries = 0
+        self.failures = 0
+
+    def incr(self, field: str, amount: int = 1):
+        with self._lock:
+            setattr(self, field, getattr(self, field) + amount)
+
+    def as_dict(self, new_connections: Optional[int] = None) -> Dict:
+        with self._lock:
+            requests_sent = self.requests
+            connections = self.new_connections if new_connections is None else new_connections
+            data = {
+                "requests": requests_sent,
+                "new_connections": connections,
+                "reused_connections": max(0, requests_sent - connections),
+                "retries": self.retries,
+                "failures": self.failures,
+            }
+        data["reuse_ratio"] = round(data["reused_connections"] / requests_sent, 3) if requests_sent else None
+        return data
+
+
+SYNC_STATS = HttpStats()
+ASYNC_STATS = HttpStats()
+
+
+def backoff_delay(attempt: int, retry_after: Optional[str] = None) -> float:
+    """Full-jitter exponential backoff; dùng Retry-After (giây) nếu server gửi"""
+    if retry_after:
+        try:
+            return min(HTTP_BACKOFF_MAX, max(0.0, float(retry_after)))
+        except ValueError:
+            pass
+    return random.uniform(0, min(HTTP_BACKOFF_MAX, HTTP_BACKOFF * (2 ** attempt)))
+
+
+# ----------------------------------------------------------------------
+# Sync (requests)
+# ----------------------------------------------------------------------
+_session: Optional[requests.Session] = None
+_session_lock = threading.Lock()
+
+
+def get_session() -> requests.Session:
+    """requests.Session keep-alive dùng chung cho cả process"""
+    global _session
+    with _session_lock:
+        if _session is None:
+            session = requests.Session()
+            # Retry tự làm ở http_get để có jitter và đếm số lần retry
+            adapter = HTTPAdapter(pool_connections=HTTP_POOL_CONNECTIONS,
+                                  pool_maxsize=HTTP_POOL_MAXSIZE, max_retries=0)
+            session.mount("https://", adapter)
+            session.mount("http://", adapter)
+            session.headers["Accept-Encoding"] = ACCEPT_ENCODING
+            _session = session
+        return _session
+
+
+def http_get(url: str, params: Optional[Dict] = None, headers: Optional[Dict] = None,
+             timeout=None, retries: int = HTTP_RETRIES, **kwargs) -> requests.Response:
+    """
+    GET qua session dùng chung, retry với 429/5xx và lỗi kết nối.
+
+    Trả về response cuối cùng (kể cả khi vẫn là 429/5xx sau khi hết lượt retry);
+    raise exception kết nối nếu mọi lần thử đều lỗi.
+    """
+    session = get_session()
+    timeout = timeout or (HTTP_CONNECT_TIMEOUT, HTTP_READ_TIMEOUT)
+    for attempt in range(retries + 1):
+        SYNC_STATS.incr("requests")
+        try:
+            response = session.get(url, params=params, headers=headers, timeout=timeout, **kwargs)
+        except (requests.ConnectionError, requests.Timeout):
+            if attempt >= retries:
+                SYNC_STATS.incr("failures")
+                raise
+            SYNC_STATS.incr("retries")
+            time.sleep(backoff_delay(attempt))
+            continue
+        if response.status_code not in RETRY_STATUSES or attempt >= retries:
+            return response
+        SYNC_STATS.incr("retries")
+        delay = backoff_delay(attempt, response.headers.get("Retry-After"))
+        response.close()
+        time.sleep(delay)
+    return response
+
+
+def _sync_new_connections() -> Optional[int]:
+    """Tổng số connection urllib3 đã mở trong các pool của session"""
+    if _session is None:
+        return 0
+    total = 0
+    try:
+        for adapter in set(_session.adapters.values()):
+            pools = adapter.poolmanager.pools
+            for key in pools.keys():
+                pool = pools.get(key)
+                if pool is not None:
+                    total += pool.num_connections
+    except AttributeError:
+        return None
+    return total
+
+
+def close_session():
+    global _session
+    with _session_lock:
+        if _session is not None:
+            _session.close()
+            _session = None
+
+
+# ----------------------------------------------------------------------
+# Async (httpx)
+# ----------------------------------------------------------------------
+# httpx là tùy chọn: không có thì caller dùng client sync trong worker thread
+HTTPX_AVAILABLE = importlib.util.find_spec("httpx") is not None
+
+
+async def _trace(event_name: str, info: Dict):
+    # httpcore phát sự kiện này mỗi lần phải mở TCP connection mới
+    if event_name == "connection.connect_tcp.complete":
+        ASYNC_STATS.incr("new_connections")
+
+
+def create_async_client(headers: Optional[Dict] = None):
+    """httpx.AsyncClient keep-alive với pool size và timeout như client sync"""
+    import httpx
+
+    client_headers = {"Accept-Encoding": ACCEPT_ENCODING}
+    if headers:
+        client_headers.update(headers)
+    return httpx.AsyncClient(
+        headers=client_headers,
+        timeout=httpx.Timeout(HTTP_READ_TIMEOUT, connect=HTTP_CONNECT_TIMEOUT),
+        limits=httpx.Limits(
+            max_connections=HTTP_POOL_MAXSIZE,
+            max_keepalive_connections=HTTP_POOL_MAXSIZE,
+            keepalive_expiry=HTTP_KEEPALIVE_EXPIRY,
+        ),
+    )
+
+
+async def async_http_get(client, url: str, params: Optional[Dict] = None,
+                         headers: Optional[Dict] = None, retries: int = HTTP_RETRIES, **kwargs):
+    """Bản async của http_get trên một httpx.AsyncClient"""
+    import httpx
+
+    for attempt in range(retries + 1):
+        ASYNC_STATS.incr("requests")
+        try:
+            response = await client.get(url, params=params, headers=headers,
+                                        extensions={"trace": _trace}, **kwargs)
+        except httpx.TransportError:
+            if attempt >= retries:
+                ASYNC_STATS.incr("failures")
+                raise
+            ASYNC_STATS.incr("retries")
+            await asyncio.sleep(backoff_delay(attempt))
+            continue
+        if response.status_code not in RETRY_STATUSES or attempt >= retries:
+            return response
+        ASYNC_STATS.incr("retries")
+        delay = backoff_delay(attempt, response.headers.get("Retry-After"))
+        await response.aclose()
+        await asyncio.sleep(delay)
+    return response
+
+
+def connection_stats() -> Dict:
+    """Thống kê dùng lại connection của client sync và async"""
+    return {
+        "sync": SYNC_STATS.as_dict(new_connections=_sync_new_connections()),
+        "async": ASYNC_STATS.as_dict(),
+        "accept_encoding": ACCEPT_ENCODING,
+    }
@@ -6,16 +6,53 @@ Công cụ cào dữ liệu sản phẩm từ Lazada.vn (phiên bản tối ưu)
 import datetime
 import os
 import json
+import re
 from bs4 import BeautifulSoup
 from bs4.element import ResultSet
-from selenium import webdriver
+from selenium.common.exceptions import TimeoutException
+from selenium.webdriver.common.by import By
+from selenium.webdriver.support import expected_conditions as EC
 from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.chrome.webdriver import WebDriver
-from selenium.webdriver.chrome.options import Options
-from selenium.webdriver.chrome.service import Service
-from webdriver_manager.chrome import ChromeDriverManager
-from time import sleep
-from typing import List, Dict
+from typing import List, Dict, Optional
+
+from selenium_driver_pool import DriverPool, create_chrome_driver, get_driver_pool
+from resource_blocking import BlockingStats, apply_cdp_blocking, collect_driver_metrics, get_policy
+from html_parser import parse_html
+from http_client import http_get
+from normalization import parse_count, parse_price, parse_rating
+
+# Selector của khung danh sách sản phẩm, dùng để biết trang đã render xong
+PRODUCT_LIST_SELECTOR = '._17mcb .Bm3ON'
+PAGE_READY_TIMEOUT = 10
+
+# Selector bên trong một card sản phẩm (dùng cho extract_products)
+CARD_NAME_SELECTOR = '.buTCk .RfADt a'
+CARD_PRICE_SELECTOR = '.buTCk .aBrP0 .ooOxS'
+CARD_SOLD_SELECTOR = '.buTCk ._6uN7R ._1cEkb'
+CARD_ORIGIN_SELECTOR = '.buTCk ._6uN7R .oa6ri'
+CARD_RATING_SELECTOR = '.buTCk .qzqFw'
+RATING_VALUE_SELECTORS = ('.review-score', '._9-ogB', '.rating-average', '[data-rating]')
+REVIEW_COUNT_SELECTOR = '._1cEkb'
+
+_NUMBER_RE = re.compile(r'(\d+\.?\d*)')
+_RATING_TEXT_RE = re.compile(r'(\d+\.?\d*)\s*/?\s*5|(\d+\.?\d*)\s*sao')
+_REVIEW_TEXT_RE = re.compile(r'(\d+)\s*(?:đánh giá|review|nhận xét)', re.IGNORECASE)
+_REVIEW_PAREN_RE = re.compile(r'\((\d+)\)')
+
+# Trang tìm kiếm Lazada có sẵn danh sách sản phẩm dạng JSON (ajax=true, hoặc
+# window.pageData trong HTML) nên thử lấy bằng HTTP thường trước, chỉ mở
+# Chrome khi không lấy được (captcha, đổi cấu trúc...)
+LAZADA_JSON_ENABLED = os.getenv("CRAWL_LAZADA_JSON", "1").lower() not in ("0", "false", "no")
+# Probe JSON không retry và có timeout ngắn: lỗi thì fallback sang browser ngay
+LAZADA_JSON_TIMEOUT = float(os.getenv("CRAWL_LAZADA_JSON_TIMEOUT", "5"))
+_PAGE_DATA_RE = re.compile(r'window\.pageData\s*=\s*')
+JSON_HEADERS = {
+    "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36",
+    "Accept": "application/json, text/plain, */*",
+    "Accept-Language": "vi-VN,vi;q=0.9,en;q=0.8",
+    "X-Requested-With": "XMLHttpRequest",
+}
 
 # Simplified logging
 def print_log(message):
@@ -25,9 +62,11 @@ def print_log(message):
 class LazadaCrawler:
     """Lớp chính để crawl dữ liệu từ Lazada"""
     
-    def __init__(self):
+    def __init__(self, driver_pool: Optional[DriverPool] = None):
         self.base_url = "https://www.lazada.vn/catalog/?q={keyword}&page={page}"
         self.domain = "https://www.lazada.vn"
+        self.driver_pool = driver_pool or get_driver_pool()
+        self.blocking_policy = get_policy("lazada")
         
     def filter_keyword(self, keyword: str) -> str:
         """Lọc và format từ khóa để phù hợp với URL Lazada"""
@@ -50,30 +89,30 @@ class LazadaCrawler:
         return str(int(ts))
     
     def create_web_driver(self, url: str) -> WebDriver:
-        """Tạo Chrome WebDriver ở chế độ headless"""
-        chrome_options = Options()
-        chrome_options.add_argument("--headless")
-        chrome_options.add_argument("--no-sandbox")
-        chrome_options.add_argument("--disable-dev-shm-usage")
-        chrome_options.add_argument("--disable-extensions")
-        chrome_options.add_argument("--disable-notifications")
-        chrome_options.add_argument("--disable-infobars")
-        chrome_options.add_argument("--disable-blink-features=AutomationControlled")
-        chrome_options.add_experimental_option("excludeSwitches", ["enable-automation"])
-        chrome_options.add_experimental_option('useAutomationExtension', False)
-        chrome_options.add_experimental_option("prefs", {
-            "profile.default_content_setting_values.notifications": 2
-        })
-        
-        driver = webdriver.Chrome(
-            service=Service(ChromeDriverManager().install()), 
-            options=chrome_options
-        )
-        driver.execute_script("Object.defineProperty(navigator, 'webdriver', {get: () => undefined})")
-        driver.get(url)
-        WebDriverWait(driver, 5)
-        sleep(2)
+        """Tạo Chrome WebDriver headless riêng (không qua pool) và mở url"""
+        driver = create_chrome_driver()
+        self.navigate(driver, url)
         return driver
+
+    def navigate(self, driver: WebDriver, url: str):
+        """Mở url và chờ danh sách sản phẩm render thay vì sleep cố định"""
+        # Driver trong pool có thể đã dùng ở nơi khác nên bật lại blocklist mỗi lần điều hướng
+        apply_cdp_blocking(driver, self.blocking_policy)
+        driver.get(url)
+        try:
+            WebDriverWait(driver, PAGE_READY_TIMEOUT).until(
+                EC.presence_of_element_located((By.CSS_SELECTOR, PRODUCT_LIST_SELECTOR))
+            )
+        except TimeoutException:
+            print_log(f"Không thấy danh sách sản phẩm sau {PAGE_READY_TIMEOUT}s: {url}")
+
+    def fetch_page_html(self, url: str, resource_stats: Optional[BlockingStats] = None) -> str:
+        """Lấy HTML đã render của url bằng một driver mượn từ pool"""
+        with self.driver_pool.driver() as driver:
+            self.navigate(driver, url)
+            if resource_stats is not None:
+                resource_stats.merge(collect_driver_metrics(driver, self.blocking_policy))
+            return driver.execute_script("return document.getElementsByTagName('html')[0].innerHTML")
     
     def get_product_names(self, soup: BeautifulSoup) -> ResultSet:
         """Lấy tên sản phẩm từ HTML"""
@@ -119,15 +158,13 @@ class LazadaCrawler:
                     rating_node = rating_element.select(selector)
                     if rating_node:
                         rating_text = rating_node[0].text.strip()
-                        import re
-                        rating_match = re.search(r'(\d+\.?\d*)', rating_text)
+                        rating_match = _NUMBER_RE.search(rating_text)
                         if rating_match:
                             return float(rating_match.group(1))
                 
                 # Fallback: tìm số trong toàn bộ text của element
                 full_text = rating_element.get_text()
-                import re
-                rating_matches = re.findall(r'(\d+\.?\d*)\s*/?\s*5|(\d+\.?\d*)\s*sao', full_text)
+                rating_matches = _RATING_TEXT_RE.findall(full_text)
                 if rating_matches:
                     for match in rating_matches:
                         for group in match:
@@ -144,21 +181,162 @@ class LazadaCrawler:
         try:
             if index < len(review_items):
                 review_element = review_items[index]
-                review_text = review_element.get_text()
-                import re
-                # Tìm pattern số đánh giá
-                review_matches = re.findall(r'(\d+)\s*(?:đánh giá|review|nhận xét)', review_text, re.IGNORECASE)
-                if review_matches:
-                    return int(review_matches[0])
-                
-                # Fallback: tìm số trong parentheses
-                paren_matches = re.findall(r'\((\d+)\)', review_text)
-                if paren_matches:
-                    return int(paren_matches[0])
+                return self.parse_review_count(review_element.get_text())
             return 0
         except (IndexError, AttributeError, ValueError):
             return 0
     
+    def extract_page_data(self, text: str) -> Optional[Dict]:
+        """
+        Lấy state JSON của trang tìm kiếm: body của request ajax=true là JSON,
+        còn HTML thường chứa `window.pageData = {...};`
+        """
+        text = text.lstrip()
+        if text.startswith('{'):
+            return json.loads(text)
+        match = _PAGE_DATA_RE.search(text)
+        if not match:
+            return None
+        data, _ = json.JSONDecoder().raw_decode(text, match.end())
+        return data
+
+    def products_from_page_data(self, data: Dict) -> Optional[List[Dict]]:
+        """Map mods.listItems sang format giống crawl_tiki_product; None nếu không có listItems"""
+        items = ((data or {}).get('mods') or {}).get('listItems')
+        if items is None:
+            return None
+
+        products = []
+        current_time = datetime.datetime.now().isoformat()
+        timestamp = int(datetime.datetime.now().timestamp())
+        for index, item in enumerate(items):
+            try:
+                name = (item.get('name') or '').strip()
+                if not name:
+                    continue
+                price = parse_price(item.get('price'))
+                original_price = parse_price(item.get('originalPrice')) or price
+                products.append({
+                    "id": f"lazada_{timestamp}_{index}",
+                    "name": name,
+                    "price": price,
+                    "original_price": original_price,
+                    "discount": item.get('discount') or "Không giảm giá",
+                    "seller": item.get('sellerName') or item.get('location') or "Unknown Seller",
+                    "rating": f"{parse_rating(item.get('ratingScore')):.1f}",
+                    "review_count": parse_count(item.get('review')),
+                    "url": self.product_url(item.get('itemUrl') or item.get('productUrl')),
+                    "timestamp": current_time,
+                    "platform": "lazada",
+                    "sold_count": item.get('itemSoldCntShow') or "0",
+                })
+            except (TypeError, ValueError) as e:
+                print(f"Error processing product {index}: {e}")
+                continue
+
+        return products
+
+    def fetch_page_products_json(self, url: str) -> Optional[List[Dict]]:
+        """
+        Lấy sản phẩm của một trang tìm kiếm bằng HTTP thường (không render JS).
+        Trả về None khi không dùng được (lỗi mạng, captcha, không có JSON) để
+        caller fallback sang browser. Không retry: browser là đường lui nên
+        không đáng chờ backoff của http_client.
+        """
+        try:
+            response = http_get(f"{url}&ajax=true", headers={**JSON_HEADERS, "Referer": url},
+                                timeout=LAZADA_JSON_TIMEOUT, retries=0)
+            if response.status_code != 200:
+                print_log(f"Lazada JSON trả về mã lỗi {response.status_code}")
+                return None
+            return self.products_from_page_data(self.extract_page_data(response.text))
+        except Exception as e:
+            print_log(f"Không lấy được JSON từ Lazada: {e}")
+            return None
+
+    def parse_price(self, price_text: str) -> int:
+        """Giá đầu tiên trong text giá (xem normalization.parse_price)"""
+        return parse_price(price_text)
+
+    def parse_rating(self, rating_element) -> float:
+        """Rating (0-5) từ element .qzqFw của một card (node của html_parser)"""
+        for selector in RATING_VALUE_SELECTORS:
+            rating_node = rating_element.select_one(selector)
+            if rating_node:
+                rating_match = _NUMBER_RE.search(rating_node.text(strip=True))
+                if rating_match:
+                    return float(rating_match.group(1))
+
+        for match in _RATING_TEXT_RE.findall(rating_element.text()):
+            for group in match:
+                if group and 0 <= float(group) <= 5:
+                    return float(group)
+        return 0.0
+
+    def parse_review_count(self, review_text: str) -> int:
+        """Số đánh giá từ text như '(12)' hoặc '12 đánh giá'"""
+        review_match = _REVIEW_TEXT_RE.search(review_text) or _REVIEW_PAREN_RE.search(review_text)
+        return parse_count(review_match.group(1)) if review_match else 0
+
+    def product_url(self, link: str) -> str:
+        link = (link or '').strip()
+        if not link:
+            return 'N/A'
+        if link.startswith('//'):
+            return 'https:' + link
+        if link.startswith('/'):
+            return self.domain + link
+        return link
+
+    def extract_products(self, html: str, backend: Optional[str] = None) -> List[Dict]:
+        """
+        Trích xuất sản phẩm trong một lượt duyệt: mỗi card ._17mcb .Bm3ON chỉ được
+        tìm một lần, tên/giá/đã bán/xuất xứ/rating/đánh giá lấy trong chính card đó.
+        Cùng format với get_product_info_json nhưng không cần 6 lần select toàn
+        trang, và không lệch index khi một card thiếu trường nào đó.
+        `backend` là backend của html_parser (mặc định CRAWL_HTML_PARSER).
+        """
+        root = parse_html(html, backend)
+        products = []
+        current_time = datetime.datetime.now().isoformat()
+        timestamp = int(datetime.datetime.now().timestamp())
+
+        for index, card in enumerate(root.select(PRODUCT_LIST_SELECTOR)):
+            try:
+                name_el = card.select_one(CARD_NAME_SELECTOR)
+                name = (name_el.get('title') or '').strip() if name_el else ''
+                if not name:
+                    continue
+
+                price_el = card.select_one(CARD_PRICE_SELECTOR)
+                sold_el = card.select_one(CARD_SOLD_SELECTOR)
+                origin_el = card.select_one(CARD_ORIGIN_SELECTOR)
+                rating_el = card.select_one(CARD_RATING_SELECTOR)
+                review_el = rating_el.select_one(REVIEW_COUNT_SELECTOR) if rating_el else None
+
+                price = self.parse_price(price_el.text(strip=True)) if price_el else 0
+                rating = self.parse_rating(rating_el) if rating_el else 0.0
+
+                products.append({
+                    "id": f"lazada_{timestamp}_{index}",
+                    "name": name,
+                    "price": price,
+                    "original_price": price,  # Lazada không có giá gốc rõ ràng
+                    "discount": "Không giảm giá",
+                    "seller": origin_el.text(strip=True) if origin_el else "Unknown Seller",
+                    "rating": f"{rating:.1f}",
+                    "review_count": self.parse_review_count(review_el.text()) if review_el else 0,
+                    "url": self.product_url(name_el.get('href')),
+                    "timestamp": current_time,
+                    "platform": "lazada",
+                    "sold_count": sold_el.text(strip=True) if sold_el else "0",
+                })
+            except (AttributeError, ValueError) as e:
+                print(f"Error processing product {index}: {e}")
+                continue
+
+        return products
+
     def get_product_info_json(self, soup: BeautifulSoup):
         """Trích xuất thông tin sản phẩm và trả về list dict với format giống crawl_tiki_product"""
         name_items = self.get_product_names(soup)
@@ -179,17 +357,7 @@ class LazadaCrawler:
                 
                 # Xử lý giá
                 price_text = price_items[index].text.strip() if index < len(price_items) else "0"
-                # Trích xuất số từ text giá (loại bỏ ký tự không phải số)
-                import re
-                price_numbers = re.findall(r'[\d,\.]+', price_text.replace('₫', '').replace('đ', ''))
-                current_price = 0
-                if price_numbers:
-                    try:
-                        # Lấy số đầu tiên, loại bỏ dấu phẩy/chấm
-                        price_str = price_numbers[0].replace(',', '').replace('.', '')
-                        current_price = int(price_str)
-                    except (ValueError, IndexError):
-                        current_price = 0
+                current_price = self.parse_price(price_text)
                 
                 sold = self.get_sold_item_at_index(index, sold_items)
                 origin = product_origin[index].text.strip() if index < len(product_origin) else "Unknown Seller"
@@ -199,14 +367,7 @@ class LazadaCrawler:
                 review_count = self.get_review_count_at_index(index, review_items)
                 
                 # Lấy link sản phẩm
-                link = name_items[index].get('href', '').strip()
-                if link:
-                    if link.startswith('/'):
-                        link = self.domain + link
-                    elif link.startswith('//'):
-                        link = 'https:' + link
-                else:
-                    link = 'N/A'
+                link = self.product_url(name_items[index].get('href', ''))
                 
                 # Tạo unique product ID
                 product_id = f"lazada_{int(datetime.datetime.now().timestamp())}_{index}"
@@ -249,14 +410,7 @@ class LazadaCrawler:
                 origin = product_origin[index].text.strip() if index < len(product_origin) else "N/A"
                 
                 # Lấy link sản phẩm
-                link = name_items[index].get('href', '').strip()
-                if link:
-                    if link.startswith('/'):
-                        link = self.domain + link
-                    elif link.startswith('//'):
-                        link = 'https:' + link
-                else:
-                    link = 'N/A'
+                link = self.product_url(name_items[index].get('href', ''))
                 
                 product_info = f"{name} | {price} | {sold} | {origin} | {link}\n"
                 yield product_info
@@ -264,23 +418,37 @@ class LazadaCrawler:
             except (AttributeError, IndexError):
                 continue
     
-    def crawl_lazada_products(self, product_name: str) -> List[Dict]:
+    def crawl_lazada_products(self, product_name: str, metrics: Optional[Dict] = None,
+                              raise_errors: bool = False) -> List[Dict]:
         """
         Crawl sản phẩm từ Lazada và trả về list dict với format giống crawl_tiki_product
-        Giới hạn chỉ lấy 5 sản phẩm
+        Giới hạn chỉ lấy 5 sản phẩm. Mỗi trang được lấy từ JSON nhúng qua HTTP
+        thường trước, thất bại mới render bằng Chrome. Nguồn dữ liệu (json/dom)
+        và thống kê resource bị chặn / page load được ghi vào metrics["extraction"]
+        và metrics["resources"] nếu có truyền metrics.
+        Lỗi trả về list rỗng, trừ khi raise_errors=True (orchestrator cần lỗi
+        để circuit breaker đếm).
         """
+        resource_stats = BlockingStats()
+        sources = []
         try:
             filtered_keyword = self.filter_keyword(product_name)
             all_products = []
+            # Probe JSON thất bại ở một trang thì các trang sau đi thẳng browser
+            use_json = LAZADA_JSON_ENABLED
             
             for page in range(1, 3):  # Crawl tối đa 2 trang
                 url = self.base_url.format(keyword=filtered_keyword, page=page)
                 
-                driver = self.create_web_driver(url)
-                html = driver.execute_script("return document.getElementsByTagName('html')[0].innerHTML")
-                soup = BeautifulSoup(html, "html.parser")
-                
-                products = self.get_product_info_json(soup)
+                products = self.fetch_page_products_json(url) if use_json else None
+                # JSON rỗng cũng có thể là trang chặn bot nên vẫn thử browser
+                if products:
+                    sources.append("json")
+                else:
+                    use_json = False
+                    html = self.fetch_page_html(url, resource_stats)
+                    products = self.extract_products(html)
+                    sources.append("dom")
                 
                 # Thêm từng sản phẩm và kiểm tra giới hạn
                 for product in products:
@@ -288,14 +456,9 @@ class LazadaCrawler:
                         break
                     all_products.append(product)
                 
-                driver.quit()
-                
                 # Nếu đã đủ 5 sản phẩm thì dừng
                 if len(all_products) >= 5:
                     break
-                
-                if page < 2:
-                    sleep(2)
             
             # Đảm bảo chỉ trả về tối đa 5 sản phẩm
             all_products = all_products[:5]
@@ -304,12 +467,21 @@ class LazadaCrawler:
                 print(f"Tìm thấy {len(all_products)} sản phẩm từ Lazada")
             else:
                 print("Không tìm thấy sản phẩm nào từ Lazada")
+            print(f"Lazada extraction: {', '.join(sources)}")
+            if "dom" in sources:
+                print(f"Lazada resources: {resource_stats.summary()}")
             
             return all_products
         
         except Exception as e:
             print(f"Lỗi khi crawl dữ liệu từ Lazada: {e}")
+            if raise_errors:
+                raise
             return []
+        finally:
+            if metrics is not None:
+                metrics["extraction"] = "+".join(dict.fromkeys(sources)) or None
+                metrics["resources"] = resource_stats.as_dict()
 
     def crawl_products(self, keyword: str) -> str:
         """Crawl sản phẩm từ trang 1 đến 2"""
@@ -329,8 +501,7 @@ class LazadaCrawler:
                 filtered_keyword = self.filter_keyword(keyword)
                 url = self.base_url.format(keyword=filtered_keyword, page=page)
                 
-                driver = self.create_web_driver(url)
-                html = driver.execute_script("return document.getElementsByTagName('html')[0].innerHTML")
+                html = self.fetch_page_html(url)
                 soup = BeautifulSoup(html, "html.parser")
                 
                 products = self.get_product_info(soup)
@@ -338,11 +509,6 @@ class LazadaCrawler:
                 for product in products:
                     f.write(product)
                     total_products += 1
-                
-                driver.quit()
-                
-                if page < 2:
-                    sleep(2)
         
         return filename
     
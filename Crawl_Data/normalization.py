@@ -0,0 +1,196 @@
+"""
+Normalization - chuẩn hóa giá, rating, số đã bán / số đánh giá dùng chung cho mọi crawler
+
+- parse_price("29.990.000₫") -> 29990000, parse_price("18990000.00") -> 18990000
+- parse_rating("4,8/5 sao") -> 4.8 (số đầu tiên trong khoảng 0-5)
+- parse_count("1,2k đã bán") -> 1200, parse_count("(123)") -> 123
+- normalize_prices / normalize_ratings / normalize_counts: chuẩn hóa cả list
+  trong một lượt, các chuỗi trùng nhau (rất phổ biến: "0", "Đã bán 1k"...) chỉ parse một lần
+- normalize_products: đưa list sản phẩm của một platform về schema chung
+
+Pattern được biên dịch một lần ở cấp module. Bộ test correctness và benchmark
+throughput: python bench_normalization.py
+
+Usage:
+    from normalization import normalize_products
+    products = normalize_products(products, "lazada")
+"""
+
+import re
+from typing import Callable, Dict, Iterable, List, Optional
+
+# Số có dấu phân cách hàng nghìn (29.990.000 / 1,290,000) hoặc số liền; phần thập phân 1-2 chữ số bị bỏ
+_PRICE_RE = re.compile(r"(\d{1,3}(?:[.,]\d{3})+|\d+)(?:[.,]\d{1,2})?(?!\d)")
+_RATING_RE = re.compile(r"\d+(?:[.,]\d+)?")
+# Số kèm hậu tố k / nghìn / tr / triệu / m, hậu tố không được dính liền chữ khác.
+# (?![.,]?\d) giữ nguyên cả số: không backtrack "128GB" thành "12" hay "1.5GB" thành "1"
+_COUNT_RE = re.compile(r"(\d+(?:[.,]\d+)*)(?![.,]?\d)\s*(k|nghìn|ngàn|tr|triệu|m)?(?![^\W\d_])", re.IGNORECASE)
+_THOUSANDS_RE = re.compile(r"\d{1,3}(?:[.,]\d{3})+")
+_SEPARATORS_RE = re.compile(r"[.,]")
+
+_COUNT_MULTIPLIERS = {"k": 1_000, "nghìn": 1_000, "ngàn": 1_000, "tr": 1_000_000, "triệu": 1_000_000, "m": 1_000_000}
+
+# Tìm trong toàn bộ text của một item (khi không có node riêng cho từng trường).
+# Giá phải có dấu phân cách hàng nghìn hoặc >= 4 chữ số để không nhặt nhầm "128GB", "5 sao"...
+_PRICE_TEXT_RE = re.compile(r"(\d{1,3}(?:[.,]\d{3})+|\d{4,})(?:[.,]\d{1,2})?(?!\d)")
+_RATING_TEXT_PATTERNS = tuple(re.compile(p, re.IGNORECASE) for p in (
+    r"(\d+(?:[.,]\d+)?)\s*/?\s*5\s*sao",
+    r"(\d+(?:[.,]\d+)?)\s*sao",
+    r"Rating:\s*(\d+(?:[.,]\d+)?)",
+    r"(\d+(?:[.,]\d+)?)\s*★",
+))
+_REVIEW_TEXT_PATTERNS = tuple(re.compile(p, re.IGNORECASE) for p in (
+    r"(\d+(?:[.,]\d+)*\s*k?)\s*(?:đánh giá|review|nhận xét)",
+    r"\((\d+(?:[.,]\d+)*\s*k?)\s*(?:đánh giá|review)\)",
+    r"(\d+)\s*comment",
+))
+_SOLD_TEXT_PATTERNS = tuple(re.compile(p, re.IGNORECASE) for p in (
+    r"(\d+(?:[.,]\d+)*\s*(?:k|nghìn|ngàn|tr|triệu)?)\+?\s*(?:đã bán|sold|lượt mua)",
+    r"(?:đã bán|bán)\s*:?\s*(\d+(?:[.,]\d+)*\s*(?:k|nghìn|ngàn|tr|triệu)?)",
+))
+
+
+def parse_price(value) -> int:
+    """Giá (VND, số nguyên) từ số hoặc chuỗi như '29.990.000₫', '1,290,000 VND'; 0 nếu không đọc được"""
+    if isinstance(value, bool) or value is None:
+        return 0
+    if isinstance(value, (int, float)):
+        return int(value) if value > 0 else 0
+    match = _PRICE_RE.search(str(value))
+    if not match:
+        return 0
+    return int(_SEPARATORS_RE.sub("", match.group(1)))
+
+
+def parse_rating(value) -> float:
+    """Rating 0-5 từ số hoặc chuỗi như '4.8/5', '4,5 sao'; 0.0 nếu không có"""
+    if isinstance(value, bool) or value is None:
+        return 0.0
+    if isinstance(value, (int, float)):
+        return float(value) if 0 <= value <= 5 else 0.0
+    for token in _RATING_RE.findall(str(value)):
+        rating = float(token.replace(",", "."))
+        if rating <= 5:
+            return rating
+    return 0.0
+
+
+def _count_number(number: str) -> float:
+    if _THOUSANDS_RE.fullmatch(number):
+        return float(_SEPARATORS_RE.sub("", number))
+    if len(_SEPARATORS_RE.findall(number)) == 1:
+        return float(number.replace(",", "."))
+    return float(_SEPARATORS_RE.sub("", number))
+
+
+def parse_count(value) -> int:
+    """Số lượng (đã bán, đánh giá) từ chuỗi như '1,2k đã bán', '3 nghìn', '(123)'; 0 nếu không có"""
+    if isinstance(value, bool) or value is None:
+        return 0
+    if isinstance(value, (int, float)):
+        return int(value) if value > 0 else 0
+    match = _COUNT_RE.search(str(value))
+    if not match:
+        return 0
+    number, suffix = match.groups()
+    if suffix:
+        return int(round(float(number.replace(",", ".")) * _COUNT_MULTIPLIERS[suffix.lower()]))
+    return int(_count_number(number))
+
+
+def find_price(text: str) -> Optional[int]:
+    """Giá đầu tiên trong text tự do của item, None nếu không thấy"""
+    if not text:
+        return None
+    match = _PRICE_TEXT_RE.search(text)
+    return int(_SEPARATORS_RE.sub("", match.group(1))) if match else None
+
+
+def find_rating(text: str) -> float:
+    """Rating theo các mẫu "4.5/5 sao", "4.5 sao", "Rating: 4.5", "4.5 ★"; 0.0 nếu không có"""
+    if not text:
+        return 0.0
+    for pattern in _RATING_TEXT_PATTERNS:
+        match = pattern.search(text)
+        if match:
+            rating = float(match.group(1).replace(",", "."))
+            if rating <= 5:
+                return rating
+    return 0.0
+
+
+def _find_count(patterns, text: str) -> int:
+    if not text:
+        return 0
+    for pattern in patterns:
+        match = pattern.search(text)
+        if match:
+            return parse_count(match.group(1))
+    return 0
+
+
+def find_review_count(text: str) -> int:
+    """Số đánh giá theo các mẫu "12 đánh giá", "(12 review)", "12 comment" """
+    return _find_count(_REVIEW_TEXT_PATTERNS, text)
+
+
+def find_sold_count(text: str) -> int:
+    """Số đã bán theo các mẫu "1,2k đã bán", "Đã bán 1.234", "Bán: 50", "30 lượt mua" """
+    return _find_count(_SOLD_TEXT_PATTERNS, text)
+
+
+def _batch(parse: Callable, values: Iterable) -> List:
+    cache: Dict = {}
+    results = []
+    append = results.append
+    for value in values:
+        try:
+            result = cache[value]
+        except KeyError:
+            result = cache[value] = parse(value)
+        except TypeError:
+            # giá trị không hash được (list, dict...) thì parse trực tiếp
+            result = parse(value)
+        append(result)
+    return results
+
+
+def normalize_prices(values: Iterable) -> List[int]:
+    return _batch(parse_price, values)
+
+
+def normalize_ratings(values: Iterable) -> List[float]:
+    return _batch(parse_rating, values)
+
+
+def normalize_counts(values: Iterable) -> List[int]:
+    return _batch(parse_count, values)
+
+
+def normalize_products(products: List[Dict], platform: Optional[str] = None) -> List[Dict]:
+    """
+    Đưa sản phẩm về schema chung (sửa tại chỗ và trả về chính list đó):
+    price / original_price / review_count / sold_count là int, rating là chuỗi
+    "x.y", và các trường còn thiếu được điền giá trị mặc định.
+    """
+    if not products:
+        return products
+    prices = normalize_prices([p.get("price") for p in products])
+    original_prices = normalize_prices([p.get("original_price") for p in products])
+    ratings = normalize_ratings([p.get("rating") for p in products])
+    reviews = normalize_counts([p.get("review_count") for p in products])
+    sold = normalize_counts([p.get("sold_count") for p in products])
+
+    for i, product in enumerate(products):
+        if platform:
+            product.setdefault("platform", platform)
+        product["price"] = prices[i]
+        product["original_price"] = original_prices[i] or prices[i]
+        product["rating"] = f"{ratings[i]:.1f}"
+        product["review_count"] = reviews[i]
+        if "sold_count" in product:
+            product["sold_count"] = sold[i]
+        product.setdefault("discount", "Không giảm giá")
+        product.setdefault("seller", "Unknown Seller")
+        product.setdefault("url", "N/A")
+    return products
@@ -0,0 +1,174 @@
+"""
+Page Readiness - chờ trang sẵn sàng theo sự kiện thay vì sleep cố định
+
+Các helper async cho Playwright page:
+  - wait_for_any_selector: race tất cả selector ứng viên trong một lần chờ
+  - wait_for_settle: xong khi network idle HOẶC DOM ngừng thay đổi (MutationObserver)
+  - scroll_until_stable: cuộn tới khi số sản phẩm không tăng nữa
+  - wait_until_ready: ghép các bước trên trong một ngân sách thời gian của platform
+
+Kết quả trả về gồm time-to-first-product và time-to-settle (ms, tính từ
+`started_at`, thường là ngay trước page.goto) để ghi vào kết quả crawl.
+"""
+
+import asyncio
+import os
+import time
+from typing import Dict, List, Optional
+
+
+# Ngân sách thời gian tối đa (giây) cho bước chờ trang của từng platform
+READY_BUDGETS = {
+    "cellphones": float(os.getenv("CRAWL_READY_BUDGET_CELLPHONES", "6")),
+    "dienthoaivui": float(os.getenv("CRAWL_READY_BUDGET_DIENTHOAIVUI", "8")),
+}
+DEFAULT_READY_BUDGET = 8.0
+
+# Resolve sau `quietMs` không có mutation nào, hoặc false khi hết `timeoutMs`
+_DOM_QUIET_JS = """
+({quietMs, timeoutMs}) => new Promise((resolve) => {
+  let quietTimer = null;
+  let hardTimer = null;
+  const observer = new MutationObserver(() => {
+    clearTimeout(quietTimer);
+    quietTimer = setTimeout(() => done(true), quietMs);
+  });
+  const done = (quiet) => {
+    observer.disconnect();
+    clearTimeout(quietTimer);
+    clearTimeout(hardTimer);
+    resolve(quiet);
+  };
+  observer.observe(document.documentElement || document, {
+    childList: true, subtree: true, attributes: true, characterData: true
+  });
+  quietTimer = setTimeout(() => done(true), quietMs);
+  hardTimer = setTimeout(() => done(false), timeoutMs);
+})
+"""
+
+_SCROLL_AND_COUNT_JS = """
+(selector) => {
+  window.scrollTo(0, document.body ? document.body.scrollHeight : 0);
+  return document.querySelectorAll(selector).length;
+}
+"""
+
+
+def ready_budget(platform: str) -> float:
+    return READY_BUDGETS.get(platform, DEFAULT_READY_BUDGET)
+
+
+def _remaining_ms(deadline: float) -> int:
+    return max(0, int((deadline - time.perf_counter()) * 1000))
+
+
+async def wait_for_any_selector(page, selectors: List[str], timeout_ms: int) -> Optional[str]:
+    """Chờ selector đầu tiên xuất hiện (race tất cả cùng lúc); trả về selector khớp hoặc None"""
+    if not selectors or timeout_ms <= 0:
+        return None
+    try:
+        # Một CSS selector list khớp ngay khi bất kỳ phần tử nào xuất hiện
+        await page.wait_for_selector(", ".join(selectors), timeout=timeout_ms)
+    except Exception:
+        return None
+    try:
+        return await page.evaluate(
+            "(sels) => sels.find((s) => document.querySelector(s)) || null", selectors
+        )
+    except Exception:
+        return selectors[0]
+
+
+async def wait_for_dom_quiet(page, quiet_ms: int, timeout_ms: int) -> bool:
+    """True nếu DOM im lặng `quiet_ms` trước khi hết `timeout_ms`"""
+    if timeout_ms <= 0:
+        return False
+    try:
+        return bool(await page.evaluate(_DOM_QUIET_JS, {"quietMs": quiet_ms, "timeoutMs": timeout_ms}))
+    except Exception:
+        return False
+
+
+async def wait_for_settle(page, timeout_ms: int, quiet_ms: int = 500) -> Optional[str]:
+    """Chờ network idle hoặc DOM quiescence, cái nào tới trước; trả về 'network' / 'dom' / None"""
+    if timeout_ms <= 0:
+        return None
+
+    async def _network_idle():
+        try:
+            await page.wait_for_load_state("networkidle", timeout=timeout_ms)
+            return True
+        except Exception:
+            return False
+
+    waiters = {
+        asyncio.ensure_future(_network_idle()): "network",
+        asyncio.ensure_future(wait_for_dom_quiet(page, quiet_ms, timeout_ms)): "dom",
+    }
+    pending = set(waiters)
+    reason = None
+    try:
+        while pending and reason is None:
+            done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                if not task.cancelled() and task.result():
+                    reason = waiters[task]
+                    break
+    finally:
+        for task in pending:
+            task.cancel()
+    return reason
+
+
+async def scroll_until_stable(page, count_selector: str, deadline: float,
+                              quiet_ms: int = 300, max_rounds: int = 10) -> int:
+    """Cuộn xuống cuối trang tới khi số phần tử `count_selector` ngừng tăng hoặc hết giờ"""
+    last_count = -1
+    for _ in range(max_rounds):
+        try:
+            count = await page.evaluate(_SCROLL_AND_COUNT_JS, count_selector)
+        except Exception:
+            break
+        if count <= last_count:
+            break
+        last_count = count
+        remaining = _remaining_ms(deadline)
+        if remaining <= 0:
+            break
+        await wait_for_dom_quiet(page, quiet_ms, remaining)
+    return max(last_count, 0)
+
+
+async def wait_until_ready(page, selectors: List[str], started_at: float, budget_s: float,
+                           count_selector: Optional[str] = None, scroll: bool = False) -> Dict:
+    """
+    Chờ trang sẵn sàng trong ngân sách `budget_s` (tính từ `started_at`, giá trị time.perf_counter()).
+
+    Trả về dict timings: matched_selector, time_to_first_product_ms, time_to_settle_ms,
+    settle_reason và product_count (nếu có count_selector).
+    """
+    deadline = started_at + budget_s
+    timings: Dict = {"matched_selector": None, "time_to_first_product_ms": None}
+
+    matched = await wait_for_any_selector(page, selectors, _remaining_ms(deadline))
+    if matched:
+        timings["matched_selector"] = matched
+        timings["time_to_first_product_ms"] = round((time.perf_counter() - started_at) * 1000)
+
+    timings["settle_reason"] = await wait_for_settle(page, _remaining_ms(deadline))
+
+    if count_selector:
+        if scroll:
+            timings["product_count"] = await scroll_until_stable(page, count_selector, deadline)
+        else:
+            try:
+                timings["product_count"] = await page.evaluate(
+                    "(sel) => document.querySelectorAll(sel).length", count_selector
+                )
+            except Exception:
+                timings["product_count"] = None
+
+    timings["time_to_settle_ms"] = round((time.perf_counter() - started_at) * 1000)
+    timings["budget_exhausted"] = time.perf_counter() >= deadline
+    return timings
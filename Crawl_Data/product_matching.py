@@ -0,0 +1,351 @@
+"""
+Product Matching - gom cùng một sản phẩm từ nhiều sàn thành một nhóm
+
+Kết quả crawl là list phẳng: "Apple iPhone 15 128GB Chính hãng VN/A" (Lazada),
+"iPhone 15 128GB | Chính hãng" (CellphoneS), "Điện thoại iPhone 15 128GB - Đen"
+(Tiki)... đều là một sản phẩm. Module này:
+  - chuẩn hóa tiêu đề: bỏ dấu, tách brand, model, dung lượng, màu, tình trạng
+    (mới / cũ / refurbished) và các từ thừa ("chính hãng", "VN/A", [Trả góp 0%])
+  - blocking bằng MinHash LSH trên token model: chỉ so các cặp rơi cùng bucket
+    (cùng dung lượng + tình trạng) nên gần tuyến tính thay vì so mọi cặp O(n²)
+  - xác nhận cặp ứng viên: cùng số model và biến thể (Pro / Max / Plus...),
+    Jaccard token >= MATCH_THRESHOLD; gom nhóm bằng union-find
+  - mỗi nhóm có group_id ổn định (hash của brand + model + dung lượng + tình
+    trạng) để lần crawl sau cập nhật đúng nhóm cũ, kèm danh sách offer theo sàn
+  - match_stored_groups gắn nhóm của một lần crawl sau (vd. platform về trễ)
+    vào nhóm đã lưu tương đương theo cùng tiêu chí, kể cả khi key không trùng
+    hẳn (nhóm cũ được gom bằng Jaccard)
+
+Màu không tách nhóm (cùng model khác màu thường cùng giá), màu của từng offer
+được giữ lại trong offer.
+
+Usage:
+    from product_matching import match_products, match_stored_groups
+    groups = match_products(products)
+    groups = match_stored_groups(groups, stored)   # stored: các dòng product_groups
+
+    python product_matching.py results.json     # JSON từ run_all_crawlers / crawl
+"""
+
+import hashlib
+import json
+import os
+import random
+import re
+import sys
+import time
+import unicodedata
+import zlib
+from collections import Counter
+from typing import Dict, List, Optional, Tuple
+
+MATCH_THRESHOLD = float(os.getenv("CRAWL_MATCH_THRESHOLD", "0.6"))
+MINHASH_PERMUTATIONS = int(os.getenv("CRAWL_MINHASH_PERMUTATIONS", "32"))
+LSH_BANDS = int(os.getenv("CRAWL_LSH_BANDS", "16"))
+
+_BRACKETS_RE = re.compile(r"[\[\(\{].*?[\]\)\}]")
+_REGION_RE = re.compile(r"\b(?:vn|ll|za|kh|j|ch)\s*/\s*a\b")
+_RAM_RE = re.compile(r"\b\d+\s*gb\s*ram\b|\bram\s*\d+\s*gb\b")
+_STORAGE_RE = re.compile(r"(\d+)\s*(gb|tb)\b")
+# mạng (5G), % giảm giá / trả góp: không phải số model
+_NOISE_RE = re.compile(r"\b[2345]g\b|\btra gop\b|-?\d+\s*%")
+_TOKEN_RE = re.compile(r"[a-z]+|\d+")
+
+_USED_RE = re.compile(r"\b(?:cu|like\s*new|qua su dung|da su dung|9\d\s*%|2nd|second\s*hand|used)\b")
+_REFURBISHED_RE = re.compile(r"\b(?:refurbished|refurb|tan trang|cpo|renewed)\b")
+
+# Alias (đã bỏ dấu) -> màu chuẩn; cụm nhiều từ được thử trước
+_COLORS = {
+    "titan tu nhien": "natural titanium", "natural titanium": "natural titanium",
+    "titan den": "black titanium", "black titanium": "black titanium",
+    "titan trang": "white titanium", "white titanium": "white titanium",
+    "titan xanh": "blue titanium", "blue titanium": "blue titanium",
+    "titan sa mac": "desert titanium", "desert titanium": "desert titanium",
+    "xanh duong": "blue", "xanh la": "green", "xanh reu": "green", "xanh mint": "mint",
+    "den": "black", "black": "black", "midnight": "midnight",
+    "trang": "white", "white": "white", "starlight": "starlight",
+    "xanh": "blue", "blue": "blue", "green": "green", "mint": "mint",
+    "hong": "pink", "pink": "pink", "do": "red", "red": "red",
+    "vang": "yellow", "yellow": "yellow", "gold": "gold",
+    "tim": "purple", "purple": "purple", "bac": "silver", "silver": "silver",
+    "xam": "gray", "gray": "gray", "grey": "gray", "graphite": "graphite",
+}
+_COLOR_RE = re.compile(r"\b(?:" + "|".join(sorted(map(re.escape, _COLORS), key=len, reverse=True)) + r")\b")
+
+_BRANDS = ("apple", "samsung", "xiaomi", "oppo", "vivo", "realme", "nokia", "asus", "sony", "google",
+           "huawei", "honor", "tecno", "infinix", "nothing", "oneplus", "motorola", "lenovo")
+# Dòng sản phẩm suy ra brand khi tiêu đề không ghi brand
+_LINE_BRANDS = {"iphone": "apple", "ipad": "apple", "macbook": "apple", "airpods": "apple",
+                "galaxy": "samsung", "redmi": "xiaomi", "poco": "xiaomi", "pixel": "google", "reno": "oppo"}
+
+_NOISE = frozenset((
+    "dien", "thoai", "smartphone", "may", "tinh", "bang", "chinh", "hang", "moi", "new", "nguyen", "seal",
+    "fullbox", "box", "quoc", "te", "phien", "ban", "sim", "esim", "lte", "ram", "rom",
+) + _BRANDS)
+# Token phân biệt biến thể: hai tiêu đề phải có cùng tập này mới được gom
+_VARIANT_WORDS = frozenset(("pro", "max", "plus", "mini", "ultra", "lite", "fe", "se", "air", "fold",
+                            "flip", "note", "neo", "prime", "edge", "xl"))
+
+_PRIME = (1 << 61) - 1
+_rng = random.Random(20240601)
+_PERMUTATIONS = [(_rng.randrange(1, _PRIME), _rng.randrange(0, _PRIME)) for _ in range(MINHASH_PERMUTATIONS)]
+
+
+def _fold(text: str) -> str:
+    text = unicodedata.normalize("NFKD", (text or "").casefold().replace("đ", "d"))
+    return "".join(c for c in text if not unicodedata.combining(c))
+
+
+def parse_title(title: str) -> Dict:
+    """
+    Tách các thuộc tính so khớp từ tiêu đề:
+    {"brand", "model": [token], "storage": "128GB"|None, "color", "condition": new|used|refurbished}
+    """
+    text = _REGION_RE.sub(" ", _fold(title))
+    text = _RAM_RE.sub(" ", text)
+
+    storage_gb = [int(n) * (1024 if unit == "tb" else 1) for n, unit in _STORAGE_RE.findall(text)]
+    # nhiều giá trị (8GB/256GB) thì giá trị lớn nhất là bộ nhớ trong
+    storage = None
+    if storage_gb:
+        size = max(storage_gb)
+        storage = f"{size // 1024}TB" if size >= 1024 and size % 1024 == 0 else f"{size}GB"
+    text = _STORAGE_RE.sub(" ", text)
+
+    if _REFURBISHED_RE.search(text):
+        condition = "refurbished"
+    elif _USED_RE.search(text):
+        condition = "used"
+    else:
+        condition = "new"
+    text = _USED_RE.sub(" ", _REFURBISHED_RE.sub(" ", text))
+    # phần trong ngoặc ("[Trả góp 0%]", "(Đen)") chỉ dùng cho dung lượng / tình trạng / màu
+    color_match = _COLOR_RE.search(text)
+    text = _NOISE_RE.sub(" ", _BRACKETS_RE.sub(" ", text))
+
+    color = _COLORS[color_match.group(0)] if color_match else None
+    text = _COLOR_RE.sub(" ", text)
+
+    tokens = _TOKEN_RE.findall(text)
+    brand = next((t for t in tokens if t in _BRANDS), None)
+    if brand is None:
+        brand = next((_LINE_BRANDS[t] for t in tokens if _LINE_BRANDS.get(t)), None)
+
+    model, seen = [], set()
+    for token in tokens:
+        if token not in _NOISE and token not in seen:
+            seen.add(token)
+            model.append(token)
+    return {"brand": brand, "model": model, "storage": storage, "color": color, "condition": condition}
+
+
+def minhash(tokens) -> Tuple[int, ...]:
+    """Chữ ký MinHash (MINHASH_PERMUTATIONS giá trị) của tập token"""
+    bases = [zlib.crc32(t.encode("utf-8")) for t in tokens]
+    if not bases:
+        return ()
+    return tuple(min((a * x + b) % _PRIME for x in bases) for a, b in _PERMUTATIONS)
+
+
+def _jaccard(a: frozenset, b: frozenset) -> float:
+    return len(a & b) / len(a | b) if a or b else 0.0
+
+
+def _features(brand: Optional[str], model: List[str]) -> Dict:
+    tokens = frozenset(model)
+    return {"brand": brand, "tokens": tokens, "numbers": frozenset(t for t in tokens if t.isdigit()),
+            "variants": tokens & _VARIANT_WORDS}
+
+
+def _compatible(a: Dict, b: Dict, threshold: float) -> bool:
+    if a["brand"] and b["brand"] and a["brand"] != b["brand"]:
+        return False
+    if a["numbers"] != b["numbers"] or a["variants"] != b["variants"]:
+        return False
+    return _jaccard(a["tokens"], b["tokens"]) >= threshold
+
+
+class _UnionFind:
+    def __init__(self, size: int):
+        self.parent = list(range(size))
+
+    def find(self, i: int) -> int:
+        while self.parent[i] != i:
+            self.parent[i] = self.parent[self.parent[i]]
+            i = self.parent[i]
+        return i
+
+    def union(self, i: int, j: int):
+        ri, rj = self.find(i), self.find(j)
+        if ri != rj:
+            self.parent[max(ri, rj)] = min(ri, rj)
+
+
+def cluster(parsed: List[Dict], threshold: float = MATCH_THRESHOLD, bands: int = LSH_BANDS) -> List[List[int]]:
+    """Chỉ số các tiêu đề đã parse, gom theo nhóm tương đương (thứ tự theo lần xuất hiện đầu)"""
+    # Tiêu đề chuẩn hóa giống hệt nhau (rất phổ biến giữa các trang kết quả) chỉ cần một node
+    nodes: Dict[str, List[int]] = {}
+    for i, info in enumerate(parsed):
+        nodes.setdefault(group_key(info), []).append(i)
+    keys = list(nodes)
+    infos = [parsed[nodes[key][0]] for key in keys]
+
+    # Số model, biến thể, dung lượng, tình trạng phải khớp tuyệt đối nên nằm luôn
+    # trong khóa block; MinHash chỉ còn phải xử lý phần token mờ còn lại
+    rows = max(1, MINHASH_PERMUTATIONS // max(1, bands))
+    buckets: Dict[Tuple, List[int]] = {}
+    features = []
+    for n, info in enumerate(infos):
+        feature = _features(info["brand"], info["model"])
+        features.append(feature)
+        signature = minhash(info["model"])
+        if not signature:
+            continue
+        block = (info["storage"], info["condition"], feature["numbers"], feature["variants"])
+        for band in range(0, len(signature), rows):
+            buckets.setdefault((block, band, signature[band:band + rows]), []).append(n)
+
+    uf = _UnionFind(len(infos))
+    for members in buckets.values():
+        # so mỗi node với đại diện của các cụm đã có trong bucket thay vì mọi cặp
+        representatives: List[int] = []
+        for n in members:
+            matched = False
+            for r in representatives:
+                if uf.find(n) == uf.find(r) or _compatible(features[n], features[r], threshold):
+                    uf.union(n, r)
+                    matched = True
+            if not matched:
+                representatives.append(n)
+
+    groups: Dict[int, List[int]] = {}
+    for n, key in enumerate(keys):
+        groups.setdefault(uf.find(n), []).extend(nodes[key])
+    return [sorted(members) for members in groups.values()]
+
+
+def group_key(info: Dict) -> str:
+    return "|".join((info["brand"] or "", " ".join(sorted(info["model"])), info["storage"] or "", info["condition"]))
+
+
+def group_id(key: str) -> str:
+    return "grp_" + hashlib.sha1(key.encode("utf-8")).hexdigest()[:12]
+
+
+def _price(value) -> float:
+    try:
+        return float(value or 0)
+    except (TypeError, ValueError):
+        return 0.0
+
+
+def match_products(products: List[Dict], threshold: float = MATCH_THRESHOLD) -> List[Dict]:
+    """
+    Gom sản phẩm (schema của crawler) thành các nhóm:
+    {"group_id", "name", "brand", "model", "storage", "condition", "colors",
+     "min_price", "max_price", "platforms", "offers": [...]}
+    Offer sắp theo giá tăng dần (sản phẩm không có giá ở cuối); nhóm nhiều sàn / nhiều offer đứng trước.
+    """
+    parsed = [parse_title(p.get("name") or p.get("title") or "") for p in products]
+    groups = []
+    for members in cluster(parsed, threshold):
+        keys = Counter(group_key(parsed[i]) for i in members)
+        # tiêu đề đại diện: key phổ biến nhất trong nhóm, tiêu đề ngắn nhất mang key đó
+        best_key = max(keys.items(), key=lambda kv: (kv[1], -len(kv[0])))[0]
+        representative = min((i for i in members if group_key(parsed[i]) == best_key),
+                             key=lambda i: len(products[i].get("name") or products[i].get("title") or ""))
+        info = parsed[representative]
+
+        offers = []
+        for i in members:
+            product = products[i]
+            offers.append({
+                "platform": product.get("platform"),
+                "name": product.get("name") or product.get("title") or "",
+                "price": product.get("price"),
+                "original_price": product.get("original_price"),
+                "seller": product.get("seller"),
+                "rating": product.get("rating"),
+                "review_count": product.get("review_count"),
+                "url": product.get("url") or product.get("link"),
+                "color": parsed[i]["color"],
+            })
+        groups.append(_with_offers({
+            "group_id": group_id(best_key),
+            "name": (products[representative].get("name") or products[representative].get("title") or "").strip(),
+            "brand": info["brand"],
+            "model": " ".join(info["model"]),
+            "storage": info["storage"],
+            "condition": info["condition"],
+        }, offers))
+
+    groups.sort(key=lambda g: (-len(g["platforms"]), -len(g["offers"])))
+    return groups
+
+
+def _with_offers(group: Dict, offers: List[Dict]) -> Dict:
+    """Nhóm kèm offer (sắp theo giá) và các trường tổng hợp từ offer"""
+    offers = sorted(offers, key=lambda o: (_price(o["price"]) <= 0, _price(o["price"])))
+    prices = [_price(o["price"]) for o in offers if _price(o["price"]) > 0]
+    return dict(
+        group,
+        colors=sorted({o["color"] for o in offers if o["color"]}),
+        min_price=min(prices) if prices else None,
+        max_price=max(prices) if prices else None,
+        platforms=sorted({o["platform"] for o in offers if o["platform"]}),
+        offers=offers,
+    )
+
+
+def match_stored_groups(groups: List[Dict], stored: List[Dict], threshold: float = MATCH_THRESHOLD) -> List[Dict]:
+    """
+    Đổi group_id của các nhóm mới (match_products) sang nhóm đã lưu tương đương.
+
+    `stored`: các nhóm đã lưu {"id", "brand", "model", "storage", "condition"}.
+    Nhóm mới có id chưa có trong `stored` được gắn vào nhóm đã lưu cùng dung
+    lượng / tình trạng / số model / biến thể và đủ Jaccard (như khi gom trong
+    cluster), nhóm giống nhất nếu có nhiều; nhiều nhóm mới rơi vào cùng một
+    nhóm đã lưu được gộp offer.
+    """
+    stored_ids = {row["id"] for row in stored}
+    blocks: Dict[Tuple, List[Tuple[str, Dict]]] = {}
+    for row in stored:
+        feature = _features(row["brand"], (row["model"] or "").split())
+        block = (row["storage"], row["condition"], feature["numbers"], feature["variants"])
+        blocks.setdefault(block, []).append((row["id"], feature))
+
+    merged: Dict[str, Dict] = {}
+    for group in groups:
+        target = group["group_id"]
+        if target not in stored_ids:
+            feature = _features(group["brand"], group["model"].split())
+            block = (group["storage"], group["condition"], feature["numbers"], feature["variants"])
+            candidates = [(_jaccard(feature["tokens"], other["tokens"]), stored_id)
+                          for stored_id, other in blocks.get(block, ())
+                          if _compatible(feature, other, threshold)]
+            if candidates:
+                target = max(candidates)[1]
+        if target in merged:
+            merged[target] = _with_offers(merged[target], merged[target]["offers"] + group["offers"])
+        else:
+            merged[target] = dict(group, group_id=target)
+    return list(merged.values())
+
+
+def main():
+    if len(sys.argv) < 2:
+        print("Usage: python product_matching.py results.json")
+        sys.exit(1)
+    with open(sys.argv[1], "r", encoding="utf-8") as f:
+        data = json.load(f)
+    products = data.get("products", []) if isinstance(data, dict) else data
+
+    started = time.perf_counter()
+    groups = match_products(products)
+    elapsed = time.perf_counter() - started
+    print(json.dumps(groups, ensure_ascii=False, indent=2))
+    print(f"{len(products)} sản phẩm -> {len(groups)} nhóm trong {elapsed * 1000:.1f} ms", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
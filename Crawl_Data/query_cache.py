@@ -0,0 +1,194 @@
+"""
+Query Cache - cache kết quả crawl theo query đã chuẩn hóa
+
+Kết quả của từng platform được lưu theo khóa (query đã chuẩn hóa, platform):
+  - Lưu bền trong SQLite (mặc định Crawl_Data/crawl_cache.db, đổi bằng CRAWL_CACHE_DB)
+  - Một LRU trong bộ nhớ đứng trước SQLite cho các query nóng
+  - TTL riêng cho từng platform (CRAWL_CACHE_TTL_<PLATFORM>, giây)
+  - Hết TTL nhưng còn trong cửa sổ stale (CRAWL_CACHE_STALE_SECONDS) thì vẫn
+    trả về ngay, orchestrator làm mới ở nền (stale-while-revalidate)
+
+Việc gộp các request giống nhau thành một lần crawl (single-flight) nằm ở
+crawl_orchestrator vì mọi crawl đều chạy trên event loop của nó.
+"""
+
+import json
+import os
+import re
+import sqlite3
+import threading
+import time
+import unicodedata
+from collections import OrderedDict
+from typing import Dict, List, Optional, Tuple
+
+from crawler_registry import CRAWLERS
+
+
+CACHE_ENABLED = os.getenv("CRAWL_CACHE_ENABLED", "1").lower() not in ("0", "false", "no")
+CACHE_DB_PATH = os.getenv("CRAWL_CACHE_DB", os.path.join(os.path.dirname(os.path.abspath(__file__)), "crawl_cache.db"))
+CACHE_MEMORY_ENTRIES = int(os.getenv("CRAWL_CACHE_MEMORY_ENTRIES", "512"))
+CACHE_STALE_SECONDS = float(os.getenv("CRAWL_CACHE_STALE_SECONDS", "21600"))
+
+# TTL khai báo trong crawler_registry (CRAWL_CACHE_TTL_<PLATFORM>); giá Tiki thay
+# đổi nhanh hơn nên TTL ngắn hơn các trang scrape bằng browser
+CACHE_TTLS = {key: spec.cache_ttl for key, spec in CRAWLERS.items()}
+DEFAULT_CACHE_TTL = 900.0
+
+# Trạng thái của một lần tra cache
+FRESH = "fresh"
+STALE = "stale"
+MISS = "miss"
+
+_NON_WORD_RE = re.compile(r"[^\w]+", re.UNICODE)
+
+
+def normalize_query(query: str) -> str:
+    """'  iPhone 15 Pro,  256GB ' -> 'iphone 15 pro 256gb'"""
+    text = unicodedata.normalize("NFC", query or "").casefold()
+    return " ".join(_NON_WORD_RE.sub(" ", text).split())
+
+
+class CacheEntry:
+    def __init__(self, products: List[Dict], fetched_at: float, timings: Optional[Dict] = None):
+        self.products = products
+        self.fetched_at = fetched_at
+        self.timings = timings or {}
+
+    def age(self, now: Optional[float] = None) -> float:
+        return (now or time.time()) - self.fetched_at
+
+
+class QueryCache:
+    """Cache kết quả crawl theo (query, platform): LRU trong bộ nhớ + SQLite"""
+
+    def __init__(self, db_path: str = CACHE_DB_PATH, memory_entries: int = CACHE_MEMORY_ENTRIES,
+                 ttls: Optional[Dict[str, float]] = None, stale_seconds: float = CACHE_STALE_SECONDS):
+        self.db_path = db_path
+        self.memory_entries = max(0, memory_entries)
+        self.ttls = dict(CACHE_TTLS)
+        if ttls:
+            self.ttls.update(ttls)
+        self.stale_seconds = stale_seconds
+        self._memory: "OrderedDict[Tuple[str, str], CacheEntry]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._conn: Optional[sqlite3.Connection] = None
+        self._stats = {"fresh": 0, "stale": 0, "miss": 0, "memory_hits": 0, "disk_hits": 0, "writes": 0}
+
+    def _connection(self) -> sqlite3.Connection:
+        if self._conn is None:
+            directory = os.path.dirname(self.db_path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            conn = sqlite3.connect(self.db_path, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute('''
+                CREATE TABLE IF NOT EXISTS crawl_cache (
+                    query_key TEXT NOT NULL,
+                    platform TEXT NOT NULL,
+                    products TEXT NOT NULL,
+                    timings TEXT,
+                    fetched_at REAL NOT NULL,
+                    PRIMARY KEY (query_key, platform)
+                )
+            ''')
+            conn.commit()
+            self._conn = conn
+        return self._conn
+
+    def ttl(self, platform: str) -> float:
+        return self.ttls.get(platform, DEFAULT_CACHE_TTL)
+
+    def _remember(self, key: Tuple[str, str], entry: CacheEntry):
+        if not self.memory_entries:
+            return
+        self._memory[key] = entry
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.memory_entries:
+            self._memory.popitem(last=False)
+
+    def _load(self, key: Tuple[str, str]) -> Optional[CacheEntry]:
+        entry = self._memory.get(key)
+        if entry is not None:
+            self._memory.move_to_end(key)
+            self._stats["memory_hits"] += 1
+            return entry
+        try:
+            row = self._connection().execute(
+                "SELECT products, timings, fetched_at FROM crawl_cache WHERE query_key = ? AND platform = ?",
+                key,
+            ).fetchone()
+        except sqlite3.Error as e:
+            print(f"Lỗi khi đọc crawl cache: {e}")
+            return None
+        if row is None:
+            return None
+        entry = CacheEntry(json.loads(row[0]), row[2], json.loads(row[1]) if row[1] else None)
+        self._stats["disk_hits"] += 1
+        self._remember(key, entry)
+        return entry
+
+    def get(self, query: str, platform: str) -> Tuple[str, Optional[CacheEntry]]:
+        """Trả về (FRESH | STALE | MISS, entry)"""
+        key = (normalize_query(query), platform)
+        with self._lock:
+            entry = self._load(key)
+            if entry is None:
+                state = MISS
+            else:
+                age = entry.age()
+                if age <= self.ttl(platform):
+                    state = FRESH
+                elif age <= self.ttl(platform) + self.stale_seconds:
+                    state = STALE
+                else:
+                    state, entry = MISS, None
+            self._stats[state] += 1
+        return state, entry
+
+    def peek(self, query: str, platform: str) -> Optional[CacheEntry]:
+        """Entry mới nhất bất kể tuổi (dùng khi platform đang bị circuit breaker ngắt)"""
+        with self._lock:
+            return self._load((normalize_query(query), platform))
+
+    def put(self, query: str, platform: str, products: List[Dict], timings: Optional[Dict] = None):
+        key = (normalize_query(query), platform)
+        entry = CacheEntry(products, time.time(), timings)
+        with self._lock:
+            self._remember(key, entry)
+            try:
+                conn = self._connection()
+                conn.execute(
+                    "INSERT OR REPLACE INTO crawl_cache (query_key, platform, products, timings, fetched_at) "
+                    "VALUES (?, ?, ?, ?, ?)",
+                    (key[0], key[1], json.dumps(products, ensure_ascii=False),
+                     json.dumps(entry.timings, ensure_ascii=False, default=str), entry.fetched_at),
+                )
+                conn.commit()
+                self._stats["writes"] += 1
+            except sqlite3.Error as e:
+                print(f"Lỗi khi ghi crawl cache: {e}")
+
+    def purge_expired(self) -> int:
+        """Xóa các entry đã quá cả cửa sổ stale khỏi SQLite"""
+        cutoff = time.time() - max(self.ttls.values(), default=DEFAULT_CACHE_TTL) - self.stale_seconds
+        with self._lock:
+            try:
+                cur = self._connection().execute("DELETE FROM crawl_cache WHERE fetched_at < ?", (cutoff,))
+                self._conn.commit()
+                return cur.rowcount
+            except sqlite3.Error as e:
+                print(f"Lỗi khi dọn crawl cache: {e}")
+                return 0
+
+    def stats(self) -> Dict:
+        with self._lock:
+            data = dict(self._stats)
+            data["memory_entries"] = len(self._memory)
+        return data
+
+    def close(self):
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
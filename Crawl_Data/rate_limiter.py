@@ -0,0 +1,95 @@
+"""
+Rate Limiter - token bucket giới hạn tốc độ request tới một host
+
+AsyncTokenBucket dùng trong event loop (vd. phân trang Tiki song song):
+
+    bucket = AsyncTokenBucket(rate=5, burst=5)
+    await bucket.acquire()
+
+TokenBucket / HostRateLimiter dùng từ nhiều thread (vd. crawl_iphones --fetch-pages):
+
+    limiter = HostRateLimiter(rate=4, burst=4)
+    limiter.acquire(url)   # chờ lượt của host trong url
+"""
+
+import asyncio
+import threading
+import time
+from typing import Dict
+from urllib.parse import urlparse
+
+
+class AsyncTokenBucket:
+    """Token bucket cho asyncio: `rate` token/giây, tích tối đa `burst` token"""
+
+    def __init__(self, rate: float, burst: float = None):
+        self.rate = rate
+        self.capacity = max(1.0, burst if burst is not None else rate)
+        self._tokens = self.capacity
+        self._updated_at = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    def _refill(self):
+        now = time.monotonic()
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated_at) * self.rate)
+        self._updated_at = now
+
+    async def acquire(self, tokens: float = 1.0):
+        """Chờ tới khi đủ token; rate <= 0 nghĩa là không giới hạn"""
+        if self.rate <= 0:
+            return
+        async with self._lock:
+            self._refill()
+            while self._tokens < tokens:
+                await asyncio.sleep((tokens - self._tokens) / self.rate)
+                self._refill()
+            self._tokens -= tokens
+
+
+class TokenBucket:
+    """
+    Token bucket thread-safe: `rate` token/giây, tích tối đa `burst` token.
+    Thread gọi acquire giữ chỗ trước (token có thể âm) rồi ngủ ngoài lock, nên
+    nhiều thread chờ cùng lúc vẫn được phục vụ theo thứ tự gọi.
+    """
+
+    def __init__(self, rate: float, burst: float = None):
+        self.rate = rate
+        self.capacity = max(1.0, burst if burst is not None else rate)
+        self._tokens = self.capacity
+        self._updated_at = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _refill(self):
+        now = time.monotonic()
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated_at) * self.rate)
+        self._updated_at = now
+
+    def acquire(self, tokens: float = 1.0):
+        """Chờ tới khi đủ token; rate <= 0 nghĩa là không giới hạn"""
+        if self.rate <= 0:
+            return
+        with self._lock:
+            self._refill()
+            self._tokens -= tokens
+            wait = -self._tokens / self.rate if self._tokens < 0 else 0.0
+        if wait > 0:
+            time.sleep(wait)
+
+
+class HostRateLimiter:
+    """Mỗi host một TokenBucket riêng, để request tới các host khác nhau không chờ nhau"""
+
+    def __init__(self, rate: float, burst: float = None):
+        self.rate = rate
+        self.burst = burst
+        self._buckets: Dict[str, TokenBucket] = {}
+        self._lock = threading.Lock()
+
+    def acquire(self, url: str, tokens: float = 1.0):
+        host = urlparse(url).netloc.lower()
+        with self._lock:
+            bucket = self._buckets.get(host)
+            if bucket is None:
+                bucket = self._buckets[host] = TokenBucket(self.rate, self.burst)
+        bucket.acquire(tokens)
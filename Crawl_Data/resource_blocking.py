@@ -0,0 +1,242 @@
+"""
+Resource Blocking - chặn ảnh, font, media và tracker khi crawl
+
+Crawler chỉ đọc URL ảnh từ thuộc tính `src`/`data-src` nên không cần tải ảnh,
+font, video hay script analytics/quảng cáo. Module này định nghĩa policy chặn
+theo từng platform:
+  - Playwright: route interception trên page/context (`install_route_blocking`)
+  - Selenium: CDP Network.setBlockedURLs (`apply_cdp_blocking`)
+
+Mỗi crawl ghi lại số request bị chặn, số byte ước tính tiết kiệm được, số byte
+thực tải và thời gian tải trang (Navigation/Resource Timing API) để kiểm chứng
+hiệu quả trên crawl node.
+"""
+
+import os
+from typing import Dict, Iterable, List, Optional
+
+
+BLOCKING_ENABLED = os.getenv("CRAWL_BLOCK_RESOURCES", "1").lower() not in ("0", "false", "no")
+
+# Domain analytics/quảng cáo thường gặp trên các sàn Việt Nam
+TRACKER_DOMAINS = (
+    "google-analytics.com",
+    "googletagmanager.com",
+    "googleadservices.com",
+    "googlesyndication.com",
+    "doubleclick.net",
+    "facebook.net",
+    "connect.facebook.com",
+    "analytics.tiktok.com",
+    "hotjar.com",
+    "clarity.ms",
+    "criteo.com",
+    "criteo.net",
+    "adnxs.com",
+    "insider.com",
+    "useinsider.com",
+    "sp.zalo.me",
+    "mc.yandex.ru",
+)
+
+# Kích thước trung bình (byte) để ước tính băng thông tiết kiệm theo loại resource
+AVERAGE_RESOURCE_BYTES = {
+    "image": 45_000,
+    "media": 500_000,
+    "font": 60_000,
+    "script": 35_000,
+    "stylesheet": 25_000,
+    "other": 5_000,
+}
+
+_EXTENSION_TYPES = {
+    "image": ("*.jpg", "*.jpeg", "*.png", "*.gif", "*.webp", "*.avif", "*.svg", "*.ico"),
+    "font": ("*.woff", "*.woff2", "*.ttf", "*.otf", "*.eot"),
+    "media": ("*.mp4", "*.webm", "*.m3u8", "*.mp3", "*.ogg"),
+}
+
+
+class BlockingPolicy:
+    """Những resource type / domain cần chặn, kèm allow-list cho resource cần để render"""
+
+    def __init__(self, block_types: Iterable[str], block_trackers: bool = True,
+                 allow_url_substrings: Iterable[str] = ()):
+        self.block_types = frozenset(block_types)
+        self.block_trackers = block_trackers
+        self.allow_url_substrings = tuple(allow_url_substrings)
+
+    def is_allowed(self, url: str) -> bool:
+        return any(s in url for s in self.allow_url_substrings)
+
+    def block_reason(self, url: str, resource_type: str) -> Optional[str]:
+        """Trả về lý do chặn ('image', 'font', 'tracker', ...) hoặc None nếu cho qua"""
+        if self.is_allowed(url):
+            return None
+        if resource_type in self.block_types:
+            return resource_type
+        if self.block_trackers and any(domain in url for domain in TRACKER_DOMAINS):
+            return "tracker"
+        return None
+
+    def url_patterns(self) -> List[str]:
+        """Pattern cho CDP Network.setBlockedURLs (Selenium không có resource type)"""
+        patterns = []
+        for resource_type in sorted(self.block_types):
+            patterns.extend(_EXTENSION_TYPES.get(resource_type, ()))
+        if self.block_trackers:
+            patterns.extend(f"*{domain}*" for domain in TRACKER_DOMAINS)
+        return patterns
+
+
+POLICIES: Dict[str, BlockingPolicy] = {
+    # Ảnh chỉ cần URL trong DOM; CSS vẫn tải vì innerText phụ thuộc layout
+    "cellphones": BlockingPolicy(block_types={"image", "media", "font"}),
+    "dienthoaivui": BlockingPolicy(block_types={"image", "media", "font"}),
+    # Lazada render danh sách bằng JS của chính nó (lazcdn / alicdn) nên chỉ chặn ảnh/font/media
+    "lazada": BlockingPolicy(block_types={"image", "media", "font"}),
+}
+
+
+def get_policy(platform: str) -> Optional[BlockingPolicy]:
+    """Policy của platform, hoặc None khi tắt chặn bằng CRAWL_BLOCK_RESOURCES=0"""
+    if not BLOCKING_ENABLED:
+        return None
+    return POLICIES.get(platform)
+
+
+class BlockingStats:
+    """Thống kê resource bị chặn / được tải và thời gian tải trang của một crawl"""
+
+    def __init__(self):
+        self.blocked_requests = 0
+        self.blocked_by_type: Dict[str, int] = {}
+        self.allowed_requests = 0
+        self.bytes_loaded: Optional[int] = None
+        self.page_load_ms: Optional[int] = None
+        self.dom_content_loaded_ms: Optional[int] = None
+
+    def record_blocked(self, reason: str, count: int = 1):
+        self.blocked_requests += count
+        self.blocked_by_type[reason] = self.blocked_by_type.get(reason, 0) + count
+
+    @property
+    def estimated_bytes_saved(self) -> int:
+        return sum(
+            AVERAGE_RESOURCE_BYTES.get("script" if reason == "tracker" else reason, AVERAGE_RESOURCE_BYTES["other"]) * count
+            for reason, count in self.blocked_by_type.items()
+        )
+
+    def merge(self, other: "BlockingStats"):
+        """Cộng dồn thống kê của nhiều trang (vd. Lazada crawl 2 trang)"""
+        self.allowed_requests += other.allowed_requests
+        for reason, count in other.blocked_by_type.items():
+            self.record_blocked(reason, count)
+        for attr in ("bytes_loaded", "page_load_ms", "dom_content_loaded_ms"):
+            value = getattr(other, attr)
+            if value is not None:
+                setattr(self, attr, (getattr(self, attr) or 0) + value)
+
+    def summary(self) -> str:
+        loaded_kb = f"{self.bytes_loaded / 1024:.0f} KB" if self.bytes_loaded is not None else "?"
+        load_ms = f"{self.page_load_ms} ms" if self.page_load_ms is not None else "?"
+        return (f"chặn {self.blocked_requests} request (~{self.estimated_bytes_saved / 1024:.0f} KB), "
+                f"đã tải {loaded_kb}, page load {load_ms}")
+
+    def as_dict(self) -> Dict:
+        return {
+            "blocked_requests": self.blocked_requests,
+            "blocked_by_type": dict(self.blocked_by_type),
+            "allowed_requests": self.allowed_requests,
+            "estimated_bytes_saved": self.estimated_bytes_saved,
+            "bytes_loaded": self.bytes_loaded,
+            "page_load_ms": self.page_load_ms,
+            "dom_content_loaded_ms": self.dom_content_loaded_ms,
+        }
+
+
+# Tổng transferSize và mốc thời gian tải trang từ Navigation/Resource Timing API
+_PAGE_METRICS_JS = """
+() => {
+  const nav = performance.getEntriesByType('navigation')[0];
+  const resources = performance.getEntriesByType('resource');
+  let bytes = nav ? (nav.transferSize || 0) : 0;
+  for (const r of resources) bytes += r.transferSize || 0;
+  const unloadedImages = Array.from(document.images)
+    .filter((img) => img.currentSrc && img.complete && img.naturalWidth === 0).length;
+  return {
+    bytes,
+    load: nav && nav.loadEventEnd ? nav.loadEventEnd : (nav ? nav.duration : null),
+    dcl: nav ? nav.domContentLoadedEventEnd : null,
+    unloadedImages,
+  };
+}
+"""
+
+
+def _apply_page_metrics(stats: BlockingStats, data: Optional[Dict]):
+    if not data:
+        return
+    stats.bytes_loaded = int(data.get("bytes") or 0)
+    if data.get("load"):
+        stats.page_load_ms = round(data["load"])
+    if data.get("dcl"):
+        stats.dom_content_loaded_ms = round(data["dcl"])
+
+
+async def install_route_blocking(target, policy: Optional[BlockingPolicy]) -> BlockingStats:
+    """Cài route interception trên Playwright page/context theo policy; trả về stats sẽ được cập nhật"""
+    stats = BlockingStats()
+    if policy is None:
+        return stats
+
+    async def _handle(route):
+        request = route.request
+        reason = policy.block_reason(request.url, request.resource_type)
+        if reason is None:
+            stats.allowed_requests += 1
+            await route.continue_()
+        else:
+            stats.record_blocked(reason)
+            await route.abort()
+
+    await target.route("**/*", _handle)
+    return stats
+
+
+async def collect_page_metrics(page, stats: BlockingStats) -> BlockingStats:
+    """Đọc byte đã tải và thời gian tải trang của Playwright page vào stats"""
+    try:
+        _apply_page_metrics(stats, await page.evaluate(_PAGE_METRICS_JS))
+    except Exception:
+        pass
+    return stats
+
+
+def apply_cdp_blocking(driver, policy: Optional[BlockingPolicy]):
+    """Bật CDP Network.setBlockedURLs cho Selenium Chrome driver theo policy"""
+    if policy is None:
+        return
+    try:
+        driver.execute_cdp_cmd("Network.enable", {})
+        driver.execute_cdp_cmd("Network.setBlockedURLs", {"urls": policy.url_patterns()})
+    except Exception as e:
+        print(f"Không thể bật chặn resource qua CDP: {e}")
+
+
+def collect_driver_metrics(driver, policy: Optional[BlockingPolicy]) -> BlockingStats:
+    """Thống kê của trang hiện tại trong Selenium driver.
+
+    CDP không báo lại request bị chặn nên số ảnh bị chặn được suy ra từ các
+    <img> có src nhưng không tải được.
+    """
+    stats = BlockingStats()
+    try:
+        data = driver.execute_script("return (" + _PAGE_METRICS_JS + ")()")
+    except Exception:
+        return stats
+    _apply_page_metrics(stats, data)
+    if policy is not None and "image" in policy.block_types and data:
+        unloaded = int(data.get("unloadedImages") or 0)
+        if unloaded:
+            stats.record_blocked("image", unloaded)
+    return stats
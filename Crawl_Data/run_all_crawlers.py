@@ -4,125 +4,116 @@ Run All Crawlers - Unified Product Crawler
 Công cụ chạy đồng thời tất cả crawler và tổng hợp kết quả
 """
 
-import asyncio
 import json
+import os
 import time
-from concurrent.futures import ThreadPoolExecutor, as_completed
-from typing import List, Dict
+from typing import Dict, Iterator, List, Tuple
 from datetime import datetime
 
-# Import các crawler modules
-from crawl_tiki_product import crawl_tiki_product
-from lazada_crawler_complete import LazadaCrawler
-from scrape_cellphones_playwright import scrape_cellphones_products
-from scrape_dienthoaivui_playwright_search import scrape_dienthoaivui_products
+# Các crawler được khai báo trong crawler_registry
+from crawler_registry import get_crawler
+from crawl_orchestrator import get_orchestrator
+from http_cache import cache_stats as http_cache_stats
 
 
-def run_tiki_crawler(product_name: str) -> List[Dict]:
-    """Chạy Tiki crawler"""
-    try:
-        print("Bắt đầu crawl từ Tiki...")
-        return crawl_tiki_product(product_name)
-    except Exception as e:
-        print(f"Lỗi khi crawl từ Tiki: {e}")
-        return []
+# Số platform có sản phẩm cần đợi trước khi trả kết quả sớm cho chat layer
+CRAWL_QUORUM = int(os.getenv("CRAWL_QUORUM", "2"))
+# Quá hạn này (giây) thì trả về những gì đã có, miễn là đã có ít nhất một sản phẩm
+CRAWL_QUORUM_DEADLINE = float(os.getenv("CRAWL_QUORUM_DEADLINE_SECONDS", "10"))
 
 
-def run_lazada_crawler(product_name: str) -> List[Dict]:
-    """Chạy Lazada crawler"""
+def run_crawler(platform: str, product_name: str) -> List[Dict]:
+    """Chạy (blocking) crawler của một platform trong registry, lỗi thì trả về list rỗng"""
+    spec = get_crawler(platform)
     try:
-        print("Bắt đầu crawl từ Lazada...")
-        crawler = LazadaCrawler()
-        return crawler.crawl_lazada_products(product_name)
+        print(f"Bắt đầu crawl từ {spec.display_name}...")
+        return spec.normalize(spec.sync_crawl(product_name))
     except Exception as e:
-        print(f"Lỗi khi crawl từ Lazada: {e}")
+        print(f"Lỗi khi crawl từ {spec.display_name}: {e}")
         return []
 
 
-def run_cellphones_crawler(product_name: str) -> List[Dict]:
-    """Chạy CellphoneS crawler"""
-    try:
-        print("Bắt đầu crawl từ CellphoneS...")
-        return scrape_cellphones_products(product_name)
-    except Exception as e:
-        print(f"Lỗi khi crawl từ CellphoneS: {e}")
-        return []
+def run_all_crawlers_parallel(product_name: str, use_cache: bool = True) -> Dict:
+    """
+    Chạy tất cả crawler đồng thời và tổng hợp kết quả
 
+    Việc crawl được giao cho asyncio orchestrator dùng chung (crawl_orchestrator),
+    nên nhiều lời gọi đồng thời chia sẻ một event loop, một browser và ngân sách
+    concurrency theo từng platform thay vì mỗi lời gọi tự tạo 4 thread.
+    Kết quả đi qua query cache của orchestrator trừ khi use_cache=False.
+    """
+    orchestrator = get_orchestrator()
+    summary = orchestrator.run(orchestrator.crawl(product_name, use_cache=use_cache))
 
-def run_dienthoaivui_crawler(product_name: str) -> List[Dict]:
-    """Chạy Điện Thoại Vui crawler"""
-    try:
-        print("Bắt đầu crawl từ Điện Thoại Vui...")
-        return scrape_dienthoaivui_products(product_name)
-    except Exception as e:
-        print(f"Lỗi khi crawl từ Điện Thoại Vui: {e}")
-        return []
+    print("Hoàn thành crawl tất cả trang web!")
+    print(f"Tổng số sản phẩm tìm thấy: {summary['total_products']}")
+    print(f"Thời gian thực hiện: {summary['execution_time_seconds']:.2f} giây")
+
+    return summary
 
 
-def run_all_crawlers_parallel(product_name: str) -> Dict:
+def stream_all_crawlers(product_name: str, use_cache: bool = True) -> Iterator[Dict]:
     """
-    Chạy tất cả crawler đồng thời và tổng hợp kết quả
+    Yield kết quả của từng platform ngay khi platform đó xong:
+    {"platform", "crawler", "count", "products", "timings"[, "error"]}
     """
-    start_time = time.time()
-    
-    # Danh sách các crawler functions
-    crawlers = [
-        ("Tiki", run_tiki_crawler),
-        ("Lazada", run_lazada_crawler),
-        ("CellphoneS", run_cellphones_crawler),
-        ("Điện Thoại Vui", run_dienthoaivui_crawler)
-    ]
-    
-    all_products = []
-    crawler_results = {}
-    
-    print(f"Bắt đầu crawl sản phẩm '{product_name}' từ {len(crawlers)} trang web...")
-    
-    # Chạy đồng thời tất cả crawler
-    with ThreadPoolExecutor(max_workers=4) as executor:
-        # Submit tất cả tasks
-        future_to_crawler = {
-            executor.submit(crawler_func, product_name): name 
-            for name, crawler_func in crawlers
-        }
-        
-        # Thu thập kết quả
-        for future in as_completed(future_to_crawler):
-            crawler_name = future_to_crawler[future]
-            try:
-                result = future.result()
-                crawler_results[crawler_name] = {
-                    "count": len(result),
-                    "products": result
-                }
-                all_products.extend(result)
-                print(f"Hoàn thành crawl từ {crawler_name}: {len(result)} sản phẩm")
-            except Exception as e:
-                print(f"Lỗi khi crawl từ {crawler_name}: {e}")
-                crawler_results[crawler_name] = {
-                    "count": 0,
-                    "products": [],
-                    "error": str(e)
-                }
-    
-    end_time = time.time()
-    total_time = end_time - start_time
-    
-    # Tạo báo cáo tổng hợp
-    summary = {
-        "search_query": product_name,
-        "timestamp": datetime.now().isoformat(),
-        "total_products": len(all_products),
-        "execution_time_seconds": round(total_time, 2),
-        "crawler_results": crawler_results,
-        "products": all_products
+    return iter(get_orchestrator().stream(product_name, use_cache=use_cache))
+
+
+def crawl_all_platforms_partial(product_name: str, quorum: int = CRAWL_QUORUM,
+                                deadline_seconds: float = CRAWL_QUORUM_DEADLINE) -> Tuple[List[Dict], Iterator[Dict]]:
+    """
+    Crawl tất cả platform nhưng trả về sớm khi đã có `quorum` platform có sản phẩm,
+    hoặc khi quá `deadline_seconds` và đã có ít nhất một sản phẩm.
+
+    Trả về (sản phẩm đã có, iterator các kết quả platform đến muộn) để caller
+    xử lý ngay phần đã có và gộp phần còn lại sau.
+    """
+    result_stream = get_orchestrator().stream(product_name)
+    deadline = time.monotonic() + deadline_seconds
+    products: List[Dict] = []
+    platforms_with_products = 0
+
+    while platforms_with_products < quorum:
+        remaining = deadline - time.monotonic()
+        if products and remaining <= 0:
+            break
+        try:
+            # Chưa có sản phẩm nào thì tiếp tục chờ quá deadline
+            event = result_stream.next(timeout=remaining if remaining > 0 else None)
+        except StopIteration:
+            break
+        if event is None:
+            continue
+        if event["products"]:
+            platforms_with_products += 1
+            products.extend(event["products"])
+
+    if not result_stream.finished:
+        print(f"Trả về sớm {len(products)} sản phẩm từ {platforms_with_products} trang web, phần còn lại sẽ được gộp sau")
+    return products, iter(result_stream)
+
+
+def warm_up_crawlers():
+    """Khởi động sẵn browser pool để crawl đầu tiên không phải chờ spawn Chromium"""
+    try:
+        get_orchestrator().warm_up()
+    except Exception as e:
+        print(f"Lỗi khi khởi động sẵn crawler: {e}")
+
+
+def crawler_status() -> Dict:
+    """Trạng thái circuit breaker, cache và các pool của crawler cho operator"""
+    orchestrator = get_orchestrator()
+    return {
+        "crawlers": orchestrator.registry_stats(),
+        "breakers": orchestrator.breaker_stats(),
+        "cache": orchestrator.cache_stats(),
+        "http": orchestrator.http_stats(),
+        "http_cache": http_cache_stats(),
+        "browser_pool": orchestrator.browser_pool_stats(),
+        "driver_pool": orchestrator.driver_pool_stats(),
     }
-    
-    print("Hoàn thành crawl tất cả trang web!")
-    print(f"Tổng số sản phẩm tìm thấy: {len(all_products)}")
-    print(f"Thời gian thực hiện: {total_time:.2f} giây")
-    
-    return summary
 
 
 def save_results_to_file(results: Dict, product_name: str) -> str:
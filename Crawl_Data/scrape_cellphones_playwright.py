@@ -16,90 +16,112 @@ import json
 from urllib.parse import urljoin
 import sys
 import asyncio
-from typing import List, Dict
+import time
+from typing import List, Dict, Optional
 from datetime import datetime
 
+try:
+    from normalization import find_price, find_rating, find_review_count, find_sold_count, parse_count, parse_price, parse_rating
+    from page_readiness import ready_budget, wait_until_ready
+    from resource_blocking import collect_page_metrics, get_policy, install_route_blocking
+except ImportError:
+    from Crawl_Data.normalization import find_price, find_rating, find_review_count, find_sold_count, parse_count, parse_price, parse_rating
+    from Crawl_Data.page_readiness import ready_budget, wait_until_ready
+    from Crawl_Data.resource_blocking import collect_page_metrics, get_policy, install_route_blocking
+
 # Removed logger dependencies
 
 # Note: on Windows the default event loop may not support subprocesses used by
 # Playwright. Ensure the ProactorEventLoopPolicy is used when running on
 # Windows so asyncio.create_subprocess_exec is implemented.
-# We import Playwright inside the `scrape` function to avoid import-time side
+# We import Playwright inside `scrape_async` to avoid import-time side
 # effects when the module is imported but Playwright isn't available.
 
 
+def _to_products(raw_results: List[Dict]) -> List[Dict]:
+    """Chuyển kết quả thô của `scrape` sang format giống crawl_tiki_product (tối đa 5 sản phẩm)"""
+    products = []
+    current_time = datetime.now().isoformat()
+
+    for idx, item in enumerate(raw_results[:5], 1):  # Đảm bảo chỉ lấy 5 sản phẩm
+        if not item.get('title'):
+            continue
+
+        price = parse_price(item.get('price'))
+
+        # Tạo unique product ID
+        product_id = f"cellphones_{int(datetime.now().timestamp())}_{idx}"
+
+        # Tạo product dict với format giống crawl_tiki_product
+        product = {
+            "id": product_id,
+            "name": item.get('title', '').strip(),
+            "price": price,
+            "original_price": price,
+            "discount": "Không giảm giá",
+            "seller": "CellphoneS",
+            "rating": f"{item.get('rating', 0.0):.1f}",
+            "review_count": item.get('review_count', 0),
+            "url": item.get('url', ''),
+            "timestamp": current_time,
+            "platform": "cellphones",
+            "sold_count": item.get('sold_count', 0)
+        }
+
+        # Thêm thông tin ảnh nếu có
+        if item.get('image'):
+            product["image"] = item.get('image')
+
+        products.append(product)
+
+    # Đảm bảo chỉ trả về tối đa 5 sản phẩm
+    products = products[:5]
+
+    if products:
+        print(f"Tìm thấy {len(products)} sản phẩm từ CellphoneS")
+    else:
+        print("Không tìm thấy sản phẩm nào từ CellphoneS")
+
+    return products
+
+
+def _search_url(product_name: str) -> str:
+    return f"https://cellphones.com.vn/catalogsearch/result?q={product_name}"
+
+
 def scrape_cellphones_products(product_name: str) -> List[Dict]:
     """
     Crawl sản phẩm từ CellphoneS và trả về list dict với format giống crawl_tiki_product
     Giới hạn chỉ lấy 5 sản phẩm
     """
     try:
-        search_url = f"https://cellphones.com.vn/catalogsearch/result?q={product_name}"
-        raw_results = scrape(search_url, limit=5)  # Giới hạn 5 sản phẩm
-        
-        products = []
-        current_time = datetime.now().isoformat()
-        
-        for idx, item in enumerate(raw_results[:5], 1):  # Đảm bảo chỉ lấy 5 sản phẩm
-            if not item.get('title'):
-                continue
-            
-            # Xử lý giá
-            price = item.get('price', 0)
-            if isinstance(price, str):
-                # Trích xuất số từ string
-                import re
-                price_numbers = re.findall(r'[\d,\.]+', price.replace('₫', '').replace('đ', ''))
-                if price_numbers:
-                    try:
-                        price_str = price_numbers[0].replace(',', '').replace('.', '')
-                        price = int(price_str)
-                    except (ValueError, IndexError):
-                        price = 0
-            
-            # Tạo unique product ID
-            product_id = f"cellphones_{int(datetime.now().timestamp())}_{idx}"
-            
-            # Tạo product dict với format giống crawl_tiki_product
-            product = {
-                "id": product_id,
-                "name": item.get('title', '').strip(),
-                "price": price or 0,
-                "original_price": price or 0,
-                "discount": "Không giảm giá",
-                "seller": "CellphoneS",
-                "rating": f"{item.get('rating', 0.0):.1f}",
-                "review_count": item.get('review_count', 0),
-                "url": item.get('url', ''),
-                "timestamp": current_time,
-                "platform": "cellphones",
-                "sold_count": item.get('sold_count', "0")
-            }
-            
-            # Thêm thông tin ảnh nếu có
-            if item.get('image'):
-                product["image"] = item.get('image')
-            
-            products.append(product)
-        
-        # Đảm bảo chỉ trả về tối đa 5 sản phẩm
-        products = products[:5]
-        
-        if products:
-            print(f"Tìm thấy {len(products)} sản phẩm từ CellphoneS")
-        else:
-            print("Không tìm thấy sản phẩm nào từ CellphoneS")
-        
-        return products
-        
+        raw_results = scrape(_search_url(product_name), limit=5)  # Giới hạn 5 sản phẩm
+        return _to_products(raw_results)
     except Exception as e:
         print(f"Lỗi khi crawl dữ liệu từ CellphoneS: {e}")
         return []
 
 
-def scrape(search_url, limit=None):
-    results = []
+async def scrape_cellphones_products_async(product_name: str, context=None,
+                                           metrics: Optional[Dict] = None) -> List[Dict]:
+    """Async variant of scrape_cellphones_products.
+
+    `context` is an optional Playwright BrowserContext owned by the caller
+    (the crawl orchestrator); a private browser is launched otherwise.
+    Page readiness timings are written into `metrics` when given. Errors are
+    raised (not turned into an empty list) so the orchestrator's circuit
+    breaker counts them.
+    """
+    try:
+        raw_results = await scrape_async(_search_url(product_name), limit=5, context=context, metrics=metrics)
+        return _to_products(raw_results)
+    except Exception as e:
+        print(f"Lỗi khi crawl dữ liệu từ CellphoneS: {e}")
+        raise
 
+
+def scrape(search_url, limit=None):
+    """Blocking wrapper around `scrape_async` for CLI and thread callers."""
     # On Windows ensure Proactor event loop policy so subprocess support exists.
     if sys.platform.startswith("win"):
         try:
@@ -107,212 +129,183 @@ def scrape(search_url, limit=None):
         except Exception:
             # If setting policy fails, continue and let Playwright raise a clearer error
             pass
+    return asyncio.run(scrape_async(search_url, limit=limit))
+
+
+async def scrape_async(search_url, limit=None, context=None, metrics=None):
+    """Render `search_url` and extract product items.
+
+    When `context` is given a new page is opened in it and closed afterwards;
+    the context (and its browser) stay owned by the caller. Otherwise a
+    private Chromium is launched for this call only.
+    """
+    if context is not None:
+        page = await context.new_page()
+        try:
+            return await _extract(page, search_url, limit, metrics)
+        finally:
+            await page.close()
 
     # Import Playwright here to delay heavy imports and avoid failing at module
     # import time in environments without Playwright installed.
-    from playwright.sync_api import sync_playwright
-
-    with sync_playwright() as p:
-        browser = p.chromium.launch(headless=True)
-        page = browser.new_page()
-        page.goto(search_url, timeout=60000)
-
-        # Wait for some product-like elements to appear. Try several selectors.
-        selectors = [".product-item", "a.product-item-link", "div.product-item-info", ".product-card"]
-        found = False
-        for sel in selectors:
-            try:
-                page.wait_for_selector(sel, timeout=3000)
-                found = True
+    from playwright.async_api import async_playwright
+
+    async with async_playwright() as p:
+        browser = await p.chromium.launch(headless=True)
+        try:
+            page = await browser.new_page()
+            return await _extract(page, search_url, limit, metrics)
+        finally:
+            await browser.close()
+
+
+async def _extract(page, search_url, limit=None, metrics=None):
+    results = []
+    # images/fonts/media and trackers are not needed to read the product list
+    resource_stats = await install_route_blocking(page, get_policy("cellphones"))
+    started_at = time.perf_counter()
+    await page.goto(search_url, timeout=60000, wait_until="domcontentloaded")
+
+    # Race all product-like selectors at once, then wait for network idle or a
+    # quiet DOM, all within the platform's readiness budget.
+    selectors = [".product-item", "a.product-item-link", "div.product-item-info", ".product-card"]
+    item_selectors = ['.product-item', 'div.product-item-info', '.product-card', '.product-item-wrap']
+    timings = await wait_until_ready(page, selectors, started_at, ready_budget("cellphones"),
+                                     count_selector=", ".join(item_selectors))
+    await collect_page_metrics(page, resource_stats)
+    print(f"Resources: {resource_stats.summary()}")
+    if metrics is not None:
+        metrics.update(timings)
+        metrics["resources"] = resource_stats.as_dict()
+
+    # If none found, still proceed and try to collect anchors
+    # Prefer selecting whole product items and then extracting details inside each item
+    items = []
+    for sel in item_selectors:
+        items = await page.query_selector_all(sel)
+        if items:
+            break
+
+    # fallback: anchors that look like product links
+    if not items:
+        anchors = await page.query_selector_all('a.product-item-link, a[href$=".html"]')
+        for a in anchors:
+            if limit is not None and len(results) >= limit:
                 break
-            except Exception:
+            href = await a.get_attribute('href')
+            if not href:
                 continue
-
-        # If none found, still proceed and try to collect anchors
-        # Prefer selecting whole product items and then extracting details inside each item
-        item_selectors = ['.product-item', 'div.product-item-info', '.product-card', '.product-item-wrap']
-        items = []
-        for sel in item_selectors:
-            items = page.query_selector_all(sel)
-            if items:
+            product_url = urljoin(search_url, href)
+            title_raw = (await a.inner_text() or '')
+            title = _clean_title(title_raw)
+            img = None
+            img_el = await a.query_selector('img')
+            if img_el:
+                src = await img_el.get_attribute('src')
+                if src:
+                    img = urljoin(search_url, src)
+            # price not available in fallback anchors
+            results.append({
+                'title': title, 
+                'url': product_url, 
+                'price': None, 
+                'image': img,
+                'rating': 0.0,
+                'review_count': 0,
+                'sold_count': "0"
+            })
+    else:
+        for item in items:
+            if limit is not None and len(results) >= limit:
                 break
-
-        # fallback: anchors that look like product links
-        if not items:
-            anchors = page.query_selector_all('a.product-item-link, a[href$=".html"]')
-            for a in anchors:
-                if limit is not None and len(results) >= limit:
-                    break
-                href = a.get_attribute('href')
-                if not href:
-                    continue
-                product_url = urljoin(search_url, href)
-                title_raw = (a.inner_text() or '')
+            a = await item.query_selector('a.product-item-link') or await item.query_selector('a[href]')
+            if not a:
+                continue
+            href = await a.get_attribute('href')
+            if not href:
+                continue
+            product_url = urljoin(search_url, href)
+            title_raw = (await a.inner_text() or '')
+            if title_raw.strip():
                 title = _clean_title(title_raw)
-                img = None
-                img_el = a.query_selector('img')
-                if item.get('image'):
-                    img = urljoin(search_url, item.get('image'))
-                # price not available in fallback anchors
-                results.append({
-                    'title': title, 
-                    'url': product_url, 
-                    'price': None, 
-                    'image': img,
-                    'rating': 0.0,
-                    'review_count': 0,
-                    'sold_count': "0"
-                })
-        else:
-            for item in items:
-                if limit is not None and len(results) >= limit:
-                    break
-                a = item.query_selector('a.product-item-link') or item.query_selector('a[href]')
-                if not a:
-                    continue
-                href = a.get_attribute('href')
-                if not href:
-                    continue
-                product_url = urljoin(search_url, href)
-                title_raw = (a.inner_text() or '')
-                if title_raw.strip():
-                    title = _clean_title(title_raw)
-                else:
-                    title = _clean_title(item.get_attribute('data-name') or '')
-
-                # image
-                img = None
-                img_el = item.query_selector('img')
-                if img_el and img_el.get_attribute('src'):
-                    img = urljoin(search_url, img_el.get_attribute('src'))
-
-                # price
-                price = None
-                for ps in ['.price', '.product-price', '.price-final_price', '.price-box', '[data-price]']:
-                    node = item.query_selector(ps)
-                    if node:
-                        text = (node.get_attribute('data-price') or node.inner_text() or '').strip()
-                        cleaned = ''.join(ch for ch in text if ch.isdigit() or ch in ',.')
-                        if cleaned:
-                            try:
-                                price = float(cleaned.replace(',', ''))
-                            except Exception:
-                                price = None
-                            break
-                
-                # rating và review count
-                rating = 0.0
-                review_count = 0
-                sold_count = "0"
-                
-                # Tìm rating trong item
-                rating_selectors = ['.rating', '.star-rating', '.review-star', '.rating-average', '[data-rating]']
-                for rs in rating_selectors:
-                    rating_node = item.query_selector(rs)
-                    if rating_node:
-                        rating_text = rating_node.inner_text() or rating_node.get_attribute('data-rating') or ''
-                        import re
-                        rating_match = re.search(r'(\d+\.?\d*)', rating_text)
-                        if rating_match:
-                            try:
-                                rating_val = float(rating_match.group(1))
-                                if 0 <= rating_val <= 5:
-                                    rating = rating_val
-                                    break
-                            except ValueError:
-                                pass
-                
-                # Tìm review count trong item
-                review_selectors = ['.review-count', '.reviews', '.comment-count', '.rating-count']
-                for rs in review_selectors:
-                    review_node = item.query_selector(rs)
-                    if review_node:
-                        review_text = review_node.inner_text() or ''
-                        import re
-                        review_match = re.search(r'(\d+)', review_text)
-                        if review_match:
-                            try:
-                                review_count = int(review_match.group(1))
-                                break
-                            except ValueError:
-                                pass
-                
-                # Tìm sold count trong item
-                sold_selectors = ['.sold', '.sold-count', '.purchase-count', '.buy-count']
-                for ss in sold_selectors:
-                    sold_node = item.query_selector(ss)
-                    if sold_node:
-                        sold_text = sold_node.inner_text() or ''
-                        # Lấy text chứa "đã bán" hoặc "sold"
-                        import re
-                        sold_match = re.search(r'(\d+[k\d,\.]*)\s*(?:đã bán|sold)', sold_text, re.IGNORECASE)
-                        if sold_match:
-                            sold_count = sold_match.group(1)
-                            break
-                
-                # fallback: try to extract first number with currency from whole item text
-                if price is None:
-                    import re
-                    whole = (item.inner_text() or '')
-                    # look for patterns like 1.090.000đ or 740.000đ or 1290000
-                    m = re.search(r"(\d{1,3}(?:[\.,]\d{3})+(?:[\.,]\d+)?|\d{4,})\s*(?:đ|₫|VND|vnđ)?", whole)
-                    if m:
-                        num = m.group(1)
-                        num_clean = num.replace('.', '').replace(',', '')
-                        try:
-                            price = float(num_clean)
-                        except Exception:
-                            price = None
-                            
-                # Fallback: tìm rating/review trong toàn bộ text của item
-                if rating == 0.0 or review_count == 0:
-                    whole_text = item.inner_text() or ''
-                    if rating == 0.0:
-                        import re
-                        rating_patterns = [
-                            r'(\d+\.?\d*)\s*/?\s*5\s*sao',
-                            r'(\d+\.?\d*)\s*sao',
-                            r'Rating:\s*(\d+\.?\d*)',
-                            r'(\d+\.?\d*)\s*★'
-                        ]
-                        for pattern in rating_patterns:
-                            rating_match = re.search(pattern, whole_text, re.IGNORECASE)
-                            if rating_match:
-                                try:
-                                    rating_val = float(rating_match.group(1))
-                                    if 0 <= rating_val <= 5:
-                                        rating = rating_val
-                                        break
-                                except ValueError:
-                                    pass
-                    
-                    if review_count == 0:
-                        import re
-                        review_patterns = [
-                            r'(\d+)\s*(?:đánh giá|review|nhận xét)',
-                            r'\((\d+)\s*(?:đánh giá|review)\)',
-                            r'(\d+)\s*comment'
-                        ]
-                        for pattern in review_patterns:
-                            review_match = re.search(pattern, whole_text, re.IGNORECASE)
-                            if review_match:
-                                try:
-                                    review_count = int(review_match.group(1))
-                                    break
-                                except ValueError:
-                                    pass
-                                    
-                results.append({
-                    'title': title, 
-                    'url': product_url, 
-                    'price': price, 
-                    'image': img,
-                    'rating': rating,
-                    'review_count': review_count,
-                    'sold_count': sold_count
-                })
-
-        browser.close()
+            else:
+                title = _clean_title(await item.get_attribute('data-name') or '')
+
+            # image
+            img = None
+            img_el = await item.query_selector('img')
+            if img_el:
+                src = await img_el.get_attribute('src')
+                if src:
+                    img = urljoin(search_url, src)
+
+            # price
+            price = None
+            for ps in ['.price', '.product-price', '.price-final_price', '.price-box', '[data-price]']:
+                node = await item.query_selector(ps)
+                if node:
+                    text = (await node.get_attribute('data-price') or await node.inner_text() or '').strip()
+                    price = parse_price(text) or None
+                    if price:
+                        break
+            
+            # rating và review count
+            rating = 0.0
+            review_count = 0
+            sold_count = 0
+            
+            # Tìm rating trong item
+            rating_selectors = ['.rating', '.star-rating', '.review-star', '.rating-average', '[data-rating]']
+            for rs in rating_selectors:
+                rating_node = await item.query_selector(rs)
+                if rating_node:
+                    rating_text = await rating_node.inner_text() or await rating_node.get_attribute('data-rating') or ''
+                    rating = parse_rating(rating_text)
+                    if rating:
+                        break
+            
+            # Tìm review count trong item
+            review_selectors = ['.review-count', '.reviews', '.comment-count', '.rating-count']
+            for rs in review_selectors:
+                review_node = await item.query_selector(rs)
+                if review_node:
+                    review_count = parse_count(await review_node.inner_text() or '')
+                    if review_count:
+                        break
+            
+            # Tìm sold count trong item
+            sold_selectors = ['.sold', '.sold-count', '.purchase-count', '.buy-count']
+            for ss in sold_selectors:
+                sold_node = await item.query_selector(ss)
+                if sold_node:
+                    # Chỉ nhận text có "đã bán" / "sold"
+                    sold_count = find_sold_count(await sold_node.inner_text() or '')
+                    if sold_count:
+                        break
+            
+            # fallback: try to extract first number with currency from whole item text
+            if price is None:
+                # look for patterns like 1.090.000đ or 740.000đ or 1290000
+                price = find_price(await item.inner_text() or '')
+
+            # Fallback: tìm rating/review trong toàn bộ text của item
+            if rating == 0.0 or review_count == 0:
+                whole_text = await item.inner_text() or ''
+                if rating == 0.0:
+                    rating = find_rating(whole_text)
+                if review_count == 0:
+                    review_count = find_review_count(whole_text)
+
+            results.append({
+                'title': title, 
+                'url': product_url, 
+                'price': price, 
+                'image': img,
+                'rating': rating,
+                'review_count': review_count,
+                'sold_count': sold_count
+            })
+
     return results
 
 def _clean_title(raw: str) -> str:
@@ -8,83 +8,214 @@ to anchors that have nearby price/image information.
 
 Usage:
   python scripts/scrape_dienthoaivui_playwright_search.py --url "https://dienthoaivui.com.vn/tim-kiem?_tim_kiem=air" --limit 10
+
+The anchor heuristic runs as a single in-page script by default; pass
+`--extract-mode python` (or set DTV_EXTRACT_MODE=python) to run the older
+per-anchor Python loop and compare the timings printed for each mode.
 """
 import argparse
 import json
+import os
 import sys
 import re
+import time
 from urllib.parse import urljoin
-from typing import List, Dict
+from typing import List, Dict, Optional
 from datetime import datetime
 
+try:
+    from normalization import find_price, find_rating, find_review_count, find_sold_count, parse_price
+    from page_readiness import ready_budget, wait_for_any_selector, wait_until_ready
+    from resource_blocking import collect_page_metrics, get_policy, install_route_blocking
+except ImportError:
+    from Crawl_Data.normalization import find_price, find_rating, find_review_count, find_sold_count, parse_price
+    from Crawl_Data.page_readiness import ready_budget, wait_for_any_selector, wait_until_ready
+    from Crawl_Data.resource_blocking import collect_page_metrics, get_policy, install_route_blocking
+
+# Cách chạy anchor heuristic: 'script' (một lần page.evaluate) hoặc 'python'
+# (mỗi anchor vài IPC round trip, giữ lại để benchmark so sánh)
+EXTRACT_MODE = os.getenv("DTV_EXTRACT_MODE", "script")
+
+# skip obvious non-product paths (articles, blog, booking)
+_SKIP_PATHS = ('/tin-tuc', '/tin-tuc/', '/suachua', '/dat-lich', '/dich-vu', '/uu-dai')
+_BADGE_WORDS = ('giảm', 'bảo hành', 'sắp về', 'smember', 'sale', '%')
+_MIN_PRODUCT_IMAGE_SIZE = 150
+# Selectors that signal the first rendered product / count lazily loaded products
+_READY_SELECTORS = ['.product-item', '.product-card', 'div.product', 'li.product', '.product-item-wrap', 'a[href] img']
+_PRODUCT_COUNT_SELECTOR = 'a[href] img'
+_SIZE_RE = re.compile(r"/(\d+)x(\d+)")
+_PRICE_LINE_RE = re.compile(r"[\d\.,]+\s*(đ|₫|vnd)", re.I)
+
+# In-page version of the anchor heuristic in `_scan_anchors_python`: ancestor
+# text, price regex, image lookup, image size check and skip-path filter all
+# run inside the page and come back as one compact [url, title, price, img] array.
+_ANCHOR_SCAN_JS = r"""
+({limit, skipPaths, badgeWords, minImageSize}) => {
+  const priceRe = /(\d{1,3}(?:[\.,]\d{3})+|\d{4,})(?:[\.,]\d{1,2})?(?!\d)/;
+  const priceLineRe = /[\d\.,]+\s*(đ|₫|vnd)/i;
+  const sizeRe = /\/(\d+)x(\d+)/;
+  const textCache = new Map();
+  const innerText = (el) => {
+    let t = textCache.get(el);
+    if (t === undefined) { t = el.innerText || ''; textCache.set(el, t); }
+    return t;
+  };
+  const cleanPrice = (text) => {
+    if (!text) return null;
+    const m = priceRe.exec(text.replace(/\u00a0/g, ' '));
+    if (!m) return null;
+    const v = parseFloat(m[1].replace(/[\.,]/g, ''));
+    return Number.isNaN(v) ? null : v;
+  };
+  const pickTitle = (text) => {
+    if (!text) return '';
+    const lines = text.split(/\r?\n/);
+    for (const line of lines) {
+      const s = line.trim();
+      if (!s || priceLineRe.test(s) || s.length < 4) continue;
+      const low = s.toLowerCase();
+      if (badgeWords.some((k) => low.includes(k))) continue;
+      return s;
+    }
+    for (const line of lines) { if (line.trim()) return line.trim(); }
+    return text.trim();
+  };
+  const imgSrc = (i) => i.getAttribute('src') || i.getAttribute('data-src') || i.getAttribute('data-lazy-src') || i.src || '';
+  const findImage = (el) => {
+    const own = el.querySelector('img');
+    if (own) return imgSrc(own);
+    let n = el.parentElement;
+    for (let k = 0; k < 3 && n; k++) {
+      const i = n.querySelector('img');
+      if (i) return imgSrc(i);
+      n = n.parentElement;
+    }
+    return '';
+  };
+
+  const anchors = document.querySelectorAll('a[href]');
+  const seen = new Set();
+  const rows = [];
+  for (const a of anchors) {
+    if (limit !== null && limit !== undefined && rows.length >= limit) break;
+    const href = a.getAttribute('href') || '';
+    if (!href) continue;
+    const full = a.href;
+    if (seen.has(full)) continue;
+    const low = href.toLowerCase();
+    if (skipPaths.some((p) => low.includes(p))) continue;
+
+    const text = innerText(a).trim();
+    let anc = '';
+    let n = a;
+    for (let i = 0; i < 5 && n; i++) {
+      const t = innerText(n);
+      if (t) anc = t + '\n' + anc;
+      n = n.parentElement;
+    }
+    let price = cleanPrice(anc);
+    if (price === null) price = cleanPrice(text);
+
+    const src = findImage(a);
+    let largeImg = false;
+    if (src) {
+      const m = sizeRe.exec(src);
+      if (m && Math.max(parseInt(m[1], 10), parseInt(m[2], 10)) >= minImageSize) largeImg = true;
+    }
+
+    let title = pickTitle(anc) || pickTitle(text);
+    if (!title) {
+      const first = text.split(/\r?\n/).map((l) => l.trim()).find((l) => l);
+      title = first || text.trim();
+    }
+    if (!title) continue;
+    if (price === null && !largeImg) continue;
+
+    seen.add(full);
+    rows.push([full, title, price, src ? new URL(src, document.baseURI).href : null]);
+  }
+  return {scanned: anchors.length, rows};
+}
+"""
+
+def _to_products(raw_results: List[Dict]) -> List[Dict]:
+    """Chuyển kết quả thô của `scrape` sang format giống crawl_tiki_product (tối đa 5 sản phẩm)"""
+    products = []
+    current_time = datetime.now().isoformat()
+
+    for idx, item in enumerate(raw_results, 1):
+        if len(products) >= 5:  # Giới hạn 5 sản phẩm
+            break
+
+        if not item.get('title'):
+            continue
+
+        price = parse_price(item.get('price'))
+
+        # Tạo unique product ID
+        product_id = f"dienthoaivui_{int(datetime.now().timestamp())}_{len(products)+1}"
+
+        # Tạo product dict với format giống crawl_tiki_product
+        product = {
+            "id": product_id,
+            "name": item.get('title', '').strip(),
+            "price": price,
+            "original_price": price,
+            "discount": "Không giảm giá",
+            "seller": "Điện Thoại Vui",
+            "rating": f"{item.get('rating', 0.0):.1f}",
+            "review_count": item.get('review_count', 0),
+            "url": item.get('url', ''),
+            "timestamp": current_time,
+            "platform": "dienthoaivui",
+            "sold_count": item.get('sold_count', 0)
+        }
+
+        # Thêm thông tin ảnh nếu có
+        if item.get('image'):
+            product["image"] = item.get('image')
+
+        products.append(product)
+
+    if products:
+        print(f"Tìm thấy {len(products)} sản phẩm từ Điện Thoại Vui")
+    else:
+        print("Không tìm thấy sản phẩm nào từ Điện Thoại Vui")
+
+    return products
+
+def _search_url(product_name: str) -> str:
+    return f"https://dienthoaivui.com.vn/tim-kiem?_tim_kiem={product_name}"
+
 def scrape_dienthoaivui_products(product_name: str) -> List[Dict]:
     """
     Crawl sản phẩm từ Điện Thoại Vui và trả về list dict với format giống crawl_tiki_product
     Giới hạn chỉ lấy 5 sản phẩm
     """
     try:
-        search_url = f"https://dienthoaivui.com.vn/tim-kiem?_tim_kiem={product_name}"
-        raw_results = scrape(search_url, limit=10)  # Lấy 10 để có đủ data filter
-        
-        products = []
-        current_time = datetime.now().isoformat()
-        
-        for idx, item in enumerate(raw_results, 1):
-            if len(products) >= 5:  # Giới hạn 5 sản phẩm
-                break
-                
-            if not item.get('title'):
-                continue
-            
-            # Xử lý giá
-            price = item.get('price', 0)
-            if isinstance(price, str):
-                # Trích xuất số từ string
-                import re
-                price_numbers = re.findall(r'[\d,\.]+', price.replace('₫', '').replace('đ', ''))
-                if price_numbers:
-                    try:
-                        price_str = price_numbers[0].replace(',', '').replace('.', '')
-                        price = int(price_str)
-                    except (ValueError, IndexError):
-                        price = 0
-            
-            # Tạo unique product ID
-            product_id = f"dienthoaivui_{int(datetime.now().timestamp())}_{len(products)+1}"
-            
-            # Tạo product dict với format giống crawl_tiki_product
-            product = {
-                "id": product_id,
-                "name": item.get('title', '').strip(),
-                "price": price or 0,
-                "original_price": price or 0,
-                "discount": "Không giảm giá",
-                "seller": "Điện Thoại Vui",
-                "rating": f"{item.get('rating', 0.0):.1f}",
-                "review_count": item.get('review_count', 0),
-                "url": item.get('url', ''),
-                "timestamp": current_time,
-                "platform": "dienthoaivui",
-                "sold_count": item.get('sold_count', "0")
-            }
-            
-            # Thêm thông tin ảnh nếu có
-            if item.get('image'):
-                product["image"] = item.get('image')
-            
-            products.append(product)
-        
-        if products:
-            print(f"Tìm thấy {len(products)} sản phẩm từ Điện Thoại Vui")
-        else:
-            print("Không tìm thấy sản phẩm nào từ Điện Thoại Vui")
-        
-        return products
-        
+        raw_results = scrape(_search_url(product_name), limit=10)  # Lấy 10 để có đủ data filter
+        return _to_products(raw_results)
     except Exception as e:
         print(f"Lỗi khi crawl dữ liệu từ Điện Thoại Vui: {e}")
         return []
 
+async def scrape_dienthoaivui_products_async(product_name: str, context=None,
+                                             metrics: Optional[Dict] = None) -> List[Dict]:
+    """Async variant of scrape_dienthoaivui_products.
+
+    `context` is an optional Playwright BrowserContext owned by the caller
+    (the crawl orchestrator); a private browser is launched otherwise.
+    Page readiness timings are written into `metrics` when given. Errors are
+    raised (not turned into an empty list) so the orchestrator's circuit
+    breaker counts them.
+    """
+    try:
+        raw_results = await scrape_async(_search_url(product_name), limit=10, context=context, metrics=metrics)
+        return _to_products(raw_results)
+    except Exception as e:
+        print(f"Lỗi khi crawl dữ liệu từ Điện Thoại Vui: {e}")
+        raise
+
 def _clean_title(raw: str) -> str:
     if not raw:
         return ""
@@ -94,21 +225,34 @@ def _clean_title(raw: str) -> str:
             return s
     return raw.strip()
 
-def _clean_price_text(text: str):
+def _pick_title_from_text(text: str):
     if not text:
-        return None
-    m = re.search(r"(\d{1,3}(?:[\.,]\d{3})+(?:[\.,]\d+)?|\d{4,})", text.replace('\xa0',' '))
-    if not m:
-        return None
-    s = m.group(1)
-    cleaned = s.replace('.', '').replace(',', '')
-    try:
-        return float(cleaned)
-    except Exception:
-        return None
+        return ''
+    # prefer a line that looks like a name (not badge or price)
+    for line in text.splitlines():
+        s = line.strip()
+        if not s:
+            continue
+        # skip pure price lines or short badge lines
+        if _PRICE_LINE_RE.search(s):
+            continue
+        if len(s) < 4:
+            continue
+        # skip typical badge words
+        if any(k in s.lower() for k in _BADGE_WORDS):
+            continue
+        return s
+    # fallback: first non-empty line
+    for line in text.splitlines():
+        if line.strip():
+            return line.strip()
+    return text.strip()
 
-def scrape(search_url, limit=None):
-    results = []
+def _clean_price_text(text: str):
+    return find_price(text)
+
+def scrape(search_url, limit=None, extract_mode=None):
+    """Blocking wrapper around `scrape_async` for CLI and thread callers."""
     try:
         import platform
         import asyncio
@@ -119,391 +263,348 @@ def scrape(search_url, limit=None):
                 pass
     except Exception:
         pass
+    import asyncio
+    return asyncio.run(scrape_async(search_url, limit=limit, extract_mode=extract_mode))
 
-    from playwright.sync_api import sync_playwright
-
-    with sync_playwright() as p:
-        browser = p.chromium.launch(headless=True)
-        page = browser.new_page()
-        page.goto(search_url, timeout=60000)
-        # wait and scroll to trigger client-side rendering and lazy-load images
-        page.wait_for_timeout(800)
-        page.evaluate("() => { window.scrollTo(0, 0); }")
-        page.wait_for_timeout(600)
-        page.evaluate("() => { window.scrollTo(0, document.body.scrollHeight/2); }")
-        page.wait_for_timeout(800)
-        page.evaluate("() => { window.scrollTo(0, document.body.scrollHeight); }")
-        page.wait_for_timeout(1200)
-
-        # Prioritize anchors approach: DTV tends to render product links as anchors with images and prices
-        anchors = page.query_selector_all('a[href]')
-        seen = set()
-        results_by_anchor = []
-        size_re = __import__('re').compile(r"/(\d+)x(\d+)")
-        price_re = __import__('re').compile(r"[\d\.,]+\s*(đ|₫|vnd)", __import__('re').I)
-
-        def pick_title_from_text(text: str):
-            if not text:
-                return ''
-            # prefer a line that looks like a name (not badge or price)
-            for line in text.splitlines():
-                s = line.strip()
-                if not s:
-                    continue
-                # skip pure price lines or short badge lines
-                if price_re.search(s):
-                    continue
-                if len(s) < 4:
-                    continue
-                # skip typical badge words
-                if any(k in s.lower() for k in ('giảm', 'bảo hành', 'sắp về', 'smember', 'sale', '%')):
-                    continue
-                return s
-            # fallback: first non-empty line
-            for line in text.splitlines():
-                if line.strip():
-                    return line.strip()
-            return text.strip()
-
-        for a in anchors:
-            if limit is not None and len(results_by_anchor) >= limit:
-                break
+
+async def scrape_async(search_url, limit=None, context=None, extract_mode=None, metrics=None):
+    """Render `search_url` and extract product entries.
+
+    When `context` is given a new page is opened in it and closed afterwards;
+    the context (and its browser) stay owned by the caller. Otherwise a
+    private Chromium is launched for this call only. `extract_mode` overrides
+    EXTRACT_MODE ('script' or 'python').
+    """
+    if context is not None:
+        page = await context.new_page()
+        try:
+            results = await _extract(page, search_url, limit, extract_mode, metrics)
+        finally:
+            await page.close()
+        return _filter_results(results, limit)
+
+    from playwright.async_api import async_playwright
+
+    async with async_playwright() as p:
+        browser = await p.chromium.launch(headless=True)
+        try:
+            page = await browser.new_page()
+            results = await _extract(page, search_url, limit, extract_mode, metrics)
+        finally:
             try:
-                href = a.get_attribute('href') or ''
-                if not href:
-                    continue
-                full = __import__('urllib.parse').urljoin(search_url, href)
-                if full in seen:
-                    continue
-                # skip obvious non-product paths (articles, blog, booking)
-                low = href.lower()
-                if any(skip in low for skip in ('/tin-tuc', '/tin-tuc/', '/suachua', '/dat-lich', '/dich-vu', '/uu-dai')):
-                    continue
+                await browser.close()
+            except Exception:
+                pass
+    return _filter_results(results, limit)
 
-                # evaluate ancestor innerText to find price and name lines
-                text = (a.inner_text() or '').strip()
-                anc_text = page.evaluate("(el) => { let n = el; let acc=''; for(let i=0;i<5;i++){ if(!n) break; if(n.innerText) acc = n.innerText + '\n' + acc; n = n.parentElement;} return acc; }", a) or ''
-                # price detection: prefer ancestor block but also check anchor text itself
-                pval = _clean_price_text(anc_text)
-                if pval is None:
-                    pval = _clean_price_text(text)
 
-                # image detection: look for an img in the anchor or nearby ancestors/descendants
-                try:
-                    img_src = page.evaluate("(el)=>{ let i = el.querySelector('img'); if(i){ return i.getAttribute('src')||i.getAttribute('data-src')||i.getAttribute('data-lazy-src')||i.src;} let n = el.parentElement; for(let k=0;k<3;k++){ if(!n) break; let ii = n.querySelector('img'); if(ii) return ii.getAttribute('src')||ii.getAttribute('data-src')||ii.getAttribute('data-lazy-src')||ii.src; n = n.parentElement;} return ''; }", a) or ''
-                except Exception:
-                    img_src = ''
-                img = __import__('urllib.parse').urljoin(search_url, img_src) if img_src else None
-                has_large_img = False
-                if img_src:
-                    m = size_re.search(img_src)
-                    if m:
-                        try:
-                            w = int(m.group(1)); h = int(m.group(2))
-                            if max(w,h) >= 150:
-                                has_large_img = True
-                        except Exception:
-                            pass
-
-                # pick a robust title from ancestor block or anchor text
-                title = pick_title_from_text(anc_text) or pick_title_from_text(text)
-                if not title:
-                    # try last resort: use entire anchor text cleaned
-                    title = _clean_title(text)
-                if not title:
-                    continue
+async def _scan_anchors_python(page, search_url, limit, seen):
+    """Anchor heuristic chạy phía Python (nhiều IPC round trip mỗi anchor).
 
-                # decide if likely a product: price present (in anc or anchor) or large image
-                has_price = pval is not None
-                if not (has_price or has_large_img):
-                    # also accept if anchor text itself includes a price pattern
-                    if not _clean_price_text(text):
-                        continue
+    Giữ lại để benchmark so với `_scan_anchors_script`; chọn bằng
+    `extract_mode='python'`.
+    """
+    anchors = await page.query_selector_all('a[href]')
+    results_by_anchor = []
+
+    for a in anchors:
+        if limit is not None and len(results_by_anchor) >= limit:
+            break
+        try:
+            href = await a.get_attribute('href') or ''
+            if not href:
+                continue
+            full = urljoin(search_url, href)
+            if full in seen:
+                continue
+            # skip obvious non-product paths (articles, blog, booking)
+            low = href.lower()
+            if any(skip in low for skip in _SKIP_PATHS):
+                continue
 
-                seen.add(full)
-                results_by_anchor.append({
-                    'title': title, 
-                    'url': full, 
-                    'price': pval, 
-                    'image': img,
-                    'rating': 0.0,
-                    'review_count': 0,
-                    'sold_count': "0"
-                })
+            # evaluate ancestor innerText to find price and name lines
+            text = (await a.inner_text() or '').strip()
+            anc_text = await page.evaluate("(el) => { let n = el; let acc=''; for(let i=0;i<5;i++){ if(!n) break; if(n.innerText) acc = n.innerText + '\\n' + acc; n = n.parentElement;} return acc; }", a) or ''
+            # price detection: prefer ancestor block but also check anchor text itself
+            pval = _clean_price_text(anc_text)
+            if pval is None:
+                pval = _clean_price_text(text)
+
+            # image detection: look for an img in the anchor or nearby ancestors/descendants
+            try:
+                img_src = await page.evaluate("(el)=>{ let i = el.querySelector('img'); if(i){ return i.getAttribute('src')||i.getAttribute('data-src')||i.getAttribute('data-lazy-src')||i.src;} let n = el.parentElement; for(let k=0;k<3;k++){ if(!n) break; let ii = n.querySelector('img'); if(ii) return ii.getAttribute('src')||ii.getAttribute('data-src')||ii.getAttribute('data-lazy-src')||ii.src; n = n.parentElement;} return ''; }", a) or ''
             except Exception:
+                img_src = ''
+            img = urljoin(search_url, img_src) if img_src else None
+            has_large_img = False
+            if img_src:
+                m = _SIZE_RE.search(img_src)
+                if m:
+                    try:
+                        w = int(m.group(1)); h = int(m.group(2))
+                        if max(w,h) >= _MIN_PRODUCT_IMAGE_SIZE:
+                            has_large_img = True
+                    except Exception:
+                        pass
+
+            # pick a robust title from ancestor block or anchor text
+            title = _pick_title_from_text(anc_text) or _pick_title_from_text(text)
+            if not title:
+                # try last resort: use entire anchor text cleaned
+                title = _clean_title(text)
+            if not title:
                 continue
 
-        # DEBUG: how many anchors passed heuristics
-        try:
-            print(f"anchors scanned -> {len(anchors)}, anchors matched -> {len(results_by_anchor)}")
+            # decide if likely a product: price present (in anc or anchor) or large image
+            has_price = pval is not None
+            if not (has_price or has_large_img):
+                # also accept if anchor text itself includes a price pattern
+                if not _clean_price_text(text):
+                    continue
+
+            seen.add(full)
+            results_by_anchor.append({
+                'title': title, 
+                'url': full, 
+                'price': pval, 
+                'image': img,
+                'rating': 0.0,
+                'review_count': 0,
+                'sold_count': 0
+            })
         except Exception:
-            pass
+            continue
+
+    return len(anchors), results_by_anchor
 
-        if results_by_anchor:
-            for it in results_by_anchor:
+
+async def _scan_anchors_script(page, limit, seen):
+    """Anchor heuristic chạy trọn trong trang bằng một lần `page.evaluate`."""
+    scan = await page.evaluate(_ANCHOR_SCAN_JS, {
+        'limit': limit,
+        'skipPaths': list(_SKIP_PATHS),
+        'badgeWords': list(_BADGE_WORDS),
+        'minImageSize': _MIN_PRODUCT_IMAGE_SIZE,
+    })
+    results_by_anchor = []
+    for url, title, price, img in scan.get('rows', []):
+        if url in seen:
+            continue
+        seen.add(url)
+        results_by_anchor.append({
+            'title': title,
+            'url': url,
+            'price': price,
+            'image': img,
+            'rating': 0.0,
+            'review_count': 0,
+            'sold_count': 0
+        })
+    return scan.get('scanned', 0), results_by_anchor
+
+
+async def _extract(page, search_url, limit=None, extract_mode=None, metrics=None):
+    extract_mode = extract_mode or EXTRACT_MODE
+    results = []
+    # images/fonts/media and trackers are not needed to read the product list
+    resource_stats = await install_route_blocking(page, get_policy("dienthoaivui"))
+    started_at = time.perf_counter()
+    await page.goto(search_url, timeout=60000, wait_until="domcontentloaded")
+    # wait for the first product, then scroll to trigger client-side rendering and
+    # lazy-load images until the number of product images stops growing
+    timings = await wait_until_ready(page, _READY_SELECTORS, started_at, ready_budget("dienthoaivui"),
+                                     count_selector=_PRODUCT_COUNT_SELECTOR, scroll=True)
+    await collect_page_metrics(page, resource_stats)
+    print(f"Resources: {resource_stats.summary()}")
+    if metrics is not None:
+        metrics.update(timings)
+        metrics["resources"] = resource_stats.as_dict()
+
+    # Prioritize anchors approach: DTV tends to render product links as anchors with images and prices
+    seen = set()
+    started = time.perf_counter()
+    if extract_mode == 'python':
+        scanned, results_by_anchor = await _scan_anchors_python(page, search_url, limit, seen)
+    else:
+        scanned, results_by_anchor = await _scan_anchors_script(page, limit, seen)
+    elapsed_ms = (time.perf_counter() - started) * 1000
+
+    # DEBUG: how many anchors passed heuristics
+    print(f"[{extract_mode}] anchors scanned -> {scanned}, anchors matched -> {len(results_by_anchor)} ({elapsed_ms:.0f} ms)")
+
+    if results_by_anchor:
+        for it in results_by_anchor:
+            if limit is not None and len(results) >= limit:
+                break
+            results.append(it)
+    else:
+        # Try to find product-like containers first using common selectors
+        item_selectors = ['.product-item', '.product-card', 'div.product', 'li.product', '.product-item-wrap']
+        items = []
+        matched = await wait_for_any_selector(page, item_selectors, 1500)
+        if matched:
+            items = await page.query_selector_all(matched)
+
+        # If we found item containers, extract from them
+        if items:
+            for item in items:
                 if limit is not None and len(results) >= limit:
                     break
-                results.append(it)
-        else:
-            # Try to find product-like containers first using common selectors
-            item_selectors = ['.product-item', '.product-card', 'div.product', 'li.product', '.product-item-wrap']
-            items = []
-            for sel in item_selectors:
                 try:
-                    page.wait_for_selector(sel, timeout=1500)
-                    items = page.query_selector_all(sel)
-                    if items:
-                        break
-                except Exception:
-                    continue
-
-            # If we found item containers, extract from them
-            if items:
-                for item in items:
-                    if limit is not None and len(results) >= limit:
-                        break
+                    a = await item.query_selector('a[href]')
+                    if not a:
+                        continue
+                    href = await a.get_attribute('href') or ''
+                    url = urljoin(search_url, href)
+                    if url in seen:
+                        continue
+                    seen.add(url)
+                    # prefer explicit name/title elements inside the item
+                    title = ''
                     try:
-                        a = item.query_selector('a[href]')
-                        if not a:
-                            continue
-                        href = a.get_attribute('href') or ''
-                        url = urljoin(search_url, href)
-                        if url in seen:
-                            continue
-                        seen.add(url)
-                        # prefer explicit name/title elements inside the item
+                        tnode = await item.query_selector('.name-product, .product-name, .name, .title, h3, h2, h1, .product-title')
+                        if tnode:
+                            title = _clean_title(await tnode.inner_text() or '')
+                    except Exception:
                         title = ''
+                    if not title:
+                        title_raw = (await a.inner_text() or '')
+                        title = _clean_title(title_raw)
+
+                    # image
+                    img = None
+                    img_el = await item.query_selector('img') or await a.query_selector('img')
+                    if img_el:
+                        src = await img_el.get_attribute('src') or await img_el.get_attribute('data-src') or await img_el.get_attribute('data-lazy-src')
+                        if src:
+                            img = urljoin(search_url, src)
+
+                    # price: look inside item for common price selectors, or fallback to regex
+                    price = None
+                    for ps in ['.price', '.product-price', '.gia', '.price-final_price', '[data-price]']:
                         try:
-                            tnode = item.query_selector('.name-product, .product-name, .name, .title, h3, h2, h1, .product-title')
-                            if tnode:
-                                title = _clean_title(tnode.inner_text() or '')
-                        except Exception:
-                            title = ''
-                        if not title:
-                            title_raw = (a.inner_text() or '')
-                            title = _clean_title(title_raw)
-
-                        # image
-                        img = None
-                        img_el = item.query_selector('img') or a.query_selector('img')
-                        if img_el:
-                            src = img_el.get_attribute('src') or img_el.get_attribute('data-src') or img_el.get_attribute('data-lazy-src')
-                            if src:
-                                img = urljoin(search_url, src)
-
-                        # price: look inside item for common price selectors, or fallback to regex
-                        price = None
-                        for ps in ['.price', '.product-price', '.gia', '.price-final_price', '[data-price]']:
-                            try:
-                                node = item.query_selector(ps)
-                                if node:
-                                    text = (node.get_attribute('data-price') or node.inner_text() or '').strip()
-                                    pval = _clean_price_text(text)
-                                    if pval:
-                                        price = pval
-                                        break
-                            except Exception:
-                                continue
-                        if price is None:
-                            whole = item.inner_text() or ''
-                            price = _clean_price_text(whole)
-
-                        # Tìm rating, review count và sold count trong item
-                        rating = 0.0
-                        review_count = 0
-                        sold_count = "0"
-                        
-                        try:
-                            item_text = item.inner_text() or ''
-                            
-                            # Tìm rating
-                            import re
-                            rating_patterns = [
-                                r'(\d+\.?\d*)\s*/?\s*5\s*sao',
-                                r'(\d+\.?\d*)\s*sao',
-                                r'Rating:\s*(\d+\.?\d*)',
-                                r'(\d+\.?\d*)\s*★'
-                            ]
-                            for pattern in rating_patterns:
-                                rating_match = re.search(pattern, item_text, re.IGNORECASE)
-                                if rating_match:
-                                    try:
-                                        rating_val = float(rating_match.group(1))
-                                        if 0 <= rating_val <= 5:
-                                            rating = rating_val
-                                            break
-                                    except ValueError:
-                                        pass
-                            
-                            # Tìm review count
-                            review_patterns = [
-                                r'(\d+)\s*(?:đánh giá|review|nhận xét)',
-                                r'\((\d+)\s*(?:đánh giá|review)\)',
-                                r'(\d+)\s*comment'
-                            ]
-                            for pattern in review_patterns:
-                                review_match = re.search(pattern, item_text, re.IGNORECASE)
-                                if review_match:
-                                    try:
-                                        review_count = int(review_match.group(1))
-                                        break
-                                    except ValueError:
-                                        pass
-                            
-                            # Tìm sold count
-                            sold_patterns = [
-                                r'(\d+[k\d,\.]*)\s*(?:đã bán|sold)',
-                                r'Bán:\s*(\d+[k\d,\.]*)',
-                                r'(\d+[k\d,\.]*)\s*lượt mua'
-                            ]
-                            for pattern in sold_patterns:
-                                sold_match = re.search(pattern, item_text, re.IGNORECASE)
-                                if sold_match:
-                                    sold_count = sold_match.group(1)
+                            node = await item.query_selector(ps)
+                            if node:
+                                text = (await node.get_attribute('data-price') or await node.inner_text() or '').strip()
+                                pval = _clean_price_text(text)
+                                if pval:
+                                    price = pval
                                     break
-                                    
                         except Exception:
-                            pass
-
-                        results.append({
-                            'title': title, 
-                            'url': url, 
-                            'price': price, 
-                            'image': img,
-                            'rating': rating,
-                            'review_count': review_count,
-                            'sold_count': sold_count
-                        })
+                            continue
+                    if price is None:
+                        whole = await item.inner_text() or ''
+                        price = _clean_price_text(whole)
+
+                    # Tìm rating, review count và sold count trong item
+                    rating = 0.0
+                    review_count = 0
+                    sold_count = 0
+                    
+                    try:
+                        item_text = await item.inner_text() or ''
+                        
+                        rating = find_rating(item_text)
+                        review_count = find_review_count(item_text)
+                        sold_count = find_sold_count(item_text)
                     except Exception:
+                        pass
+
+                    results.append({
+                        'title': title, 
+                        'url': url, 
+                        'price': price, 
+                        'image': img,
+                        'rating': rating,
+                        'review_count': review_count,
+                        'sold_count': sold_count
+                    })
+                except Exception:
+                    continue
+        else:
+            # Fallback: iterate anchors and pick those that have nearby price/image info
+            anchors = await page.query_selector_all('a[href]')
+            for a in anchors:
+                if limit is not None and len(results) >= limit:
+                    break
+                try:
+                    href = await a.get_attribute('href') or ''
+                    if not href:
+                        continue
+                    url = urljoin(search_url, href)
+                    if url in seen:
                         continue
-            else:
-                # Fallback: iterate anchors and pick those that have nearby price/image info
-                anchors = page.query_selector_all('a[href]')
-                for a in anchors:
-                    if limit is not None and len(results) >= limit:
-                        break
-                    try:
-                        href = a.get_attribute('href') or ''
-                        if not href:
-                            continue
-                        url = urljoin(search_url, href)
-                        if url in seen:
-                            continue
 
-                        # try to locate a nearby name element for cleaner product name
+                    # try to locate a nearby name element for cleaner product name
+                    title = ''
+                    try:
+                        tnode = await a.query_selector('.name-product, .product-name, .name, .title, h3, h2, h1, .product-title')
+                        if tnode:
+                            title = _clean_title(await tnode.inner_text() or '')
+                    except Exception:
                         title = ''
-                        try:
-                            tnode = a.query_selector('.name-product, .product-name, .name, .title, h3, h2, h1, .product-title')
-                            if tnode:
-                                title = _clean_title(tnode.inner_text() or '')
-                        except Exception:
-                            title = ''
-                        if not title:
-                            title_raw = (a.inner_text() or '')
-                            title = _clean_title(title_raw)
-                        if not title or len(title) < 2:
-                            # skip anchors without title-like text
-                            continue
+                    if not title:
+                        title_raw = (await a.inner_text() or '')
+                        title = _clean_title(title_raw)
+                    if not title or len(title) < 2:
+                        # skip anchors without title-like text
+                        continue
 
-                        # find price by checking ancestors (up to 4 levels)
+                    # find price by checking ancestors (up to 4 levels)
+                    price = None
+                    img = None
+                    try:
+                        ptext = await page.evaluate("(a) => { let n=a; for(let i=0;i<4;i++){ if(!n) break; if(n.innerText && /[\\d\\.,]+\\s*(đ|₫|vnd)/i.test(n.innerText)) return n.innerText; n = n.parentElement; } return ''; }", a)
+                        price = _clean_price_text(ptext)
+                    except Exception:
                         price = None
-                        img = None
-                        try:
-                            ptext = page.evaluate("(a) => { let n=a; for(let i=0;i<4;i++){ if(!n) break; if(n.innerText && /[\\d\\.,]+\\s*(đ|₫|vnd)/i.test(n.innerText)) return n.innerText; n = n.parentElement; } return ''; }", a)
-                            price = _clean_price_text(ptext)
-                        except Exception:
-                            price = None
 
-                        # image inside anchor
-                        try:
-                            img_el = a.query_selector('img')
-                            if img_el:
-                                src = img_el.get_attribute('src') or img_el.get_attribute('data-src') or img_el.get_attribute('data-lazy-src')
-                                if src:
-                                    img = urljoin(search_url, src)
-                        except Exception:
-                            img = None
+                    # image inside anchor
+                    try:
+                        img_el = await a.query_selector('img')
+                        if img_el:
+                            src = await img_el.get_attribute('src') or await img_el.get_attribute('data-src') or await img_el.get_attribute('data-lazy-src')
+                            if src:
+                                img = urljoin(search_url, src)
+                    except Exception:
+                        img = None
 
-                        # Tìm rating và review count
-                        rating = 0.0
-                        review_count = 0
-                        sold_count = "0"
+                    # Tìm rating và review count
+                    rating = 0.0
+                    review_count = 0
+                    sold_count = 0
+                    
+                    # Kiểm tra ancestor elements để tìm rating/review info
+                    try:
+                        ancestor_text = await page.evaluate("(el) => { let n = el; let acc=''; for(let i=0;i<3;i++){ if(!n) break; if(n.innerText) acc += n.innerText + ' '; n = n.parentElement;} return acc; }", a) or ''
                         
-                        # Kiểm tra ancestor elements để tìm rating/review info
-                        try:
-                            ancestor_text = page.evaluate("(el) => { let n = el; let acc=''; for(let i=0;i<3;i++){ if(!n) break; if(n.innerText) acc += n.innerText + ' '; n = n.parentElement;} return acc; }", a) or ''
-                            
-                            # Tìm rating
-                            import re
-                            rating_patterns = [
-                                r'(\d+\.?\d*)\s*/?\s*5\s*sao',
-                                r'(\d+\.?\d*)\s*sao',
-                                r'Rating:\s*(\d+\.?\d*)',
-                                r'(\d+\.?\d*)\s*★'
-                            ]
-                            for pattern in rating_patterns:
-                                rating_match = re.search(pattern, ancestor_text, re.IGNORECASE)
-                                if rating_match:
-                                    try:
-                                        rating_val = float(rating_match.group(1))
-                                        if 0 <= rating_val <= 5:
-                                            rating = rating_val
-                                            break
-                                    except ValueError:
-                                        pass
-                            
-                            # Tìm review count
-                            review_patterns = [
-                                r'(\d+)\s*(?:đánh giá|review|nhận xét)',
-                                r'\((\d+)\s*(?:đánh giá|review)\)',
-                                r'(\d+)\s*comment'
-                            ]
-                            for pattern in review_patterns:
-                                review_match = re.search(pattern, ancestor_text, re.IGNORECASE)
-                                if review_match:
-                                    try:
-                                        review_count = int(review_match.group(1))
-                                        break
-                                    except ValueError:
-                                        pass
-                            
-                            # Tìm sold count
-                            sold_patterns = [
-                                r'(\d+[k\d,\.]*)\s*(?:đã bán|sold)',
-                                r'Bán:\s*(\d+[k\d,\.]*)',
-                                r'(\d+[k\d,\.]*)\s*lượt mua'
-                            ]
-                            for pattern in sold_patterns:
-                                sold_match = re.search(pattern, ancestor_text, re.IGNORECASE)
-                                if sold_match:
-                                    sold_count = sold_match.group(1)
-                                    break
-                                    
-                        except Exception:
-                            pass
-
-                        # keep anchors that have price or image
-                        if price is None and not img:
-                            continue
-
-                        seen.add(url)
-                        results.append({
-                            'title': title, 
-                            'url': url, 
-                            'price': price, 
-                            'image': img,
-                            'rating': rating,
-                            'review_count': review_count,
-                            'sold_count': sold_count
-                        })
+                        rating = find_rating(ancestor_text)
+                        review_count = find_review_count(ancestor_text)
+                        sold_count = find_sold_count(ancestor_text)
                     except Exception:
+                        pass
+
+                    # keep anchors that have price or image
+                    if price is None and not img:
                         continue
 
-        try:
-            browser.close()
-        except Exception:
-            pass
+                    seen.add(url)
+                    results.append({
+                        'title': title, 
+                        'url': url, 
+                        'price': price, 
+                        'image': img,
+                        'rating': rating,
+                        'review_count': review_count,
+                        'sold_count': sold_count
+                    })
+                except Exception:
+                    continue
+
+    return results
 
+
+def _filter_results(results, limit=None):
     # filter out obvious category/navigation entries: prefer items with price or
     # with product-sized images (not small 40x40 icons). Then dedupe and limit.
     filtered = []
@@ -515,16 +616,9 @@ def scrape(search_url, limit=None):
         # or image seems to be a product image (not tiny icon)
         if not is_product and img:
             # cdni URLs include size like 40x40 or 300x300
-            if re.search(r"/\d+x\d+", img):
-                m = re.search(r"/(\d+)x(\d+)", img)
-                if m:
-                    try:
-                        w = int(m.group(1))
-                        h = int(m.group(2))
-                        if max(w, h) >= 150:
-                            is_product = True
-                    except Exception:
-                        pass
+            m = _SIZE_RE.search(img)
+            if m and max(int(m.group(1)), int(m.group(2))) >= _MIN_PRODUCT_IMAGE_SIZE:
+                is_product = True
         # also ignore very short titles that look like badges
         title = (r.get('title') or '').strip()
         if not title or len(title) < 3:
@@ -551,6 +645,8 @@ def main():
     parser.add_argument('--url', required=False)
     parser.add_argument('--product', required=False)
     parser.add_argument('--limit', type=int, default=10)
+    parser.add_argument('--extract-mode', choices=['script', 'python'], default=None,
+                        help="Anchor heuristic: 'script' (one in-page evaluate) or 'python' (per-anchor round trips)")
     args = parser.parse_args()
 
     if args.product:
@@ -558,7 +654,7 @@ def main():
         res = scrape_dienthoaivui_products(args.product)
     elif args.url:
         # Sử dụng function cũ
-        res = scrape(args.url, limit=args.limit)
+        res = scrape(args.url, limit=args.limit, extract_mode=args.extract_mode)
     else:
         # Chế độ interactive
         print("Điện Thoại Vui Product Crawler")
@@ -0,0 +1,232 @@
+"""
+Selenium Driver Pool - Chrome WebDriver dùng lại giữa các trang và các query
+
+Đường dẫn chromedriver chỉ được resolve một lần (ChromeDriverManager().install()
+hoặc biến môi trường CHROMEDRIVER_PATH) rồi cache cho cả process. Các driver
+headless được giữ lại trong pool, kiểm tra health trước khi cấp phát và bị thay
+mới khi chết hoặc đã phục vụ quá số lần cho phép.
+
+Usage:
+    pool = get_driver_pool()
+    with pool.driver() as driver:
+        driver.get(url)
+"""
+
+import atexit
+import os
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict, List, Optional
+
+from selenium import webdriver
+from selenium.webdriver.chrome.options import Options
+from selenium.webdriver.chrome.service import Service
+from selenium.webdriver.chrome.webdriver import WebDriver
+
+
+SELENIUM_POOL_SIZE = int(os.getenv("CRAWL_SELENIUM_POOL_SIZE", "2"))
+SELENIUM_MAX_USES = int(os.getenv("CRAWL_SELENIUM_MAX_USES", "100"))
+SELENIUM_PAGE_LOAD_TIMEOUT = int(os.getenv("CRAWL_SELENIUM_PAGE_LOAD_TIMEOUT", "30"))
+# Thời gian tối đa (giây) chờ một driver rảnh khi pool đã đầy
+SELENIUM_ACQUIRE_TIMEOUT = float(os.getenv("CRAWL_SELENIUM_ACQUIRE_TIMEOUT", "60"))
+
+# Ẩn navigator.webdriver trên mọi document (driver được dùng lại qua nhiều lần điều hướng)
+_STEALTH_SCRIPT = "Object.defineProperty(navigator, 'webdriver', {get: () => undefined})"
+
+_driver_path: Optional[str] = None
+_driver_path_lock = threading.Lock()
+
+
+def resolve_chromedriver_path() -> str:
+    """Resolve đường dẫn chromedriver một lần và cache lại cho cả process"""
+    global _driver_path
+    with _driver_path_lock:
+        if _driver_path is None:
+            env_path = os.getenv("CHROMEDRIVER_PATH")
+            if env_path:
+                _driver_path = env_path
+            else:
+                from webdriver_manager.chrome import ChromeDriverManager
+                _driver_path = ChromeDriverManager().install()
+            print(f"Sử dụng chromedriver tại: {_driver_path}")
+        return _driver_path
+
+
+def build_chrome_options() -> Options:
+    """Chrome options headless dùng chung cho mọi driver của crawler"""
+    chrome_options = Options()
+    chrome_options.add_argument("--headless")
+    chrome_options.add_argument("--no-sandbox")
+    chrome_options.add_argument("--disable-dev-shm-usage")
+    chrome_options.add_argument("--disable-extensions")
+    chrome_options.add_argument("--disable-notifications")
+    chrome_options.add_argument("--disable-infobars")
+    chrome_options.add_argument("--disable-blink-features=AutomationControlled")
+    chrome_options.add_experimental_option("excludeSwitches", ["enable-automation"])
+    chrome_options.add_experimental_option('useAutomationExtension', False)
+    chrome_options.add_experimental_option("prefs", {
+        "profile.default_content_setting_values.notifications": 2
+    })
+    return chrome_options
+
+
+def create_chrome_driver() -> WebDriver:
+    """Khởi động một Chrome headless mới với chromedriver đã cache"""
+    driver = webdriver.Chrome(
+        service=Service(resolve_chromedriver_path()),
+        options=build_chrome_options()
+    )
+    driver.set_page_load_timeout(SELENIUM_PAGE_LOAD_TIMEOUT)
+    try:
+        driver.execute_cdp_cmd("Page.addScriptToEvaluateOnNewDocument", {"source": _STEALTH_SCRIPT})
+    except Exception:
+        driver.execute_script(_STEALTH_SCRIPT)
+    return driver
+
+
+class _PooledDriver:
+    def __init__(self, driver: WebDriver):
+        self.driver = driver
+        self.created_at = time.time()
+        self.uses = 0
+
+
+class DriverPool:
+    """Pool Chrome WebDriver có health check, dùng lại giữa các trang và query"""
+
+    def __init__(self, size: int = SELENIUM_POOL_SIZE, max_uses: int = SELENIUM_MAX_USES):
+        self.size = max(1, size)
+        self.max_uses = max_uses
+        # LIFO: driver vừa trả về được dùng trước. Thread chờ driver ngủ trên
+        # _cond và được đánh thức cả khi có driver rảnh lẫn khi có chỗ tạo mới
+        # (driver hỏng bị bỏ, tạo driver lỗi)
+        self._idle: List[_PooledDriver] = []
+        self._lock = threading.Lock()
+        self._cond = threading.Condition(self._lock)
+        self._total = 0
+        self._closed = False
+        self._stats = {"created": 0, "reused": 0, "discarded_unhealthy": 0, "retired": 0}
+
+    def _is_healthy(self, pooled: _PooledDriver) -> bool:
+        try:
+            pooled.driver.execute_script("return 1")
+            return bool(pooled.driver.window_handles)
+        except Exception:
+            return False
+
+    def _discard(self, pooled: _PooledDriver):
+        try:
+            pooled.driver.quit()
+        except Exception:
+            pass
+        with self._cond:
+            self._total -= 1
+            self._cond.notify()
+
+    def _create(self) -> _PooledDriver:
+        try:
+            pooled = _PooledDriver(create_chrome_driver())
+        except Exception:
+            with self._cond:
+                self._total -= 1
+                self._cond.notify()
+            raise
+        with self._lock:
+            self._stats["created"] += 1
+        return pooled
+
+    def acquire(self, timeout: Optional[float] = SELENIUM_ACQUIRE_TIMEOUT) -> _PooledDriver:
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            with self._cond:
+                while True:
+                    if self._closed:
+                        raise RuntimeError("DriverPool đã đóng")
+                    if self._idle:
+                        pooled = self._idle.pop()
+                        break
+                    if self._total < self.size:
+                        self._total += 1
+                        pooled = None
+                        break
+                    remaining = None if deadline is None else deadline - time.monotonic()
+                    if remaining is not None and remaining <= 0:
+                        raise TimeoutError("Không có Chrome driver rảnh trong pool")
+                    self._cond.wait(remaining)
+            if pooled is None:
+                return self._create()
+
+            if self._is_healthy(pooled):
+                with self._lock:
+                    self._stats["reused"] += 1
+                return pooled
+            with self._lock:
+                self._stats["discarded_unhealthy"] += 1
+            self._discard(pooled)
+
+    def release(self, pooled: _PooledDriver, broken: bool = False):
+        pooled.uses += 1
+        retire = broken or (self.max_uses and pooled.uses >= self.max_uses)
+        with self._cond:
+            if not retire and not self._closed:
+                self._idle.append(pooled)
+                self._cond.notify()
+                return
+            if not broken and not self._closed:
+                self._stats["retired"] += 1
+        self._discard(pooled)
+
+    @contextmanager
+    def driver(self, timeout: Optional[float] = SELENIUM_ACQUIRE_TIMEOUT):
+        """Mượn một driver; driver lỗi trong lúc dùng sẽ bị bỏ thay vì trả về pool"""
+        pooled = self.acquire(timeout=timeout)
+        broken = False
+        try:
+            yield pooled.driver
+        except Exception:
+            broken = not self._is_healthy(pooled)
+            raise
+        finally:
+            self.release(pooled, broken=broken)
+
+    def warm_up(self, count: int = 1):
+        """Resolve chromedriver và khởi động sẵn `count` driver"""
+        resolve_chromedriver_path()
+        drivers = []
+        try:
+            for _ in range(min(count, self.size)):
+                drivers.append(self.acquire(timeout=0))
+        except Exception as e:
+            print(f"Không thể khởi động sẵn Chrome driver: {e}")
+        for pooled in drivers:
+            self.release(pooled)
+
+    def stats(self) -> Dict:
+        with self._lock:
+            data = dict(self._stats)
+            data.update({"size": self.size, "total": self._total, "idle": len(self._idle)})
+        return data
+
+    def close(self):
+        """Quit tất cả driver đang rảnh; driver đang được mượn sẽ bị quit khi trả về"""
+        with self._cond:
+            self._closed = True
+            idle, self._idle = self._idle, []
+            self._cond.notify_all()
+        for pooled in idle:
+            self._discard(pooled)
+
+
+_pool: Optional[DriverPool] = None
+_pool_lock = threading.Lock()
+
+
+def get_driver_pool() -> DriverPool:
+    """Trả về DriverPool dùng chung cho toàn process"""
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = DriverPool()
+            atexit.register(_pool.close)
+        return _pool
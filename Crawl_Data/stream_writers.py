@@ -0,0 +1,166 @@
+"""
+Stream Writers - ghi kết quả crawl dần theo từng trang thay vì dồn tới cuối
+
+- JsonlWriter: mỗi sản phẩm một dòng JSON
+- CsvWriter: schema cố định (OUTPUT_FIELDS), header ghi một lần
+- Đuôi .gz thì nén gzip
+- Checkpoint định kỳ (mỗi `checkpoint_pages` trang hoặc `checkpoint_seconds` giây):
+  flush + fsync file rồi ghi file tiến độ `<out>.progress` (danh sách trang đã
+  ghi và số byte tương ứng). Với gzip, mỗi checkpoint đóng một gzip member nên
+  file luôn giải nén được tới checkpoint cuối.
+- resume=True: cắt phần ghi dở sau checkpoint cuối và bỏ qua các trang đã ghi
+
+Usage:
+    with open_writer("out.jsonl.gz", resume=True) as writer:
+        for page, items in iter_pages(...):
+            if page not in writer.completed_pages:
+                writer.write_page(page, items)
+"""
+
+import csv
+import gzip
+import io
+import json
+import os
+import time
+from typing import Dict, Iterable, List, Set
+
+CHECKPOINT_PAGES = int(os.getenv("CRAWL_CHECKPOINT_PAGES", "5"))
+CHECKPOINT_SECONDS = float(os.getenv("CRAWL_CHECKPOINT_SECONDS", "30"))
+
+# Schema cố định của output crawl_iphones (cùng key với parse_listing / parse_product_page)
+OUTPUT_FIELDS = ("title", "price", "link", "seller", "image")
+
+
+class StreamWriter:
+    """Base class: quản lý file, gzip, checkpoint và resume; lớp con chỉ định dạng từng item"""
+
+    def __init__(self, path: str, resume: bool = False,
+                 checkpoint_pages: int = CHECKPOINT_PAGES, checkpoint_seconds: float = CHECKPOINT_SECONDS):
+        self.path = path
+        self.progress_path = path + ".progress"
+        self.compressed = path.lower().endswith(".gz")
+        self.checkpoint_pages = max(1, checkpoint_pages)
+        self.checkpoint_seconds = checkpoint_seconds
+        self.completed_pages: Set[int] = set()
+        self.items_written = 0
+        self._pending_pages: List[int] = []
+        self._last_checkpoint = time.monotonic()
+        self._gzip = None
+        self._text = None
+
+        checkpoint_bytes = 0
+        if resume and os.path.exists(self.progress_path):
+            with open(self.progress_path, "r", encoding="utf-8") as f:
+                progress = json.load(f)
+            self.completed_pages = set(progress.get("pages", []))
+            self.items_written = progress.get("items", 0)
+            checkpoint_bytes = progress.get("bytes", 0)
+
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+        if checkpoint_bytes and os.path.exists(path):
+            # Bỏ phần ghi sau checkpoint cuối; các trang đó sẽ được crawl lại
+            self._raw = open(path, "r+b")
+            self._raw.truncate(checkpoint_bytes)
+            self._raw.seek(checkpoint_bytes)
+        else:
+            self._raw = open(path, "wb")
+            self.completed_pages = set()
+            self.items_written = 0
+            if os.path.exists(self.progress_path):
+                os.remove(self.progress_path)
+        self._is_new = self._raw.tell() == 0
+
+    def _stream(self) -> io.TextIOWrapper:
+        if self._text is None:
+            binary = self._raw
+            if self.compressed:
+                self._gzip = gzip.GzipFile(fileobj=self._raw, mode="wb")
+                binary = self._gzip
+            self._text = io.TextIOWrapper(binary, encoding="utf-8", newline="", write_through=True)
+            self._start(self._text)
+        return self._text
+
+    def _start(self, stream: io.TextIOWrapper):
+        """Hook cho lớp con khi mở stream (vd. tạo csv.writer)"""
+
+    def _write_items(self, stream: io.TextIOWrapper, items: List[Dict]):
+        raise NotImplementedError
+
+    def write_page(self, page: int, items: Iterable[Dict]):
+        items = list(items)
+        self._write_items(self._stream(), items)
+        self.items_written += len(items)
+        self._pending_pages.append(page)
+        if (len(self._pending_pages) >= self.checkpoint_pages
+                or time.monotonic() - self._last_checkpoint >= self.checkpoint_seconds):
+            self.checkpoint()
+
+    def checkpoint(self):
+        """Đẩy dữ liệu xuống đĩa (fsync) rồi mới ghi nhận các trang vào file tiến độ"""
+        if self._text is not None:
+            self._text.flush()
+            # Đóng gzip member (không đóng file gốc) để phần đã checkpoint là gzip hợp lệ
+            self._text.detach()
+            if self._gzip is not None:
+                self._gzip.close()
+                self._gzip = None
+            self._text = None
+        self._raw.flush()
+        os.fsync(self._raw.fileno())
+
+        self.completed_pages.update(self._pending_pages)
+        self._pending_pages = []
+        self._last_checkpoint = time.monotonic()
+        progress = {"pages": sorted(self.completed_pages), "items": self.items_written, "bytes": self._raw.tell()}
+        tmp_path = self.progress_path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(progress, f)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, self.progress_path)
+
+    def close(self):
+        if self._raw.closed:
+            return
+        self.checkpoint()
+        self._raw.close()
+        print(f"Saved {self.items_written} items to {self.path}")
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+class JsonlWriter(StreamWriter):
+    def _write_items(self, stream: io.TextIOWrapper, items: List[Dict]):
+        stream.write("".join(json.dumps(item, ensure_ascii=False) + "\n" for item in items))
+
+
+class CsvWriter(StreamWriter):
+    def __init__(self, path: str, fields=OUTPUT_FIELDS, **kwargs):
+        self.fields = list(fields)
+        self._writer = None
+        super().__init__(path, **kwargs)
+
+    def _start(self, stream: io.TextIOWrapper):
+        self._writer = csv.DictWriter(stream, fieldnames=self.fields, extrasaction="ignore", restval="")
+        if self._is_new:
+            self._writer.writeheader()
+            self._is_new = False
+
+    def _write_items(self, stream: io.TextIOWrapper, items: List[Dict]):
+        self._writer.writerows(items)
+
+
+def open_writer(path: str, **kwargs) -> StreamWriter:
+    """Writer theo đuôi file: .jsonl / .ndjson (JSONL), còn lại CSV; thêm .gz để nén"""
+    name = path.lower()
+    if name.endswith(".gz"):
+        name = name[:-3]
+    if name.endswith(".jsonl") or name.endswith(".ndjson"):
+        return JsonlWriter(path, **kwargs)
+    return CsvWriter(path, **kwargs)
@@ -14,7 +14,7 @@ except ImportError:
     logging.basicConfig(level=logging.INFO)
     logger = logging.getLogger(__name__)
 
-from .database import get_db
+from .db_pool import db_connection
 from .config import active_tokens
 
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="token")
@@ -65,11 +65,10 @@ def get_current_user(token: str = Depends(oauth2_scheme)) -> Dict:
     if not user_id:
         raise credentials_exception
     
-    conn = get_db()
-    cursor = conn.cursor()
-    cursor.execute("SELECT * FROM users WHERE id = ?", (user_id,))
-    user = cursor.fetchone()
-    conn.close()
+    with db_connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute("SELECT * FROM users WHERE id = ?", (user_id,))
+        user = cursor.fetchone()
     
     if user is None:
         raise credentials_exception
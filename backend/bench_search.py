@@ -0,0 +1,218 @@
+"""Benchmark: LIKE scan vs FTS5 search over the products table.
+
+Builds a scratch database with synthetic phone and accessory listings
+(Vietnamese titles, brands, storage, colors), growing it to each size in
+--sizes, and times the old `name LIKE '%q%' OR url LIKE '%q%' ORDER BY
+created_at DESC` query against `backend.search.search_products` for a set of
+typical queries, from broad ("iphone") to selective. Insert throughput
+(including the FTS triggers) is reported too.
+
+Broad queries cost more with FTS than selective ones: BM25 scores every
+matching row before the page is cut, so the "FTS matches" column matters more
+than the table size.
+
+Before timing, the scratch database is also used to check that the background
+DB writer reports only new products as inserted while the FTS triggers are
+installed (the triggers write rows of their own); the script exits with code 1
+if it does not.
+
+Usage:
+    python -m backend.bench_search
+    python -m backend.bench_search --sizes 100000 1000000 --repeat 5
+    python -m backend.bench_search --db /tmp/bench_search.db --keep
+    python -m backend.bench_search --check-only
+"""
+import argparse
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+import uuid
+from datetime import datetime, timedelta
+from typing import Callable, List
+
+from backend.db_pool import connect
+from backend.db_writer import DBWriter
+from backend.search import build_match_query, ensure_fts_schema, search_products, search_tokens
+
+# model families expand to many concrete models, like a real catalog
+MODEL_FAMILIES = {
+    "Apple": [f"iPhone {n}{v}" for n in range(11, 17) for v in ("", " Plus", " Pro", " Pro Max")]
+             + [f"iPad Air {n}" for n in range(3, 7)],
+    "Samsung": [f"Galaxy A{n:02d}" for n in range(5, 76, 5)] + [f"Galaxy S{n}{v}" for n in range(21, 25)
+                                                                 for v in ("", "+", " Ultra", " FE")],
+    "Xiaomi": [f"Redmi Note {n}{v}" for n in range(9, 15) for v in ("", " Pro", " Pro+")]
+              + [f"Xiaomi {n}T" for n in range(11, 15)],
+    "OPPO": [f"Reno{n}{v}" for n in range(5, 13) for v in ("", " F", " Pro")] + [f"A{n}" for n in range(15, 100, 3)],
+    "Vivo": [f"Y{n}" for n in range(1, 100, 2)] + [f"V{n}" for n in range(20, 31)],
+    "Realme": [f"C{n}" for n in range(11, 68, 2)] + [f"Realme {n} Pro" for n in range(9, 13)],
+}
+STORAGE = ["64GB", "128GB", "256GB", "512GB", "1TB", "8GB/128GB", "8GB/256GB", "12GB/256GB"]
+COLORS = ["Đen", "Trắng", "Xanh dương", "Xanh lá", "Hồng", "Titan tự nhiên", "Vàng đồng", "Tím", "Bạc"]
+PHONE_PREFIXES = ["Điện thoại", "Máy tính bảng", "", ""]
+SUFFIXES = ["Chính hãng VN/A", "Cũ 99%", "Trả góp 0%", "Nhập khẩu", "Like new", ""]
+ACCESSORIES = ["Ốp lưng silicon", "Ốp lưng trong suốt", "Kính cường lực", "Cáp sạc Type-C", "Cáp Lightning",
+               "Củ sạc nhanh 20W", "Củ sạc 65W GaN", "Tai nghe Bluetooth", "Sạc dự phòng 10000mAh",
+               "Giá đỡ điện thoại", "Miếng dán camera", "Bao da"]
+PLATFORMS = ["tiki.vn", "lazada.vn", "cellphones.com.vn", "dienthoaivui.com.vn"]
+
+# broad (a large share of the catalog matches) to selective
+QUERIES = [
+    "iphone",
+    "ipho",
+    "điện thoại samsung",
+    "dien thoai samsung",
+    "iphone 15",
+    "iphone 15 pro max 256gb",
+    "galaxy s24 ultra",
+    "redmi note 13 pro 8gb",
+    "op lung iphone 13",
+    "cap sac type c",
+    "xanh duong",
+]
+
+PRODUCTS_SQL = """
+    CREATE TABLE IF NOT EXISTS products (
+        id TEXT PRIMARY KEY,
+        name TEXT NOT NULL,
+        price REAL,
+        url TEXT UNIQUE,
+        image TEXT,
+        rating REAL,
+        review_count INTEGER,
+        metadata TEXT,
+        created_at TEXT NOT NULL,
+        search_tokens TEXT
+    )
+"""
+
+LIKE_SQL = ("SELECT * FROM products WHERE name LIKE ? OR url LIKE ? "
+            "ORDER BY created_at DESC LIMIT ? OFFSET ?")
+
+
+def make_products(start: int, count: int, rng: random.Random) -> List[tuple]:
+    base = datetime(2024, 1, 1)
+    rows = []
+    for i in range(start, start + count):
+        brand = rng.choice(list(MODEL_FAMILIES))
+        model = rng.choice(MODEL_FAMILIES[brand])
+        if rng.random() < 0.6:
+            parts = (rng.choice(PHONE_PREFIXES), brand if rng.random() < 0.5 else "", model,
+                     rng.choice(STORAGE), rng.choice(COLORS), rng.choice(SUFFIXES))
+        else:
+            parts = (rng.choice(ACCESSORIES), "cho", model, rng.choice(COLORS) if rng.random() < 0.3 else "")
+        name = " ".join(part for part in parts if part)
+        slug = f"{model.lower().replace(' ', '-')}-{i}"
+        rows.append((
+            uuid.uuid4().hex, name, rng.randint(2, 45) * 500000,
+            f"https://{rng.choice(PLATFORMS)}/{slug}", None,
+            round(rng.uniform(3.5, 5.0), 1), rng.randint(0, 5000), "{}",
+            (base + timedelta(seconds=i)).isoformat(),
+        ))
+    return rows
+
+
+def grow(conn, target: int, rng: random.Random, batch: int = 10000) -> float:
+    """Insert products until the table holds `target` rows; returns rows/second."""
+    current = conn.execute("SELECT COUNT(*) FROM products").fetchone()[0]
+    missing = target - current
+    if missing <= 0:
+        return 0.0
+    started = time.perf_counter()
+    for offset in range(current, target, batch):
+        rows = [row + (search_tokens(row[1]),) for row in make_products(offset, min(batch, target - offset), rng)]
+        with conn:
+            conn.executemany("INSERT INTO products VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)", rows)
+    return missing / (time.perf_counter() - started)
+
+
+def check_writer_counts(path: str, rng: random.Random, count: int = 30) -> List[str]:
+    """Save `count` new products (plus `count` duplicates) through DBWriter; errors if the counts are off."""
+    columns = ("id", "name", "price", "url", "image", "rating", "review_count", "metadata", "timestamp")
+    start = 10 ** 9  # well past any row `grow` adds, so every url is new
+    batch = [dict(zip(columns, row)) for row in make_products(start, count, rng)]
+    writer = DBWriter(path, spill_path=path + ".spill.jsonl")
+    writer.start()
+    try:
+        inserted = writer.enqueue(batch).result(timeout=30)
+        duplicates = writer.enqueue(batch).result(timeout=30)
+    finally:
+        writer.stop()
+    errors = []
+    if inserted != count:
+        errors.append(f"DBWriter reported {inserted} new rows for {count} new products")
+    if duplicates != 0:
+        errors.append(f"DBWriter reported {duplicates} new rows for {count} duplicate products")
+    return errors
+
+
+def time_query(fn: Callable[[], list], repeat: int) -> float:
+    fn()
+    samples = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn()
+        samples.append(time.perf_counter() - started)
+    return statistics.median(samples) * 1000
+
+
+def bench(conn, repeat: int, limit: int):
+    print(f"{'query':<28} {'LIKE ms':>9} {'hits':>5} {'FTS ms':>9} {'hits':>5} {'speedup':>8} {'FTS matches':>12}")
+    like_total = fts_total = 0.0
+    for q in QUERIES:
+        like = f"%{q}%"
+        like_rows = conn.execute(LIKE_SQL, (like, like, limit, 0)).fetchall()
+        fts_rows = search_products(conn, q, limit)
+        matches = conn.execute("SELECT COUNT(*) FROM products_fts WHERE products_fts MATCH ?",
+                               (build_match_query(q),)).fetchone()[0]
+        like_ms = time_query(lambda: conn.execute(LIKE_SQL, (like, like, limit, 0)).fetchall(), repeat)
+        fts_ms = time_query(lambda: search_products(conn, q, limit), repeat)
+        like_total += like_ms
+        fts_total += fts_ms
+        print(f"{q:<28} {like_ms:>9.2f} {len(like_rows):>5} {fts_ms:>9.2f} {len(fts_rows):>5} "
+              f"{like_ms / fts_ms:>7.1f}x {matches:>12,}")
+    print(f"{'total':<28} {like_total:>9.2f} {'':>5} {fts_total:>9.2f} {'':>5} {like_total / fts_total:>7.1f}x")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare LIKE and FTS5 product search latency")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[100000, 1000000], help="Table sizes to measure")
+    parser.add_argument("--repeat", type=int, default=5, help="Timed runs per query")
+    parser.add_argument("--limit", type=int, default=50, help="Page size")
+    parser.add_argument("--db", help="Database file (default: a temporary file)")
+    parser.add_argument("--keep", action="store_true", help="Keep the database file afterwards")
+    parser.add_argument("--check-only", action="store_true", help="Only check the DB writer's row counts")
+    args = parser.parse_args()
+
+    path = args.db or os.path.join(tempfile.mkdtemp(prefix="bench_search_"), "products.db")
+    conn = connect(path)
+    conn.execute(PRODUCTS_SQL)
+    ensure_fts_schema(conn)
+    conn.commit()
+    rng = random.Random(0)
+    errors = []
+    try:
+        errors = check_writer_counts(path, rng)
+        for error in errors:
+            print(f"FAIL {error}")
+        if not errors:
+            print("DB writer row counts OK")
+        for size in ([] if args.check_only else sorted(args.sizes)):
+            rate = grow(conn, size, rng)
+            print(f"\n== {size:,} products (insert incl. FTS triggers: {rate:,.0f} rows/s) ==")
+            bench(conn, args.repeat, args.limit)
+    finally:
+        conn.close()
+        if not args.keep:
+            for suffix in ("", "-wal", "-shm", ".spill.jsonl"):
+                if os.path.exists(path + suffix):
+                    os.remove(path + suffix)
+            print(f"\nRemoved {path}")
+    if errors:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
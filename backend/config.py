@@ -8,5 +8,35 @@ load_dotenv()
 # Default kept for local development to preserve existing behavior.
 DB_PATH = os.getenv("DB_PATH", "chatbot_database.db")
 
+# Connection pool used by the API routes (backend/db_pool.py). Every pooled
+# connection runs in WAL mode with synchronous=NORMAL and these settings.
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "8"))
+# Seconds a request waits for a free connection before failing
+DB_POOL_TIMEOUT = float(os.getenv("DB_POOL_TIMEOUT", "30"))
+# Page cache per connection (KiB) and memory-mapped I/O size (bytes)
+DB_CACHE_SIZE_KB = int(os.getenv("DB_CACHE_SIZE_KB", "16384"))
+DB_MMAP_SIZE = int(os.getenv("DB_MMAP_SIZE", str(256 * 1024 * 1024)))
+# Prepared statements kept per connection (sqlite3 cached_statements)
+DB_STATEMENT_CACHE = int(os.getenv("DB_STATEMENT_CACHE", "256"))
+
+# Background DB writer (backend/db_writer.py) group commit: queued batches are
+# drained into one transaction until this many rows are collected or the first
+# batch has waited this long.
+DB_WRITER_MAX_ROWS = int(os.getenv("DB_WRITER_MAX_ROWS", "1000"))
+DB_WRITER_MAX_WAIT_MS = float(os.getenv("DB_WRITER_MAX_WAIT_MS", "50"))
+
+# Bounded writer queue (in batches). When it is full, DB_WRITER_OVERFLOW decides:
+#   block       - wait up to DB_WRITER_BLOCK_TIMEOUT seconds for room, then fail
+#                 (save_products falls back to a direct write)
+#   drop_oldest - discard the oldest queued batch (its future gets an error)
+#   spill       - append the batch to DB_WRITER_SPILL_PATH; the writer replays it
+#                 when the queue drains (also after a crash/restart)
+DB_WRITER_QUEUE_SIZE = int(os.getenv("DB_WRITER_QUEUE_SIZE", "256"))
+DB_WRITER_OVERFLOW = os.getenv("DB_WRITER_OVERFLOW", "block").strip().lower()
+DB_WRITER_BLOCK_TIMEOUT = float(os.getenv("DB_WRITER_BLOCK_TIMEOUT", "5"))
+DB_WRITER_SPILL_PATH = os.getenv("DB_WRITER_SPILL_PATH", DB_PATH + ".spill.jsonl")
+# How long FastAPI shutdown waits for buffered writes to reach the DB
+DB_WRITER_SHUTDOWN_TIMEOUT = float(os.getenv("DB_WRITER_SHUTDOWN_TIMEOUT", "10"))
+
 # Token storage (in-memory)
 active_tokens = {}
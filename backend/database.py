@@ -3,7 +3,9 @@ import sqlite3
 import time
 import hashlib
 import uuid
+from concurrent.futures import TimeoutError as FutureTimeoutError
 from datetime import datetime
+from typing import Optional
 import json
 import os
 
@@ -16,14 +18,8 @@ except ImportError:
     logger = logging.getLogger(__name__)
 
 from .config import DB_PATH
-
-def get_db():
-    """Get database connection"""
-    # Increase timeout and allow connections from different threads
-    # to reduce "database is locked" errors under concurrency.
-    conn = sqlite3.connect(DB_PATH, timeout=30, check_same_thread=False)
-    conn.row_factory = sqlite3.Row
-    return conn
+from .db_pool import connect, db_connection
+from .search import ensure_fts_schema, search_tokens
 
 def hash_password(password: str) -> str:
     """Hash password using SHA256"""
@@ -31,15 +27,9 @@ def hash_password(password: str) -> str:
 
 def init_database():
     """Initialize SQLite database with required tables"""
-    conn = sqlite3.connect(DB_PATH)
+    # connect() switches to WAL (concurrent readers and writers)
+    conn = connect(DB_PATH, row_factory=None)
     cursor = conn.cursor()
-    try:
-        # Use WAL mode to improve concurrency (allows concurrent readers and writers)
-        cursor.execute("PRAGMA journal_mode=WAL;")
-        cursor.execute("PRAGMA synchronous=NORMAL;")
-    except Exception:
-        # If the PRAGMA fails (older SQLite builds), continue without crashing
-        logger.warning("Could not set WAL mode on SQLite; continuing with defaults.")
     
     # Users table
     cursor.execute("""
@@ -100,9 +90,54 @@ def init_database():
             rating REAL,
             review_count INTEGER,
             metadata TEXT,
-            created_at TEXT NOT NULL
+            created_at TEXT NOT NULL,
+            search_tokens TEXT
+        )
+    """)
+
+    # Product groups: cùng một sản phẩm trên nhiều sàn (Crawl_Data/product_matching.py)
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS product_groups (
+            id TEXT PRIMARY KEY,
+            name TEXT NOT NULL,
+            brand TEXT,
+            model TEXT,
+            storage TEXT,
+            condition TEXT,
+            min_price REAL,
+            max_price REAL,
+            offer_count INTEGER DEFAULT 0,
+            created_at TEXT NOT NULL,
+            updated_at TEXT NOT NULL
+        )
+    """)
+
+    # One row per listing (products.url) in a group
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS product_group_offers (
+            url TEXT PRIMARY KEY,
+            group_id TEXT NOT NULL,
+            platform TEXT,
+            name TEXT,
+            price REAL,
+            color TEXT,
+            updated_at TEXT NOT NULL,
+            FOREIGN KEY (group_id) REFERENCES product_groups (id)
         )
     """)
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_product_group_offers_group ON product_group_offers (group_id)")
+    # candidate groups for matching a new crawl against stored groups (save_product_groups)
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_product_groups_block ON product_groups (storage, condition)")
+    # groups emptied before save_product_groups deleted them
+    cursor.execute("DELETE FROM product_groups WHERE id NOT IN (SELECT group_id FROM product_group_offers)")
+
+    # Full-text search over product names (kept in sync by triggers)
+    try:
+        if ensure_fts_schema(conn):
+            logger.info("Built products_fts search index")
+    except sqlite3.OperationalError as e:
+        # SQLite built without FTS5: /products?q= falls back to LIKE
+        logger.warning("Full-text search unavailable, using LIKE search: %s", e)
 
     # Ensure products table has expected columns (migrate older DBs)
     try:
@@ -125,6 +160,15 @@ def init_database():
                     logger.error("Failed to add column %s to products table: %s", col, e, exc_info=True)
     except Exception as e:
         logger.error("Error checking/migrating products table schema: %s", e, exc_info=True)
+
+    # Indexes behind the list endpoints' ORDER BY and cursor (keyset) seeks, see
+    # backend/pagination.py; the trailing id makes each sort key unique
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_products_created_at ON products (created_at, id)")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_conversations_user_updated ON conversations (user_id, updated_at, id)")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_messages_conversation_created ON messages (conversation_id, created_at, id)")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_product_groups_rank ON product_groups (offer_count, updated_at, id)")
+    # keyset comparisons never match NULL; rows from before created_at existed sort last
+    cursor.execute("UPDATE products SET created_at = '' WHERE created_at IS NULL")
     
     # Create or update default admin account
     cursor.execute("SELECT * FROM users WHERE username = 'admin'")
@@ -153,15 +197,19 @@ def init_database():
         logger.info("Default admin account created (username: admin, password: admin)")
     
     conn.commit()
+    # refresh planner statistics for the new indexes (cheap when nothing changed)
+    cursor.execute("PRAGMA optimize")
     conn.close()
     logger.info("Database initialized successfully")
 
 
-def save_products(products: list) -> int:
+def save_products(products: list, timeout: Optional[float] = None) -> int:
     """Save a list of product dicts into the products table.
 
-    Uses INSERT OR IGNORE on url uniqueness to avoid duplicates. Returns
-    the number of rows inserted.
+    Uses INSERT OR IGNORE on url uniqueness to avoid duplicates. Products go
+    through the background DB writer; with `timeout` the call waits until the
+    batch is committed and returns the number of rows inserted, otherwise it
+    returns the number of products queued.
     """
     logger.info("Saving %d products to database.", len(products))
     try:
@@ -175,19 +223,23 @@ def save_products(products: list) -> int:
         logger.debug("Attempting to import background db_writer to enqueue products")
         from backend import db_writer
         try:
-            db_writer.enqueue_products(products)
+            future = db_writer.enqueue_products(products)
             logger.info("Enqueued %d products to DB writer.", len(products))
-            # Log queue size if available
-            try:
-                if hasattr(db_writer, '_writer') and hasattr(db_writer._writer, '_queue'):
-                    qsize = db_writer._writer._queue.qsize()
-                    logger.info("DB writer queue size after enqueue: %d", qsize)
-            except Exception:
-                pass
-            return len(products)
         except Exception as e:
+            # queue.Full when the writer is backed up (block policy timed out)
             logger.warning("Failed to enqueue products to DB writer, falling back to immediate write: %s", e, exc_info=True)
-            # fallthrough to immediate write below
+            future = None
+        if future is not None:
+            if timeout is None:
+                return len(products)
+            try:
+                return future.result(timeout=timeout)
+            except FutureTimeoutError:
+                logger.warning("DB writer did not commit %d products within %.1fs; still queued", len(products), timeout)
+                return len(products)
+            except Exception as e:
+                logger.error("DB writer failed to save %d products: %s", len(products), e)
+                return 0
     except Exception as import_err:
         logger.debug("db_writer not importable or not available: %s", import_err)
         # db_writer not available; perform immediate writes
@@ -196,7 +248,7 @@ def save_products(products: list) -> int:
     # Immediate single-attempt writes (no retries). Log and skip on OperationalError.
     logger.info("Opening direct DB connection to %s", DB_PATH)
     try:
-        conn = sqlite3.connect(DB_PATH, timeout=30, check_same_thread=False)
+        conn = connect(DB_PATH, row_factory=None)
     except Exception as e:
         logger.exception("Failed to open DB connection to %s: %s", DB_PATH, e)
         return 0
@@ -222,10 +274,11 @@ def save_products(products: list) -> int:
                 cursor.execute(
                     """
                     INSERT OR IGNORE INTO products
-                    (id, name, price, url, image, rating, review_count, metadata, created_at)
-                    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+                    (id, name, price, url, image, rating, review_count, metadata, created_at, search_tokens)
+                    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
                     """,
-                    (prod_id, name, price, url, image, rating, review_count, metadata, created_at)
+                    (prod_id, name, price, url, image, rating, review_count, metadata, created_at,
+                     search_tokens(name))
                 )
                 if cursor.rowcount > 0:
                     inserted += 1
@@ -246,3 +299,77 @@ def save_products(products: list) -> int:
     conn.close()
     logger.info("Saved %d products to SQL database.", inserted)
     return inserted
+
+
+def save_product_groups(groups: list) -> int:
+    """Upsert product groups from `product_matching.match_products` and their offers.
+
+    Groups are first matched against the stored groups with the same storage and
+    condition (`product_matching.match_stored_groups`), so offers from a later
+    crawl join the existing group even when it was formed by fuzzy matching; an
+    offer whose url moved to another group is re-pointed. Price range and offer
+    count are recomputed from all stored offers, and groups left without offers
+    are deleted. Returns the number of groups written.
+    """
+    if not groups:
+        return 0
+    from Crawl_Data.product_matching import match_stored_groups
+    now = datetime.utcnow().isoformat()
+    try:
+        with db_connection() as conn:
+            cursor = conn.cursor()
+            stored = []
+            for storage, condition in {(g.get('storage'), g.get('condition')) for g in groups}:
+                stored.extend(dict(row) for row in cursor.execute(
+                    "SELECT id, brand, model, storage, condition FROM product_groups "
+                    "WHERE storage IS ? AND condition IS ?",
+                    (storage, condition)
+                ))
+            groups = match_stored_groups(groups, stored)
+            cursor.executemany(
+                """
+                INSERT INTO product_groups (id, name, brand, model, storage, condition, created_at, updated_at)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+                ON CONFLICT(id) DO UPDATE SET updated_at = excluded.updated_at
+                """,
+                [(g['group_id'], g['name'], g.get('brand'), g.get('model'), g.get('storage'),
+                  g.get('condition'), now, now) for g in groups]
+            )
+            offers = [
+                (o['url'], g['group_id'], o.get('platform'), o.get('name'), o.get('price'), o.get('color'), now)
+                for g in groups for o in g.get('offers', [])
+                if o.get('url') and o['url'] != 'N/A'
+            ]
+            # groups losing an offer to another group also need their price range refreshed
+            affected = {g['group_id'] for g in groups}
+            for offer in offers:
+                row = cursor.execute("SELECT group_id FROM product_group_offers WHERE url = ?", (offer[0],)).fetchone()
+                if row:
+                    affected.add(row[0])
+            cursor.executemany(
+                """
+                INSERT INTO product_group_offers (url, group_id, platform, name, price, color, updated_at)
+                VALUES (?, ?, ?, ?, ?, ?, ?)
+                ON CONFLICT(url) DO UPDATE SET group_id = excluded.group_id, platform = excluded.platform,
+                    name = excluded.name, price = excluded.price, color = excluded.color,
+                    updated_at = excluded.updated_at
+                """,
+                offers
+            )
+            cursor.executemany(
+                """
+                UPDATE product_groups SET
+                    min_price = (SELECT MIN(price) FROM product_group_offers WHERE group_id = ? AND price > 0),
+                    max_price = (SELECT MAX(price) FROM product_group_offers WHERE group_id = ? AND price > 0),
+                    offer_count = (SELECT COUNT(*) FROM product_group_offers WHERE group_id = ?)
+                WHERE id = ?
+                """,
+                [(group_id,) * 4 for group_id in affected]
+            )
+            cursor.executemany("DELETE FROM product_groups WHERE id = ? AND offer_count = 0",
+                               [(group_id,) for group_id in affected])
+        logger.info("Saved %d product groups (%d offers).", len(groups), len(offers))
+        return len(groups)
+    except sqlite3.Error as e:
+        logger.error("Failed to save product groups: %s", e)
+        return 0
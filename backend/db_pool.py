@@ -0,0 +1,254 @@
+"""SQLite connection pool for the API routes.
+
+Opening a connection per request costs a file open, schema parse and a cold
+page cache on every call. The pool keeps up to DB_POOL_SIZE connections open,
+each configured once (WAL, synchronous=NORMAL, cache_size, mmap_size,
+temp_store=MEMORY) with a larger prepared-statement cache, and hands the most
+recently used (warmest) one out first.
+
+A connection is checked out per thread / asyncio task: nested `db_connection()`
+blocks in the same task (e.g. a helper called from a route) reuse the
+connection already held instead of taking a second one. The outermost block
+commits on success and rolls back on error before the connection goes back to
+the pool. Time spent waiting for a free connection is recorded and reported by
+`db_pool_stats()`.
+
+Usage:
+    from backend.db_pool import db_connection
+    with db_connection() as conn:
+        row = conn.execute("SELECT * FROM users WHERE id = ?", (user_id,)).fetchone()
+"""
+import contextvars
+import queue
+import sqlite3
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from typing import Dict, Iterator, List, Optional
+from logger_config import get_logger
+from backend.config import (
+    DB_CACHE_SIZE_KB, DB_MMAP_SIZE, DB_PATH, DB_POOL_SIZE, DB_POOL_TIMEOUT, DB_STATEMENT_CACHE,
+)
+
+logger = get_logger(__name__)
+
+
+def connect(db_path: str = DB_PATH, statement_cache: int = DB_STATEMENT_CACHE,
+            row_factory=sqlite3.Row) -> sqlite3.Connection:
+    """Open a connection with the pool's pragmas (also used by the background writer)."""
+    conn = sqlite3.connect(db_path, timeout=30, check_same_thread=False, cached_statements=statement_cache)
+    conn.row_factory = row_factory
+    try:
+        # WAL lets readers run alongside the single writer; NORMAL only fsyncs at checkpoints
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+    except sqlite3.Error:
+        # older SQLite builds / read-only media: continue with defaults
+        logger.warning("Could not set WAL mode on %s; continuing with defaults.", db_path)
+    conn.execute(f"PRAGMA cache_size=-{int(DB_CACHE_SIZE_KB)}")
+    conn.execute(f"PRAGMA mmap_size={int(DB_MMAP_SIZE)}")
+    conn.execute("PRAGMA temp_store=MEMORY")
+    return conn
+
+
+# A waiter re-checks for a free slot this often, so a slot freed by a discarded
+# connection whose replacement could not be opened is not missed
+_WAIT_POLL_SECONDS = 0.05
+
+
+class PoolTimeout(sqlite3.OperationalError):
+    """No pooled connection became free within DB_POOL_TIMEOUT seconds."""
+
+
+class ConnectionPool:
+    def __init__(self, db_path: str, size: int = DB_POOL_SIZE, timeout: float = DB_POOL_TIMEOUT):
+        self.db_path = db_path
+        self.size = max(1, size)
+        self.timeout = timeout
+        # LIFO: the most recently returned connection has the warmest page cache
+        self._idle = queue.LifoQueue()
+        self._lock = threading.Lock()
+        self._created = 0
+        self._in_use = 0
+        # connection held by the current thread / asyncio task
+        self._held = contextvars.ContextVar(f"db_pool_{id(self)}", default=None)
+        self._wait_ms = deque(maxlen=1024)
+        self._stats = {
+            "acquisitions": 0,
+            "reused_in_task": 0,
+            "waits": 0,
+            "timeouts": 0,
+            "wait_seconds": 0.0,
+            "max_wait_ms": 0.0,
+            "discarded": 0,
+        }
+
+    def warm_up(self, connections: Optional[int] = None) -> int:
+        """Open connections ahead of the first requests and load the schema into each."""
+        opened = []
+        with self._lock:
+            wanted = min(self.size, connections or self.size) - self._created
+        for _ in range(max(0, wanted)):
+            conn = self._open()
+            if conn is None:
+                break
+            conn.execute("SELECT name, sql FROM sqlite_master").fetchall()
+            opened.append(conn)
+        for conn in opened:
+            self._idle.put(conn)
+        logger.info("DB pool warmed up: %d connections to %s", len(opened), self.db_path)
+        return len(opened)
+
+    def _open(self) -> Optional[sqlite3.Connection]:
+        with self._lock:
+            if self._created >= self.size:
+                return None
+            self._created += 1
+        try:
+            return connect(self.db_path)
+        except Exception:
+            with self._lock:
+                self._created -= 1
+            raise
+
+    def _acquire(self) -> sqlite3.Connection:
+        started = time.perf_counter()
+        waited = False
+        try:
+            conn = self._idle.get_nowait()
+        except queue.Empty:
+            conn = self._open()
+            if conn is None:
+                waited = True
+                conn = self._wait(started + self.timeout)
+        elapsed = time.perf_counter() - started
+        with self._lock:
+            self._in_use += 1
+            self._stats["acquisitions"] += 1
+            if waited:
+                self._stats["waits"] += 1
+            self._stats["wait_seconds"] += elapsed
+            self._stats["max_wait_ms"] = max(self._stats["max_wait_ms"], elapsed * 1000)
+            self._wait_ms.append(elapsed * 1000)
+        return conn
+
+    def _wait(self, deadline: float) -> sqlite3.Connection:
+        """Wait for an idle connection, retrying `_open` in case one was discarded meanwhile."""
+        while True:
+            remaining = deadline - time.perf_counter()
+            if remaining <= 0:
+                with self._lock:
+                    self._stats["waits"] += 1
+                    self._stats["timeouts"] += 1
+                raise PoolTimeout(f"no free DB connection after {self.timeout:g}s "
+                                  f"(pool size {self.size})")
+            try:
+                return self._idle.get(timeout=min(remaining, _WAIT_POLL_SECONDS))
+            except queue.Empty:
+                conn = self._open()
+                if conn is not None:
+                    return conn
+
+    def _release(self, conn: sqlite3.Connection, failed: bool):
+        try:
+            if failed:
+                conn.rollback()
+            elif conn.in_transaction:
+                conn.commit()
+        except sqlite3.Error as e:
+            # a connection in an unknown state is not handed to the next request
+            logger.warning("Discarding pooled DB connection: %s", e)
+            try:
+                conn.close()
+            except Exception:
+                pass
+            with self._lock:
+                self._in_use -= 1
+                self._created -= 1
+                self._stats["discarded"] += 1
+            # hand a fresh connection to whoever is waiting for the freed slot
+            try:
+                replacement = self._open()
+            except Exception as e:
+                logger.warning("Could not reopen pooled DB connection: %s", e)
+                return
+            if replacement is not None:
+                self._idle.put(replacement)
+            return
+        with self._lock:
+            self._in_use -= 1
+        self._idle.put(conn)
+
+    @contextmanager
+    def connection(self) -> Iterator[sqlite3.Connection]:
+        held = self._held.get()
+        if held is not None:
+            # nested block: the outermost one commits / rolls back and releases
+            with self._lock:
+                self._stats["reused_in_task"] += 1
+            yield held
+            return
+
+        conn = self._acquire()
+        token = self._held.set(conn)
+        failed = False
+        try:
+            yield conn
+        except BaseException:
+            failed = True
+            raise
+        finally:
+            self._held.reset(token)
+            self._release(conn, failed)
+
+    def close(self):
+        """Close idle connections (called on shutdown, after the last request)."""
+        closed = 0
+        while True:
+            try:
+                conn = self._idle.get_nowait()
+            except queue.Empty:
+                break
+            conn.close()
+            closed += 1
+        with self._lock:
+            self._created -= closed
+        logger.info("DB pool closed %d idle connections", closed)
+
+    def stats(self) -> Dict:
+        with self._lock:
+            stats = dict(self._stats)
+            latencies: List[float] = sorted(self._wait_ms)
+            stats["size"] = self.size
+            stats["open"] = self._created
+            stats["in_use"] = self._in_use
+        stats["idle"] = self._idle.qsize()
+        wait_seconds = stats.pop("wait_seconds")
+        stats["avg_wait_ms"] = round(wait_seconds * 1000 / stats["acquisitions"], 3) if stats["acquisitions"] else None
+        stats["p50_wait_ms"] = round(latencies[len(latencies) // 2], 3) if latencies else None
+        stats["p95_wait_ms"] = round(latencies[int(len(latencies) * 0.95)], 3) if latencies else None
+        stats["max_wait_ms"] = round(stats["max_wait_ms"], 3)
+        return stats
+
+
+# Module-level pool for DB_PATH
+_pool = ConnectionPool(DB_PATH)
+
+
+def db_connection():
+    """Context manager yielding a pooled connection (commit on success, rollback on error)."""
+    return _pool.connection()
+
+
+def warm_up_db_pool(connections: Optional[int] = None) -> int:
+    return _pool.warm_up(connections)
+
+
+def close_db_pool():
+    _pool.close()
+
+
+def db_pool_stats() -> Dict:
+    """Pool size, connections open/in use/idle and wait-time percentiles."""
+    return _pool.stats()
@@ -4,29 +4,124 @@ This module provides a lightweight DB writer that serializes write requests
 into a single thread/connection to avoid concurrent writers causing
 "database is locked" errors.
 
+Writes use group commit: the writer drains every batch already queued (up to
+DB_WRITER_MAX_ROWS rows, waiting at most DB_WRITER_MAX_WAIT_MS for more) and
+inserts them with executemany in a single transaction, so a burst of crawl
+results costs one fsync instead of one per batch. Queue depth, flush latency
+and rows/sec are available from `db_writer_stats()`.
+
+The queue is bounded (DB_WRITER_QUEUE_SIZE batches); DB_WRITER_OVERFLOW picks
+what happens when it is full: block, drop_oldest or spill (to a JSONL file that
+is replayed once the queue drains; a file left by a crashed process is replayed
+when the writer thread starts, which main.py does at API startup). Every
+enqueued batch gets a Future that resolves to the number of new rows once the
+batch is committed, and `flush()` waits until everything queued (or spilled)
+so far is in the database.
+
 Usage:
-    from backend.db_writer import enqueue_products, start_db_writer, stop_db_writer
+    from backend.db_writer import enqueue_products, flush_db_writer, start_db_writer, stop_db_writer
     start_db_writer()
-    enqueue_products(list_of_product_dicts)
+    future = enqueue_products(list_of_product_dicts)
+    inserted = future.result(timeout=5)
+    flush_db_writer(timeout=10)
     stop_db_writer()
 """
+import json
+import os
 import threading
 import queue
 import sqlite3
 import time
-from typing import List
+import uuid
+from collections import deque
+from concurrent.futures import Future
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
 from logger_config import get_logger
-from backend.config import DB_PATH
+from backend.db_pool import connect
+from backend.search import search_tokens
+from backend.config import (
+    DB_PATH, DB_WRITER_BLOCK_TIMEOUT, DB_WRITER_MAX_ROWS, DB_WRITER_MAX_WAIT_MS, DB_WRITER_OVERFLOW,
+    DB_WRITER_QUEUE_SIZE, DB_WRITER_SPILL_PATH,
+)
 
 logger = get_logger(__name__)
 
+OVERFLOW_BLOCK = "block"
+OVERFLOW_DROP_OLDEST = "drop_oldest"
+OVERFLOW_SPILL = "spill"
+OVERFLOW_POLICIES = (OVERFLOW_BLOCK, OVERFLOW_DROP_OLDEST, OVERFLOW_SPILL)
+
+INSERT_PRODUCT_SQL = """
+    INSERT OR IGNORE INTO products
+    (id, name, price, url, image, rating, review_count, metadata, created_at, search_tokens)
+    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+"""
+
+
+class WriterOverflowError(Exception):
+    """The batch was not written because the writer queue overflowed (drop_oldest policy)."""
+
+
+def _product_row(p: dict) -> tuple:
+    metadata = p.get('metadata') or ''
+    if not isinstance(metadata, str):
+        metadata = json.dumps(metadata, ensure_ascii=False)
+    return (
+        p.get('id') or p.get('url'),
+        p.get('name'),
+        p.get('price'),
+        p.get('url'),
+        p.get('image'),
+        p.get('rating'),
+        p.get('review_count'),
+        metadata,
+        p.get('timestamp') or datetime.utcnow().isoformat(),
+        search_tokens(p.get('name')),
+    )
+
+
+# A queued batch and the future of its caller (None for batches replayed from a
+# previous process's spill file)
+_Item = Tuple[List[dict], Optional[Future]]
+
 
 class DBWriter:
-    def __init__(self, db_path: str):
+    def __init__(self, db_path: str, max_rows: int = DB_WRITER_MAX_ROWS,
+                 max_wait_ms: float = DB_WRITER_MAX_WAIT_MS, queue_size: int = DB_WRITER_QUEUE_SIZE,
+                 overflow: str = DB_WRITER_OVERFLOW, block_timeout: float = DB_WRITER_BLOCK_TIMEOUT,
+                 spill_path: str = DB_WRITER_SPILL_PATH):
+        if overflow not in OVERFLOW_POLICIES:
+            logger.warning("Unknown DB writer overflow policy %r, using %r", overflow, OVERFLOW_BLOCK)
+            overflow = OVERFLOW_BLOCK
         self.db_path = db_path
-        self._queue = queue.Queue()
+        self.max_rows = max(1, max_rows)
+        self.max_wait = max(0.0, max_wait_ms) / 1000
+        self.overflow = overflow
+        self.block_timeout = block_timeout
+        self.spill_path = spill_path
+        self._queue = queue.Queue(maxsize=max(1, queue_size))
         self._thread = threading.Thread(target=self._run, daemon=True)
         self._stop = threading.Event()
+        self._flush_requested = threading.Event()
+        # batches accepted (queued or spilled) whose future has not completed yet
+        self._pending = 0
+        self._pending_cond = threading.Condition()
+        self._spill_lock = threading.Lock()
+        self._spill_futures: Dict[str, Future] = {}
+        self._stats_lock = threading.Lock()
+        self._flush_ms = deque(maxlen=256)
+        self._stats = {
+            "batches_enqueued": 0,
+            "batches_dropped": 0,
+            "batches_spilled": 0,
+            "max_queue_depth": 0,
+            "flushes": 0,
+            "rows_written": 0,
+            "rows_inserted": 0,
+            "rows_failed": 0,
+            "flush_seconds": 0.0,
+        }
 
     def start(self):
         if not self._thread.is_alive():
@@ -38,91 +133,263 @@ class DBWriter:
         else:
             logger.debug("DBWriter thread already running")
 
-    def stop(self, wait: float = 2.0):
+    def stop(self, wait: float = 2.0) -> bool:
+        """Flush buffered writes (up to `wait` seconds), then stop the thread. Returns True if fully drained."""
         logger.info("Stopping DBWriter thread")
+        drained = self.flush(wait) if self._thread.is_alive() else self._pending == 0
         self._stop.set()
-        self._thread.join(timeout=wait)
+        if self._thread.is_alive():
+            self._thread.join(timeout=wait)
+        return drained
 
-    def enqueue(self, products: List[dict]):
-        # Queue one batch (list of dicts) at a time
-        try:
-            before = self._queue.qsize()
-        except Exception:
-            before = -1
-        self._queue.put(products)
+    # ------------------------------------------------------------------
+    # Producer side
+    # ------------------------------------------------------------------
+    def enqueue(self, products: List[dict]) -> Future:
+        """Queue one batch; the future resolves to the number of new rows once it is committed.
+
+        Raises queue.Full when the block policy times out.
+        """
+        future = Future()
+        with self._pending_cond:
+            self._pending += 1
         try:
-            after = self._queue.qsize()
-        except Exception:
-            after = -1
-        logger.info("Enqueued products batch (count=%d). queue before=%d after=%d", len(products), before, after)
+            self._put((products, future))
+        except BaseException:
+            self._complete(future)
+            raise
+        depth = self._queue.qsize()
+        with self._stats_lock:
+            self._stats["batches_enqueued"] += 1
+            self._stats["max_queue_depth"] = max(self._stats["max_queue_depth"], depth)
+        logger.debug("Enqueued products batch (count=%d), queue depth=%d", len(products), depth)
         # Ensure thread is running
         if not self._thread.is_alive():
             self.start()
+        return future
 
-    def _run(self):
-        try:
-            db_exists = False
+    def _put(self, item: _Item):
+        if self.overflow == OVERFLOW_BLOCK:
+            self._queue.put(item, timeout=self.block_timeout)
+            return
+        while True:
+            try:
+                self._queue.put_nowait(item)
+                return
+            except queue.Full:
+                pass
+            if self.overflow == OVERFLOW_SPILL:
+                self._spill(item)
+                return
+            try:
+                _, dropped = self._queue.get_nowait()
+            except queue.Empty:
+                continue
+            with self._stats_lock:
+                self._stats["batches_dropped"] += 1
+            logger.warning("DB writer queue full (%d batches), dropped oldest batch", self._queue.maxsize)
+            self._complete(dropped, error=WriterOverflowError("dropped: DB writer queue full"))
+
+    def _spill(self, item: _Item):
+        products, future = item
+        spill_id = uuid.uuid4().hex
+        line = json.dumps({"id": spill_id, "products": products}, ensure_ascii=False, default=str)
+        with self._spill_lock:
+            with open(self.spill_path, "a", encoding="utf-8") as f:
+                f.write(line + "\n")
+                f.flush()
+                os.fsync(f.fileno())
+            self._spill_futures[spill_id] = future
+        with self._stats_lock:
+            self._stats["batches_spilled"] += 1
+        logger.warning("DB writer queue full (%d batches), spilled %d products to %s",
+                       self._queue.maxsize, len(products), self.spill_path)
+
+    def flush(self, timeout: Optional[float] = None) -> bool:
+        """Wait until every batch accepted so far is committed (or failed). Returns False on timeout."""
+        with self._pending_cond:
+            if self._pending == 0:
+                return True
+            self._flush_requested.set()
+        if not self._thread.is_alive():
+            self.start()
+        with self._pending_cond:
+            return self._pending_cond.wait_for(lambda: self._pending == 0, timeout)
+
+    def _complete(self, future: Optional[Future], result: int = 0, error: Optional[BaseException] = None):
+        if future is None:
+            return
+        if not future.done():
             try:
-                db_exists = os.path.exists(self.db_path)
+                if error is not None:
+                    future.set_exception(error)
+                else:
+                    future.set_result(result)
             except Exception:
+                # cancelled by the caller in the meantime
                 pass
+        with self._pending_cond:
+            self._pending -= 1
+            if self._pending == 0:
+                self._flush_requested.clear()
+                self._pending_cond.notify_all()
+
+    # ------------------------------------------------------------------
+    # Writer thread
+    # ------------------------------------------------------------------
+    def _drain(self) -> List[_Item]:
+        """Block for the first batch, then collect more until max_rows or the wait window closes."""
+        items = [self._queue.get(timeout=0.5)]
+        rows = len(items[0][0])
+        deadline = time.monotonic() + self.max_wait
+        while rows < self.max_rows:
+            remaining = deadline - time.monotonic()
+            try:
+                if remaining > 0 and not self._stop.is_set() and not self._flush_requested.is_set():
+                    item = self._queue.get(timeout=remaining)
+                else:
+                    item = self._queue.get_nowait()
+            except queue.Empty:
+                break
+            items.append(item)
+            rows += len(item[0])
+        return items
+
+    def _rows(self, products: List[dict]) -> Tuple[List[tuple], int]:
+        rows = []
+        failed = 0
+        for p in products:
+            try:
+                rows.append(_product_row(p))
+            except Exception as e:
+                failed += 1
+                logger.warning("DBWriter skipped malformed product %r: %s", p, e)
+        return rows, failed
+
+    def _insert_rows_individually(self, conn: sqlite3.Connection, row_sets: List[List[tuple]]) -> Tuple[List[int], int]:
+        """Fallback when executemany fails: skip the bad rows, keep the rest in one transaction."""
+        inserted = []
+        failed = 0
+        with conn:
+            for rows in row_sets:
+                count = 0
+                for row in rows:
+                    try:
+                        count += conn.execute(INSERT_PRODUCT_SQL, row).rowcount
+                    except sqlite3.Error as e:
+                        failed += 1
+                        logger.warning("DBWriter failed to save product '%s': %s", row[1], e)
+                inserted.append(count)
+        return inserted, failed
+
+    def _flush(self, conn: sqlite3.Connection, items: List[_Item]):
+        started = time.perf_counter()
+        row_sets = []
+        failed = 0
+        for products, _ in items:
+            rows, bad = self._rows(products)
+            row_sets.append(rows)
+            failed += bad
+        total_rows = sum(len(rows) for rows in row_sets)
+
+        error = None
+        inserted: List[int] = []
+        try:
+            with conn:
+                # one executemany per batch so each future gets its own row count;
+                # still a single transaction / fsync for the whole flush. rowcount,
+                # unlike total_changes, leaves out rows written by the FTS triggers
+                for rows in row_sets:
+                    inserted.append(max(0, conn.executemany(INSERT_PRODUCT_SQL, rows).rowcount))
+        except sqlite3.Error as e:
+            logger.warning("DBWriter group insert of %d rows failed (%s); retrying row by row", total_rows, e)
+            try:
+                inserted, bad = self._insert_rows_individually(conn, row_sets)
+                failed += bad
+            except sqlite3.Error as e:
+                failed += total_rows
+                error = e
+                logger.exception("DBWriter failed to write %d rows: %s", total_rows, e)
+
+        for index, (_, future) in enumerate(items):
+            if error is not None:
+                self._complete(future, error=error)
+            else:
+                self._complete(future, inserted[index])
+
+        elapsed = time.perf_counter() - started
+        new_rows = sum(inserted) if error is None else 0
+        with self._stats_lock:
+            self._stats["flushes"] += 1
+            self._stats["rows_written"] += total_rows
+            self._stats["rows_inserted"] += new_rows
+            self._stats["rows_failed"] += failed
+            self._stats["flush_seconds"] += elapsed
+            self._flush_ms.append(elapsed * 1000)
+        logger.info("DBWriter: flushed %d rows from %d batches (%d new, %d failed) in %.1f ms, queue depth=%d",
+                    total_rows, len(items), new_rows, failed, elapsed * 1000, self._queue.qsize())
+
+    def _replay_spill(self, conn: sqlite3.Connection):
+        """Write spilled batches (including ones left by a crashed process) once the queue has drained."""
+        replay_path = self.spill_path + ".replay"
+        futures: Dict[str, Future] = {}
+        with self._spill_lock:
+            if not os.path.exists(replay_path):
+                if not os.path.exists(self.spill_path):
+                    return
+                os.replace(self.spill_path, replay_path)
+                futures = self._spill_futures
+                self._spill_futures = {}
+            # else: left over by a crashed process; replay it first, the current
+            # spill file (and its futures) is picked up on the next round
+
+        items: List[_Item] = []
+        with open(replay_path, "r", encoding="utf-8") as f:
+            for line in f:
+                try:
+                    entry = json.loads(line)
+                except ValueError:
+                    # torn last line from a crash mid-append
+                    logger.warning("DBWriter skipped unreadable spill line in %s", replay_path)
+                    continue
+                items.append((entry.get("products") or [], futures.pop(entry.get("id"), None)))
+        logger.info("DBWriter replaying %d spilled batches from %s", len(items), replay_path)
+
+        chunk, rows = [], 0
+        for item in items:
+            chunk.append(item)
+            rows += len(item[0])
+            if rows >= self.max_rows:
+                self._flush(conn, chunk)
+                chunk, rows = [], 0
+        if chunk:
+            self._flush(conn, chunk)
+        os.remove(replay_path)
+        for future in futures.values():
+            self._complete(future, error=WriterOverflowError("spilled batch was not found in the spill file"))
+
+    def _run(self):
+        try:
+            db_exists = os.path.exists(self.db_path)
             logger.info("DBWriter starting, DB_PATH=%s exists=%s", self.db_path, db_exists)
-            conn = sqlite3.connect(self.db_path, timeout=30, check_same_thread=False)
-            cur = conn.cursor()
+            # same WAL / synchronous=NORMAL / cache pragmas as the API's pooled connections
+            conn = connect(self.db_path, row_factory=None)
             logger.info("DBWriter connected to %s", self.db_path)
         except Exception as e:
             logger.exception("DBWriter failed to connect to DB %s: %s", self.db_path, e)
             return
         while not self._stop.is_set() or not self._queue.empty():
             try:
-                batch = self._queue.get(timeout=0.5)
+                items = self._drain()
             except queue.Empty:
-                continue
-
-            for p in batch:
-                try:
-                    prod_id = p.get('id') or p.get('url')
-                    name = p.get('name')
-                    price = p.get('price')
-                    url = p.get('url')
-                    image = p.get('image')
-                    rating = p.get('rating')
-                    review_count = p.get('review_count')
-                    metadata = p.get('metadata') or ''
-                    created_at = p.get('timestamp')
-
-                    cur.execute(
-                        """
-                        INSERT OR IGNORE INTO products
-                        (id, name, price, url, image, rating, review_count, metadata, created_at)
-                        VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
-                        """,
-                        (prod_id, name, price, url, image, rating, review_count, metadata, created_at)
-                    )
-                    # Log per-product insertion success
-                    try:
-                        if cur.rowcount > 0:
-                            logger.info("DBWriter: inserted product '%s' url=%s", name, url)
-                        else:
-                            logger.debug("DBWriter: product '%s' already exists or not inserted (url=%s)", name, url)
-                    except Exception:
-                        # rowcount access may not always be supported; ignore errors here
-                        pass
-                except sqlite3.OperationalError as oe:
-                    logger.warning("DBWriter OperationalError saving product '%s': %s", p.get('name'), oe)
-                    # skip this product
-                    continue
-                except Exception as e:
-                    logger.exception("Unexpected error writing product: %s", e)
-                    continue
-
+                items = []
             try:
-                conn.commit()
-                logger.info("DBWriter: committed batch of %d products", len(batch))
+                if items:
+                    self._flush(conn, items)
+                if self._queue.empty():
+                    self._replay_spill(conn)
             except Exception as e:
-                logger.exception("Failed to commit batch: %s", e)
-
-            self._queue.task_done()
+                logger.exception("Unexpected error flushing DB writes: %s", e)
 
         try:
             conn.close()
@@ -130,6 +397,28 @@ class DBWriter:
             pass
         logger.info("DBWriter stopped")
 
+    def stats(self) -> Dict:
+        with self._stats_lock:
+            stats = dict(self._stats)
+            last_ms = self._flush_ms[-1] if self._flush_ms else None
+            latencies = sorted(self._flush_ms)
+        flush_seconds = stats.pop("flush_seconds")
+        stats["queue_depth"] = self._queue.qsize()
+        stats["queue_capacity"] = self._queue.maxsize
+        stats["overflow_policy"] = self.overflow
+        stats["pending_batches"] = self._pending
+        try:
+            stats["spill_bytes"] = os.path.getsize(self.spill_path) if os.path.exists(self.spill_path) else 0
+        except OSError:
+            stats["spill_bytes"] = None
+        stats["running"] = self._thread.is_alive()
+        stats["last_flush_ms"] = round(last_ms, 2) if last_ms is not None else None
+        stats["p50_flush_ms"] = round(latencies[len(latencies) // 2], 2) if latencies else None
+        stats["p95_flush_ms"] = round(latencies[int(len(latencies) * 0.95)], 2) if latencies else None
+        # throughput while flushing (excludes idle time between bursts)
+        stats["rows_per_second"] = round(stats["rows_written"] / flush_seconds, 1) if flush_seconds else None
+        return stats
+
 
 # Module-level writer instance
 _writer = DBWriter(DB_PATH)
@@ -139,13 +428,25 @@ def start_db_writer():
     _writer.start()
 
 
-def stop_db_writer():
-    _writer.stop()
+def stop_db_writer(timeout: float = 2.0) -> bool:
+    """Drain buffered writes for up to `timeout` seconds, then stop. Returns True if nothing was left behind."""
+    return _writer.stop(timeout)
 
 
-def enqueue_products(products: List[dict]):
+def enqueue_products(products: List[dict]) -> Future:
     """Enqueue a list of product dicts for background writing.
 
-    This function starts the writer if it isn't running yet.
+    This function starts the writer if it isn't running yet. The returned
+    Future resolves to the number of new rows once the batch is committed.
     """
-    _writer.enqueue(products)
+    return _writer.enqueue(products)
+
+
+def flush_db_writer(timeout: Optional[float] = None) -> bool:
+    """Block until everything enqueued so far is written. Returns False on timeout."""
+    return _writer.flush(timeout)
+
+
+def db_writer_stats() -> Dict:
+    """Queue depth, flush latency (last/p50/p95 ms) and rows/sec of the background writer."""
+    return _writer.stats()
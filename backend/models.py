@@ -1,6 +1,6 @@
 """Pydantic Models - giữ nguyên từ main.py"""
 from pydantic import BaseModel, EmailStr
-from typing import Optional
+from typing import List, Optional
 
 class UserCreate(BaseModel):
     username: str
@@ -85,3 +85,30 @@ class Product(BaseModel):
     review_count: Optional[int] = None
     metadata: Optional[dict] = None
     created_at: str
+    # set by full-text search (/products/?q=, /search): name with matched terms in <mark>, BM25 score (lower is better)
+    snippet: Optional[str] = None
+    score: Optional[float] = None
+
+
+class ProductOffer(BaseModel):
+    url: str
+    platform: Optional[str] = None
+    name: Optional[str] = None
+    price: Optional[float] = None
+    color: Optional[str] = None
+    updated_at: str
+
+
+class ProductGroup(BaseModel):
+    id: str
+    name: str
+    brand: Optional[str] = None
+    model: Optional[str] = None
+    storage: Optional[str] = None
+    condition: Optional[str] = None
+    min_price: Optional[float] = None
+    max_price: Optional[float] = None
+    offer_count: int = 0
+    offers: List[ProductOffer] = []
+    created_at: str
+    updated_at: str
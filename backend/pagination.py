@@ -0,0 +1,131 @@
+"""Opaque cursor (keyset) pagination for the list endpoints.
+
+A page ends where the next one starts: the cursor carries the sort key of the
+last row served, and the next query seeks past it with a row-value comparison
+on an index (e.g. `(updated_at, id) < (?, ?)`), so page N costs the same as
+page 1 instead of scanning and discarding N * limit rows like OFFSET.
+
+Response bodies stay plain lists; the cursor for the next page is returned in
+the `X-Next-Cursor` header (absent on the last page) and passed back as
+`?cursor=`. Cursors are base64url JSON and should be treated as opaque.
+
+Usage:
+    page = Page(cursor, limit, ("updated_at", "id"), descending=True)
+    rows = conn.execute(f"SELECT * FROM conversations WHERE user_id = ?{page.and_where()} "
+                        f"ORDER BY {page.order_by()}{page.limit_sql()}", [user_id, *page.params()]).fetchall()
+    rows = page.finish(rows, response)
+"""
+import base64
+import binascii
+import json
+from typing import Any, Dict, List, Optional, Sequence
+
+from fastapi import HTTPException, Response, status
+
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+# Range of a SQLite INTEGER; larger ints can't be bound as parameters
+_SQLITE_INT_MIN, _SQLITE_INT_MAX = -2 ** 63, 2 ** 63 - 1
+
+
+def encode_cursor(payload: Dict[str, Any]) -> str:
+    raw = json.dumps(payload, separators=(",", ":"), ensure_ascii=False).encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii").rstrip("=")
+
+
+def decode_cursor(cursor: str) -> Dict[str, Any]:
+    """Decode a cursor from `encode_cursor`; a malformed one is a 400, not a 500."""
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        payload = json.loads(raw.decode("utf-8"))
+    except (binascii.Error, ValueError, UnicodeDecodeError):
+        payload = None
+    if not isinstance(payload, dict):
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid cursor")
+    return payload
+
+
+def _is_key_value(value: Any) -> bool:
+    """Whether a cursor key element can be bound as a SQLite parameter."""
+    if isinstance(value, int):
+        return _SQLITE_INT_MIN <= value <= _SQLITE_INT_MAX
+    return value is None or isinstance(value, (str, float))
+
+
+class Page:
+    """Keyset page over `columns` (all ascending or all descending; the last one must be unique)."""
+
+    def __init__(self, cursor: Optional[str], limit: Optional[int], columns: Sequence[str],
+                 descending: bool = False, offset: int = 0):
+        self.columns = tuple(columns)
+        self.descending = descending
+        self.limit = limit if limit is None or limit > 0 else None
+        self.after: Optional[List[Any]] = None
+        # OFFSET is still honoured when no cursor is given, for existing clients
+        self.offset = offset
+        if cursor:
+            key = decode_cursor(cursor).get("k")
+            if (not isinstance(key, list) or len(key) != len(self.columns)
+                    or not all(_is_key_value(value) for value in key)):
+                raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid cursor")
+            self.after = key
+            self.offset = 0
+
+    def where(self) -> str:
+        """Seek condition past the cursor ("" on the first page)."""
+        if self.after is None:
+            return ""
+        columns = ", ".join(self.columns)
+        marks = ", ".join("?" for _ in self.columns)
+        return f"({columns}) {'<' if self.descending else '>'} ({marks})"
+
+    def where_sql(self) -> str:
+        condition = self.where()
+        return f" WHERE {condition}" if condition else ""
+
+    def and_where(self) -> str:
+        condition = self.where()
+        return f" AND {condition}" if condition else ""
+
+    def params(self) -> List[Any]:
+        """Parameters for `where()`, followed by those for `limit_sql()`."""
+        params = list(self.after or [])
+        if self.limit is not None:
+            # one extra row tells whether there is a next page
+            params.append(self.limit + 1)
+            params.append(self.offset)
+        elif self.offset:
+            params.extend((-1, self.offset))
+        return params
+
+    def order_by(self) -> str:
+        direction = " DESC" if self.descending else ""
+        return ", ".join(column + direction for column in self.columns)
+
+    def limit_sql(self) -> str:
+        return " LIMIT ? OFFSET ?" if self.limit is not None or self.offset else ""
+
+    def finish(self, rows: List, response: Response) -> List:
+        """Trim the look-ahead row and set the next-page cursor header."""
+        if self.limit is not None and len(rows) > self.limit:
+            rows = rows[:self.limit]
+            last = rows[-1]
+            response.headers[NEXT_CURSOR_HEADER] = encode_cursor({"k": [last[c] for c in self.columns]})
+        return rows
+
+
+def offset_page(cursor: Optional[str], offset: int) -> int:
+    """Start offset for result sets that have no stable sort key (e.g. BM25-ranked search)."""
+    if not cursor:
+        return offset
+    start = decode_cursor(cursor).get("o")
+    if not isinstance(start, int) or start < 0:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid cursor")
+    return start
+
+
+def set_offset_cursor(response: Response, start: int, limit: int, rows: List) -> List:
+    """Like `Page.finish` for offset-based results fetched with `limit + 1`."""
+    if len(rows) > limit:
+        rows = rows[:limit]
+        response.headers[NEXT_CURSOR_HEADER] = encode_cursor({"o": start + limit})
+    return rows
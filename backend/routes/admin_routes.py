@@ -1,8 +1,8 @@
 """Admin routes - giữ nguyên từ main.py"""
 import uuid
 from datetime import datetime
-from fastapi import APIRouter, Depends, HTTPException, status
-from typing import Dict, List
+from fastapi import APIRouter, Depends, HTTPException, Response, status
+from typing import Dict, List, Optional
 
 try:
     from logger_config import get_logger
@@ -12,26 +12,34 @@ except ImportError:
     logging.basicConfig(level=logging.INFO)
     logger = logging.getLogger(__name__)
 
-from ..database import get_db
+from ..db_pool import db_connection
 from ..auth import get_current_user
 from ..models import User, Platform, PlatformCreate
+from ..pagination import Page
 
 router = APIRouter()
 
 @router.get("/admin/users/", response_model=List[User])
-async def get_all_users(current_user: Dict = Depends(get_current_user)):
-    """Get all users (admin only)"""
+async def get_all_users(
+    response: Response,
+    limit: Optional[int] = None,
+    cursor: Optional[str] = None,
+    current_user: Dict = Depends(get_current_user)
+):
+    """Get all users, newest first (admin only); paged with `limit` + X-Next-Cursor"""
     if not current_user["is_admin"]:
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN,
             detail="Only admins can view all users"
         )
     
-    conn = get_db()
-    cursor = conn.cursor()
-    cursor.execute("SELECT * FROM users ORDER BY created_at DESC")
-    users = cursor.fetchall()
-    conn.close()
+    page = Page(cursor, limit, ("created_at", "id"), descending=True)
+    with db_connection() as conn:
+        users = conn.execute(
+            f"SELECT * FROM users{page.where_sql()} ORDER BY {page.order_by()}{page.limit_sql()}",
+            page.params()
+        ).fetchall()
+        users = page.finish(users, response)
     
     return [
         User(
@@ -64,28 +72,26 @@ async def delete_user(
             detail="Cannot delete your own account"
         )
     
-    conn = get_db()
-    cursor = conn.cursor()
-    
-    # Delete user's conversations and messages
-    cursor.execute("SELECT id FROM conversations WHERE user_id = ?", (user_id,))
-    conversations = cursor.fetchall()
-    for conv in conversations:
-        cursor.execute("DELETE FROM messages WHERE conversation_id = ?", (conv["id"],))
-    cursor.execute("DELETE FROM conversations WHERE user_id = ?", (user_id,))
-    
-    # Delete user
-    cursor.execute("DELETE FROM users WHERE id = ?", (user_id,))
-    
-    if cursor.rowcount == 0:
-        conn.close()
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail="User not found"
-        )
-    
-    conn.commit()
-    conn.close()
+    with db_connection() as conn:
+        cursor = conn.cursor()
+        
+        # Delete user's conversations and messages
+        cursor.execute("SELECT id FROM conversations WHERE user_id = ?", (user_id,))
+        conversations = cursor.fetchall()
+        for conv in conversations:
+            cursor.execute("DELETE FROM messages WHERE conversation_id = ?", (conv["id"],))
+        cursor.execute("DELETE FROM conversations WHERE user_id = ?", (user_id,))
+        
+        # Delete user
+        cursor.execute("DELETE FROM users WHERE id = ?", (user_id,))
+        
+        if cursor.rowcount == 0:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail="User not found"
+            )
+        
+        conn.commit()
     
     logger.info(f"User deleted: {user_id}")
     return None
@@ -99,26 +105,25 @@ async def get_stats(current_user: Dict = Depends(get_current_user)):
             detail="Only admins can view stats"
         )
     
-    conn = get_db()
-    cursor = conn.cursor()
-    
-    # Count users
-    cursor.execute("SELECT COUNT(*) as count FROM users")
-    total_users = cursor.fetchone()["count"]
-    
-    # Count conversations
-    cursor.execute("SELECT COUNT(*) as count FROM conversations")
-    total_conversations = cursor.fetchone()["count"]
-    
-    # Count messages
-    cursor.execute("SELECT COUNT(*) as count FROM messages")
-    total_messages = cursor.fetchone()["count"]
-    
-    # Count platforms
-    cursor.execute("SELECT COUNT(*) as count FROM platforms")
-    total_platforms = cursor.fetchone()["count"]
-    
-    conn.close()
+    with db_connection() as conn:
+        cursor = conn.cursor()
+        
+        # Count users
+        cursor.execute("SELECT COUNT(*) as count FROM users")
+        total_users = cursor.fetchone()["count"]
+        
+        # Count conversations
+        cursor.execute("SELECT COUNT(*) as count FROM conversations")
+        total_conversations = cursor.fetchone()["count"]
+        
+        # Count messages
+        cursor.execute("SELECT COUNT(*) as count FROM messages")
+        total_messages = cursor.fetchone()["count"]
+        
+        # Count platforms
+        cursor.execute("SELECT COUNT(*) as count FROM platforms")
+        total_platforms = cursor.fetchone()["count"]
+        
     
     return {
         "total_users": total_users,
@@ -128,13 +133,20 @@ async def get_stats(current_user: Dict = Depends(get_current_user)):
     }
 
 @router.get("/platforms/", response_model=List[Platform])
-async def get_platforms(current_user: Dict = Depends(get_current_user)):
-    """Get all platforms (admin feature)"""
-    conn = get_db()
-    cursor = conn.cursor()
-    cursor.execute("SELECT * FROM platforms ORDER BY created_at DESC")
-    platforms = cursor.fetchall()
-    conn.close()
+async def get_platforms(
+    response: Response,
+    limit: Optional[int] = None,
+    cursor: Optional[str] = None,
+    current_user: Dict = Depends(get_current_user)
+):
+    """Get all platforms, newest first (admin feature); paged with `limit` + X-Next-Cursor"""
+    page = Page(cursor, limit, ("created_at", "id"), descending=True)
+    with db_connection() as conn:
+        platforms = conn.execute(
+            f"SELECT * FROM platforms{page.where_sql()} ORDER BY {page.order_by()}{page.limit_sql()}",
+            page.params()
+        ).fetchall()
+        platforms = page.finish(platforms, response)
     
     return [
         Platform(
@@ -159,19 +171,18 @@ async def create_platform(
             detail="Only admins can create platforms"
         )
     
-    conn = get_db()
-    cursor = conn.cursor()
-    
-    platform_id = str(uuid.uuid4())
-    created_at = datetime.utcnow().isoformat()
-    
-    cursor.execute("""
-        INSERT INTO platforms (id, name, url, status, created_at)
-        VALUES (?, ?, ?, ?, ?)
-    """, (platform_id, platform.name, platform.url, platform.status, created_at))
-    
-    conn.commit()
-    conn.close()
+    with db_connection() as conn:
+        cursor = conn.cursor()
+        
+        platform_id = str(uuid.uuid4())
+        created_at = datetime.utcnow().isoformat()
+        
+        cursor.execute("""
+            INSERT INTO platforms (id, name, url, status, created_at)
+            VALUES (?, ?, ?, ?, ?)
+        """, (platform_id, platform.name, platform.url, platform.status, created_at))
+        
+        conn.commit()
     
     logger.info(f"New platform created: {platform.name}")
     
@@ -195,19 +206,63 @@ async def delete_platform(
             detail="Only admins can delete platforms"
         )
     
-    conn = get_db()
-    cursor = conn.cursor()
-    cursor.execute("DELETE FROM platforms WHERE id = ?", (platform_id,))
+    with db_connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute("DELETE FROM platforms WHERE id = ?", (platform_id,))
+        
+        if cursor.rowcount == 0:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail="Platform not found"
+            )
+        
+        conn.commit()
     
-    if cursor.rowcount == 0:
-        conn.close()
+    logger.info(f"Platform deleted: {platform_id}")
+    return None
+
+@router.get("/admin/crawlers/status")
+async def get_crawler_status(current_user: Dict = Depends(get_current_user)):
+    """Circuit breaker, cache and pool status of the crawlers (admin only)"""
+    if not current_user["is_admin"]:
         raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail="Platform not found"
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Only admins can view crawler status"
         )
     
-    conn.commit()
-    conn.close()
+    try:
+        from Crawl_Data.run_all_crawlers import crawler_status
+    except Exception as e:
+        logger.error(f"Crawler status unavailable: {e}")
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Crawlers are not available"
+        )
     
-    logger.info(f"Platform deleted: {platform_id}")
-    return None
+    return crawler_status()
+
+
+@router.get("/admin/db-writer/status")
+async def get_db_writer_status(current_user: Dict = Depends(get_current_user)):
+    """Background DB writer queue depth, flush latency and throughput (admin only)"""
+    if not current_user["is_admin"]:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Only admins can view DB writer status"
+        )
+
+    from ..db_writer import db_writer_stats
+    return db_writer_stats()
+
+
+@router.get("/admin/db-pool/status")
+async def get_db_pool_status(current_user: Dict = Depends(get_current_user)):
+    """Connection pool usage and wait-time percentiles (admin only)"""
+    if not current_user["is_admin"]:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Only admins can view DB pool status"
+        )
+
+    from ..db_pool import db_pool_stats
+    return db_pool_stats()
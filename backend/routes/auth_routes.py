@@ -13,7 +13,8 @@ except ImportError:
     logging.basicConfig(level=logging.INFO)
     logger = logging.getLogger(__name__)
 
-from ..database import get_db, hash_password
+from ..database import hash_password
+from ..db_pool import db_connection
 from ..auth import verify_password, create_access_token, get_current_user
 from ..models import UserCreate, User, Token
 
@@ -24,11 +25,10 @@ async def login(form_data: OAuth2PasswordRequestForm = Depends()):
     """Login endpoint - returns JWT token"""
     try:
         logger.info(f"Login attempt for user: {form_data.username}")
-        conn = get_db()
-        cursor = conn.cursor()
-        cursor.execute("SELECT * FROM users WHERE username = ?", (form_data.username,))
-        user = cursor.fetchone()
-        conn.close()
+        with db_connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute("SELECT * FROM users WHERE username = ?", (form_data.username,))
+            user = cursor.fetchone()
         
         if not user:
             logger.warning(f"User not found: {form_data.username}")
@@ -63,41 +63,38 @@ async def login(form_data: OAuth2PasswordRequestForm = Depends()):
 @router.post("/users/", response_model=User, status_code=status.HTTP_201_CREATED)
 async def register_user(user: UserCreate):
     """Register a new user"""
-    conn = get_db()
-    cursor = conn.cursor()
-    
-    # Không cho phép đăng ký username "admin"
-    if user.username.lower() == "admin":
-        conn.close()
-        raise HTTPException(
-            status_code=status.HTTP_400_BAD_REQUEST,
-            detail="Không thể đăng ký với username 'admin'. Tài khoản admin đã được tạo sẵn."
-        )
-    
-    # Check if username or email already exists
-    cursor.execute("SELECT * FROM users WHERE username = ? OR email = ?", 
-                   (user.username, user.email))
-    existing_user = cursor.fetchone()
-    
-    if existing_user:
-        conn.close()
-        raise HTTPException(
-            status_code=status.HTTP_400_BAD_REQUEST,
-            detail="Username hoặc email đã được đăng ký"
-        )
-    
-    # Create new user (always as regular user, not admin)
-    user_id = str(uuid.uuid4())
-    password_hash = hash_password(user.password)
-    created_at = datetime.utcnow().isoformat()
-    
-    cursor.execute("""
-        INSERT INTO users (id, username, email, password_hash, full_name, is_admin, created_at)
-        VALUES (?, ?, ?, ?, ?, ?, ?)
-    """, (user_id, user.username, user.email, password_hash, user.full_name, 0, created_at))
-    
-    conn.commit()
-    conn.close()
+    with db_connection() as conn:
+        cursor = conn.cursor()
+        
+        # Không cho phép đăng ký username "admin"
+        if user.username.lower() == "admin":
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="Không thể đăng ký với username 'admin'. Tài khoản admin đã được tạo sẵn."
+            )
+        
+        # Check if username or email already exists
+        cursor.execute("SELECT * FROM users WHERE username = ? OR email = ?", 
+                       (user.username, user.email))
+        existing_user = cursor.fetchone()
+        
+        if existing_user:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="Username hoặc email đã được đăng ký"
+            )
+        
+        # Create new user (always as regular user, not admin)
+        user_id = str(uuid.uuid4())
+        password_hash = hash_password(user.password)
+        created_at = datetime.utcnow().isoformat()
+        
+        cursor.execute("""
+            INSERT INTO users (id, username, email, password_hash, full_name, is_admin, created_at)
+            VALUES (?, ?, ?, ?, ?, ?, ?)
+        """, (user_id, user.username, user.email, password_hash, user.full_name, 0, created_at))
+        
+        conn.commit()
     
     logger.info(f"New user registered: {user.username}")
     
@@ -1,8 +1,8 @@
 """Conversation & Message routes - giữ nguyên từ main.py"""
 import uuid
 from datetime import datetime
-from fastapi import APIRouter, Depends, HTTPException, status
-from typing import Dict, List
+from fastapi import APIRouter, Depends, HTTPException, Response, status
+from typing import Dict, List, Optional
 
 try:
     from logger_config import get_logger
@@ -22,9 +22,10 @@ except ImportError as e:
     def process_user_query(query: str) -> str:
         return "Chatbot is not configured. Please check dependencies."
 
-from ..database import get_db
+from ..db_pool import db_connection
 from ..auth import get_current_user
 from ..models import ConversationCreate, Conversation, Message, ChatRequest, ChatResponse
+from ..pagination import Page
 
 router = APIRouter()
 
@@ -34,19 +35,18 @@ async def create_conversation(
     current_user: Dict = Depends(get_current_user)
 ):
     """Create a new conversation"""
-    conn = get_db()
-    cursor = conn.cursor()
-    
-    conversation_id = str(uuid.uuid4())
-    created_at = datetime.utcnow().isoformat()
-    
-    cursor.execute("""
-        INSERT INTO conversations (id, user_id, title, created_at, updated_at)
-        VALUES (?, ?, ?, ?, ?)
-    """, (conversation_id, current_user["id"], conversation.title, created_at, created_at))
-    
-    conn.commit()
-    conn.close()
+    with db_connection() as conn:
+        cursor = conn.cursor()
+        
+        conversation_id = str(uuid.uuid4())
+        created_at = datetime.utcnow().isoformat()
+        
+        cursor.execute("""
+            INSERT INTO conversations (id, user_id, title, created_at, updated_at)
+            VALUES (?, ?, ?, ?, ?)
+        """, (conversation_id, current_user["id"], conversation.title, created_at, created_at))
+        
+        conn.commit()
     
     logger.info(f"New conversation created: {conversation_id} by user {current_user['username']}")
     
@@ -59,17 +59,25 @@ async def create_conversation(
     )
 
 @router.get("/conversations/", response_model=List[Conversation])
-async def get_conversations(current_user: Dict = Depends(get_current_user)):
-    """Get all conversations for current user"""
-    conn = get_db()
-    cursor = conn.cursor()
-    cursor.execute("""
-        SELECT * FROM conversations 
-        WHERE user_id = ? 
-        ORDER BY updated_at DESC
-    """, (current_user["id"],))
-    conversations = cursor.fetchall()
-    conn.close()
+async def get_conversations(
+    response: Response,
+    limit: Optional[int] = None,
+    cursor: Optional[str] = None,
+    current_user: Dict = Depends(get_current_user)
+):
+    """Get conversations for current user, most recently updated first.
+
+    Without `limit` all conversations are returned; with it, the X-Next-Cursor
+    header carries the `cursor` for the next page.
+    """
+    page = Page(cursor, limit, ("updated_at", "id"), descending=True)
+    with db_connection() as conn:
+        conversations = conn.execute(f"""
+            SELECT * FROM conversations 
+            WHERE user_id = ?{page.and_where()}
+            ORDER BY {page.order_by()}{page.limit_sql()}
+        """, [current_user["id"], *page.params()]).fetchall()
+        conversations = page.finish(conversations, response)
     
     return [
         Conversation(
@@ -88,14 +96,13 @@ async def get_conversation(
     current_user: Dict = Depends(get_current_user)
 ):
     """Get a specific conversation"""
-    conn = get_db()
-    cursor = conn.cursor()
-    cursor.execute("""
-        SELECT * FROM conversations 
-        WHERE id = ? AND user_id = ?
-    """, (conversation_id, current_user["id"]))
-    conversation = cursor.fetchone()
-    conn.close()
+    with db_connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute("""
+            SELECT * FROM conversations 
+            WHERE id = ? AND user_id = ?
+        """, (conversation_id, current_user["id"]))
+        conversation = cursor.fetchone()
     
     if not conversation:
         raise HTTPException(
@@ -117,31 +124,29 @@ async def delete_conversation(
     current_user: Dict = Depends(get_current_user)
 ):
     """Delete a conversation"""
-    conn = get_db()
-    cursor = conn.cursor()
-    
-    # Check if conversation exists and belongs to user
-    cursor.execute("""
-        SELECT * FROM conversations 
-        WHERE id = ? AND user_id = ?
-    """, (conversation_id, current_user["id"]))
-    conversation = cursor.fetchone()
-    
-    if not conversation:
-        conn.close()
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail="Conversation not found"
-        )
-    
-    # Delete messages first
-    cursor.execute("DELETE FROM messages WHERE conversation_id = ?", (conversation_id,))
-    
-    # Delete conversation
-    cursor.execute("DELETE FROM conversations WHERE id = ?", (conversation_id,))
-    
-    conn.commit()
-    conn.close()
+    with db_connection() as conn:
+        cursor = conn.cursor()
+        
+        # Check if conversation exists and belongs to user
+        cursor.execute("""
+            SELECT * FROM conversations 
+            WHERE id = ? AND user_id = ?
+        """, (conversation_id, current_user["id"]))
+        conversation = cursor.fetchone()
+        
+        if not conversation:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail="Conversation not found"
+            )
+        
+        # Delete messages first
+        cursor.execute("DELETE FROM messages WHERE conversation_id = ?", (conversation_id,))
+        
+        # Delete conversation
+        cursor.execute("DELETE FROM conversations WHERE id = ?", (conversation_id,))
+        
+        conn.commit()
     
     logger.info(f"Conversation deleted: {conversation_id}")
     return None
@@ -149,34 +154,39 @@ async def delete_conversation(
 @router.get("/conversations/{conversation_id}/messages", response_model=List[Message])
 async def get_messages(
     conversation_id: str,
+    response: Response,
+    limit: Optional[int] = None,
+    cursor: Optional[str] = None,
+    newest_first: bool = False,
     current_user: Dict = Depends(get_current_user)
 ):
-    """Get all messages in a conversation"""
-    conn = get_db()
-    cursor = conn.cursor()
-    
-    # Verify conversation belongs to user
-    cursor.execute("""
-        SELECT * FROM conversations 
-        WHERE id = ? AND user_id = ?
-    """, (conversation_id, current_user["id"]))
-    conversation = cursor.fetchone()
-    
-    if not conversation:
-        conn.close()
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail="Conversation not found"
-        )
-    
-    # Get messages
-    cursor.execute("""
-        SELECT * FROM messages 
-        WHERE conversation_id = ? 
-        ORDER BY created_at ASC
-    """, (conversation_id,))
-    messages = cursor.fetchall()
-    conn.close()
+    """Get messages in a conversation, oldest first (or newest first).
+
+    Without `limit` the whole history is returned; with it, the X-Next-Cursor
+    header carries the `cursor` for the next page. A chat view can load the
+    latest page with `newest_first=true&limit=N` and page back from there.
+    """
+    page = Page(cursor, limit, ("created_at", "id"), descending=newest_first)
+    with db_connection() as conn:
+        # Verify conversation belongs to user
+        conversation = conn.execute("""
+            SELECT * FROM conversations 
+            WHERE id = ? AND user_id = ?
+        """, (conversation_id, current_user["id"])).fetchone()
+        
+        if not conversation:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail="Conversation not found"
+            )
+        
+        # Get messages
+        messages = conn.execute(f"""
+            SELECT * FROM messages 
+            WHERE conversation_id = ?{page.and_where()}
+            ORDER BY {page.order_by()}{page.limit_sql()}
+        """, [conversation_id, *page.params()]).fetchall()
+        messages = page.finish(messages, response)
     
     return [
         Message(
@@ -196,33 +206,35 @@ async def chat(
     current_user: Dict = Depends(get_current_user)
 ):
     """Send a message and get AI response"""
-    conn = get_db()
-    cursor = conn.cursor()
-    
-    # Verify conversation belongs to user
-    cursor.execute("""
-        SELECT * FROM conversations 
-        WHERE id = ? AND user_id = ?
-    """, (conversation_id, current_user["id"]))
-    conversation = cursor.fetchone()
-    
-    if not conversation:
-        conn.close()
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail="Conversation not found"
-        )
-    
-    # Save user message
-    user_message_id = str(uuid.uuid4())
-    created_at = datetime.utcnow().isoformat()
-    
-    cursor.execute("""
-        INSERT INTO messages (id, conversation_id, role, content, created_at)
-        VALUES (?, ?, ?, ?, ?)
-    """, (user_message_id, conversation_id, "user", chat_request.message, created_at))
+    with db_connection() as conn:
+        cursor = conn.cursor()
+        
+        # Verify conversation belongs to user
+        cursor.execute("""
+            SELECT * FROM conversations 
+            WHERE id = ? AND user_id = ?
+        """, (conversation_id, current_user["id"]))
+        conversation = cursor.fetchone()
+        
+        if not conversation:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail="Conversation not found"
+            )
+        
+        # Save user message
+        user_message_id = str(uuid.uuid4())
+        created_at = datetime.utcnow().isoformat()
+        
+        cursor.execute("""
+            INSERT INTO messages (id, conversation_id, role, content, created_at)
+            VALUES (?, ?, ?, ?, ?)
+        """, (user_message_id, conversation_id, "user", chat_request.message, created_at))
+        
+        conn.commit()
     
-    # Get AI response using chatbot
+    # Get AI response using chatbot (outside the DB block: the LLM call can take
+    # seconds and must not hold a pooled connection or the write lock)
     try:
         ai_response = process_user_query(chat_request.message)
     except Exception as e:
@@ -237,24 +249,26 @@ async def chat(
             logger.error("Error processing query and failed to log exception details.", exc_info=True)
         ai_response = "Xin lỗi, đã có lỗi xảy ra khi xử lý yêu cầu của bạn."
     
-    # Save AI response
-    assistant_message_id = str(uuid.uuid4())
-    assistant_created_at = datetime.utcnow().isoformat()
-    
-    cursor.execute("""
-        INSERT INTO messages (id, conversation_id, role, content, created_at)
-        VALUES (?, ?, ?, ?, ?)
-    """, (assistant_message_id, conversation_id, "assistant", ai_response, assistant_created_at))
-    
-    # Update conversation updated_at
-    cursor.execute("""
-        UPDATE conversations 
-        SET updated_at = ? 
-        WHERE id = ?
-    """, (assistant_created_at, conversation_id))
-    
-    conn.commit()
-    conn.close()
+    with db_connection() as conn:
+        cursor = conn.cursor()
+        
+        # Save AI response
+        assistant_message_id = str(uuid.uuid4())
+        assistant_created_at = datetime.utcnow().isoformat()
+        
+        cursor.execute("""
+            INSERT INTO messages (id, conversation_id, role, content, created_at)
+            VALUES (?, ?, ?, ?, ?)
+        """, (assistant_message_id, conversation_id, "assistant", ai_response, assistant_created_at))
+        
+        # Update conversation updated_at
+        cursor.execute("""
+            UPDATE conversations 
+            SET updated_at = ? 
+            WHERE id = ?
+        """, (assistant_created_at, conversation_id))
+        
+        conn.commit()
     
     logger.info(f"Chat message processed in conversation {conversation_id}")
     
@@ -1,16 +1,21 @@
 """Product routes - expose products stored in the SQLite DB
 
 Endpoints:
-- GET /products/        -> list products, optional q (search), limit, offset
+- GET /products/        -> list products, optional q (full-text search), limit, cursor
+- GET /products/groups  -> same product across platforms with per-platform offers
 - GET /products/{id}    -> get single product by id
 
+List endpoints return the next page's cursor in the X-Next-Cursor header
+(backend/pagination.py); `offset` still works for older clients.
+
 These are intentionally public (no auth) so the frontend can query persisted
-crawl results. Keep implementations simple and use the existing `get_db()`
+crawl results. Keep implementations simple and use the pooled `db_connection()`
 helper and `Product` Pydantic model for responses.
 """
-from fastapi import APIRouter, Query, HTTPException
+from fastapi import APIRouter, Query, HTTPException, Response
 from typing import List, Optional
 import json
+import sqlite3
 
 try:
     from logger_config import get_logger
@@ -20,34 +25,50 @@ except ImportError:
     logging.basicConfig(level=logging.INFO)
     logger = logging.getLogger(__name__)
 
-from ..database import get_db
-from ..models import Product
+from ..db_pool import db_connection
+from ..search import build_match_query, search_products
+from ..pagination import Page, offset_page, set_offset_cursor
+from ..models import Product, ProductGroup, ProductOffer
 
 router = APIRouter(prefix="/products")
 
 
 @router.get("/", response_model=List[Product])
-async def list_products(q: Optional[str] = Query(None), limit: int = 50, offset: int = 0):
-    """List products stored in the database.
-
-    Optional query `q` performs a simple LIKE search against name and url.
+async def list_products(response: Response, q: Optional[str] = Query(None), limit: int = 50, offset: int = 0,
+                        cursor: Optional[str] = None):
+    """List products stored in the database, newest first.
+
+    Optional query `q` runs a BM25-ranked full-text search over product names
+    (diacritic-insensitive, last term as prefix); results carry a highlighted
+    `snippet`. Without FTS5, or for queries with no searchable terms, it falls
+    back to a LIKE search against name and url. Pass the X-Next-Cursor header
+    of a page back as `cursor` for the next one.
     """
-    conn = get_db()
-    cursor = conn.cursor()
-    try:
-        if q:
-            like = f"%{q}%"
-            cursor.execute(
-                "SELECT * FROM products WHERE name LIKE ? OR url LIKE ? ORDER BY created_at DESC LIMIT ? OFFSET ?",
-                (like, like, limit, offset)
-            )
-        else:
-            cursor.execute(
-                "SELECT * FROM products ORDER BY created_at DESC LIMIT ? OFFSET ?",
-                (limit, offset)
-            )
+    with db_connection() as conn:
+        rows = None
+        if q and build_match_query(q):
+            # ranked results have no stable seek key: the cursor carries the offset
+            start = offset_page(cursor, offset)
+            try:
+                rows = set_offset_cursor(response, start, limit, search_products(conn, q, limit + 1, start))
+            except sqlite3.OperationalError as e:
+                logger.warning("Full-text search failed, falling back to LIKE: %s", e)
+        if rows is None:
+            page = Page(cursor, limit, ("created_at", "id"), descending=True, offset=offset)
+            if q:
+                like = f"%{q}%"
+                rows = conn.execute(
+                    f"SELECT * FROM products WHERE (name LIKE ? OR url LIKE ?){page.and_where()} "
+                    f"ORDER BY {page.order_by()}{page.limit_sql()}",
+                    [like, like, *page.params()]
+                ).fetchall()
+            else:
+                rows = conn.execute(
+                    f"SELECT * FROM products{page.where_sql()} ORDER BY {page.order_by()}{page.limit_sql()}",
+                    page.params()
+                ).fetchall()
+            rows = page.finish(rows, response)
 
-        rows = cursor.fetchall()
         results = []
         for r in rows:
             # Safe column accessor (older DBs might lack some columns)
@@ -74,20 +95,60 @@ async def list_products(q: Optional[str] = Query(None), limit: int = 50, offset:
                 rating=safe_get("rating"),
                 review_count=safe_get("review_count"),
                 metadata=metadata,
-                created_at=safe_get("created_at") or ""
+                created_at=safe_get("created_at") or "",
+                snippet=safe_get("snippet"),
+                score=safe_get("score")
             ))
 
         return results
-    finally:
-        conn.close()
+
+
+@router.get("/groups", response_model=List[ProductGroup])
+async def list_product_groups(response: Response, q: Optional[str] = Query(None), limit: int = 50,
+                              offset: int = 0, cursor: Optional[str] = None):
+    """List product groups, most offers first (cheapest first within each group's offers).
+
+    Optional query `q` performs a LIKE search against the group name and model.
+    Declared before /{product_id} so "groups" isn't taken as a product id.
+    """
+    page = Page(cursor, limit, ("offer_count", "updated_at", "id"), descending=True, offset=offset)
+    with db_connection() as conn:
+        db_cursor = conn.cursor()
+        if q:
+            like = f"%{q}%"
+            db_cursor.execute(
+                f"SELECT * FROM product_groups WHERE (name LIKE ? OR model LIKE ?){page.and_where()} "
+                f"ORDER BY {page.order_by()}{page.limit_sql()}",
+                [like, like, *page.params()]
+            )
+        else:
+            db_cursor.execute(
+                f"SELECT * FROM product_groups{page.where_sql()} ORDER BY {page.order_by()}{page.limit_sql()}",
+                page.params()
+            )
+        groups = [dict(r) for r in page.finish(db_cursor.fetchall(), response)]
+        if not groups:
+            return []
+
+        placeholders = ",".join("?" for _ in groups)
+        db_cursor.execute(
+            f"SELECT * FROM product_group_offers WHERE group_id IN ({placeholders}) "
+            "ORDER BY price IS NULL OR price <= 0, price",
+            [g["id"] for g in groups]
+        )
+        offers = {}
+        for r in db_cursor.fetchall():
+            offer = dict(r)
+            offers.setdefault(offer.pop("group_id"), []).append(ProductOffer(**offer))
+
+        return [ProductGroup(**g, offers=offers.get(g["id"], [])) for g in groups]
 
 
 @router.get("/{product_id}", response_model=Product)
 async def get_product(product_id: str):
     """Return a single product by ID."""
-    conn = get_db()
-    cursor = conn.cursor()
-    try:
+    with db_connection() as conn:
+        cursor = conn.cursor()
         cursor.execute("SELECT * FROM products WHERE id = ?", (product_id,))
         r = cursor.fetchone()
         if not r:
@@ -117,5 +178,3 @@ async def get_product(product_id: str):
             metadata=metadata,
             created_at=safe_get("created_at") or ""
         )
-    finally:
-        conn.close()
@@ -0,0 +1,187 @@
+"""Full-text product search (SQLite FTS5).
+
+Each product row stores its normalized search tokens in `products.search_tokens`
+(`search_tokens`): lower-cased, Vietnamese diacritics folded ("Điện thoại" ->
+"dien thoai", which the unicode61 tokenizer alone does not do for "đ") and
+letter/digit runs split ("256GB" -> "256gb 256 gb"), so "dien thoai 256 gb"
+finds "Điện thoại ... 256GB". The column is filled in by whoever writes the
+product (DB writer, `save_products`); `products_fts` is an external-content
+index over it, kept in sync by plain-SQL triggers, so any client (the sqlite3
+CLI, a one-off script) can still write to `products`. Rows written without
+tokens are not searchable until `ensure_fts_schema` backfills them on the next
+start.
+
+Results are ranked by BM25 inside the FTS table (only the requested page is
+joined back to `products`) and carry an HTML-safe snippet of the name with the
+matched words wrapped in <mark>.
+
+Usage:
+    from backend.search import search_products
+    with db_connection() as conn:
+        rows = search_products(conn, "iphone 15 pro", limit=20)
+"""
+import html
+import re
+import sqlite3
+import unicodedata
+from typing import Dict, List, Optional
+
+_WORD_RE = re.compile(r"[0-9a-z]+")
+_ALNUM_SPLIT_RE = re.compile(r"[0-9]+|[a-z]+")
+_NAME_WORD_RE = re.compile(r"\w+")
+PREFIX_MIN_CHARS = 2
+
+FTS_TRIGGERS = ("products_fts_insert", "products_fts_delete", "products_fts_update")
+
+FTS_SCHEMA = [
+    """
+    CREATE VIRTUAL TABLE IF NOT EXISTS products_fts USING fts5(
+        search_tokens, content = 'products', tokenize = 'unicode61 remove_diacritics 2'
+    )
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS products_fts_insert AFTER INSERT ON products BEGIN
+        INSERT INTO products_fts (rowid, search_tokens) VALUES (new.rowid, new.search_tokens);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS products_fts_delete AFTER DELETE ON products BEGIN
+        INSERT INTO products_fts (products_fts, rowid, search_tokens) VALUES ('delete', old.rowid, old.search_tokens);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS products_fts_update AFTER UPDATE OF search_tokens ON products BEGIN
+        INSERT INTO products_fts (products_fts, rowid, search_tokens) VALUES ('delete', old.rowid, old.search_tokens);
+        INSERT INTO products_fts (rowid, search_tokens) VALUES (new.rowid, new.search_tokens);
+    END
+    """,
+]
+
+# rank and page inside the FTS table first, so only `limit` rows are joined
+SEARCH_SQL = """
+    SELECT p.*, hits.score AS score
+    FROM (
+        SELECT rowid, bm25(products_fts) AS score
+        FROM products_fts
+        WHERE products_fts MATCH ?
+        ORDER BY score
+        LIMIT ? OFFSET ?
+    ) AS hits
+    JOIN products p ON p.rowid = hits.rowid
+    ORDER BY hits.score
+"""
+
+
+def fold_text(text: Optional[str]) -> str:
+    """Lower-case and strip Vietnamese diacritics ("Điện Thoại" -> "dien thoai")."""
+    if not text:
+        return ""
+    text = text.lower().replace("đ", "d")
+    decomposed = unicodedata.normalize("NFD", text)
+    return "".join(ch for ch in decomposed if not unicodedata.combining(ch))
+
+
+def search_tokens(name: Optional[str]) -> str:
+    """Normalized tokens indexed for a product name (stored in `products.search_tokens`)."""
+    words = _WORD_RE.findall(fold_text(name))
+    tokens = list(words)
+    for word in words:
+        parts = _ALNUM_SPLIT_RE.findall(word)
+        if len(parts) > 1:
+            tokens.extend(parts)
+    return " ".join(tokens)
+
+
+def query_terms(q: Optional[str]) -> List[str]:
+    """Folded, letter/digit-split terms of a user query ("iPhone15 256GB" -> iphone, 15, 256, gb)."""
+    terms = []
+    for word in _WORD_RE.findall(fold_text(q)):
+        terms.extend(_ALNUM_SPLIT_RE.findall(word))
+    return terms
+
+
+def build_match_query(q: Optional[str]) -> Optional[str]:
+    """FTS5 MATCH expression for a user query: every term must match, the last one as a prefix.
+
+    Terms are quoted, so user input can't inject FTS5 syntax. Returns None when
+    the query has no searchable terms.
+    """
+    terms = query_terms(q)
+    if not terms:
+        return None
+    quoted = [f'"{term}"' for term in terms]
+    # search-as-you-type: "iph" should already find "iphone"; a one-character
+    # prefix ("type c*") would expand to most of the vocabulary
+    if len(terms[-1]) >= PREFIX_MIN_CHARS:
+        quoted[-1] += "*"
+    return " ".join(quoted)
+
+
+def highlight(name: Optional[str], terms: List[str]) -> Optional[str]:
+    """HTML-escaped `name` with the words matching `terms` (last one as prefix) wrapped in <mark>."""
+    if name is None:
+        return None
+    if not terms:
+        return html.escape(name)
+    exact, prefix = set(terms), terms[-1] if len(terms[-1]) >= PREFIX_MIN_CHARS else None
+
+    def matches(part: str) -> bool:
+        return part in exact or (prefix is not None and part.startswith(prefix))
+
+    out = []
+    last = 0
+    for m in _NAME_WORD_RE.finditer(name):
+        folded = fold_text(m.group())
+        # "256GB" matches 256 + gb, but "12GB" must not light up just for "gb"
+        if matches(folded) or all(matches(part) for part in _ALNUM_SPLIT_RE.findall(folded) or [folded]):
+            out.append(html.escape(name[last:m.start()]))
+            out.append("<mark>" + html.escape(m.group()) + "</mark>")
+            last = m.end()
+    out.append(html.escape(name[last:]))
+    return "".join(out)
+
+
+def ensure_fts_schema(conn: sqlite3.Connection) -> bool:
+    """Create the search_tokens column, FTS table and triggers; fill in missing tokens.
+
+    Databases from before the external-content index (triggers calling a Python
+    `search_tokens()` function) are migrated. Returns True when the index was
+    (re)built.
+    """
+    columns = [row[1] for row in conn.execute("PRAGMA table_info(products)")]
+    if "search_tokens" not in columns:
+        conn.execute("ALTER TABLE products ADD COLUMN search_tokens TEXT")
+    fts = conn.execute("SELECT sql FROM sqlite_master WHERE type = 'table' AND name = 'products_fts'").fetchone()
+    if fts is not None and "content" not in fts[0]:
+        for trigger in FTS_TRIGGERS:
+            conn.execute(f"DROP TRIGGER IF EXISTS {trigger}")
+        conn.execute("DROP TABLE products_fts")
+        fts = None
+
+    # rows written without tokens (older rows, other clients); with the index in
+    # place the update trigger indexes them as they are filled in
+    missing = conn.execute("SELECT rowid, name FROM products WHERE search_tokens IS NULL").fetchall()
+    if missing:
+        conn.executemany("UPDATE products SET search_tokens = ? WHERE rowid = ?",
+                         [(search_tokens(row[1]), row[0]) for row in missing])
+
+    for statement in FTS_SCHEMA:
+        conn.execute(statement)
+    if fts is not None:
+        return False
+    conn.execute("INSERT INTO products_fts (products_fts) VALUES ('rebuild')")
+    return True
+
+
+def search_products(conn: sqlite3.Connection, q: str, limit: int = 50, offset: int = 0) -> List[Dict]:
+    """BM25-ranked products matching `q`: product columns plus `snippet` and `score` (lower is better)."""
+    match = build_match_query(q)
+    if match is None:
+        return []
+    terms = query_terms(q)
+    results = []
+    for row in conn.execute(SEARCH_SQL, (match, limit, offset)):
+        product = dict(row)
+        product["snippet"] = highlight(product.get("name"), terms)
+        results.append(product)
+    return results
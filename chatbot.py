@@ -10,16 +10,63 @@ from tool import (
 import sys
 import os
 sys.path.append(os.path.join(os.path.dirname(__file__), 'Crawl_Data'))
-from Crawl_Data.run_all_crawlers import crawl_all_platforms
+from Crawl_Data.run_all_crawlers import crawl_all_platforms_partial
+from Crawl_Data.product_matching import match_products
 
 import json
+import threading
 from datetime import datetime
 from langchain_core.documents import Document
 load_dotenv()
 logger = get_logger(__name__)
 products_vector_db = get_vector_db()
 chat_model = get_chat_model()
-from backend.database import save_products
+from backend.database import save_products, save_product_groups
+
+
+def _add_products_to_vector_db(products):
+    """Add crawled product dicts to the vector database as Documents"""
+    # Convert products to Document objects
+    documents = []
+    for product in products:
+        # Convert product dict to string for embedding
+        product_text = json.dumps(product, ensure_ascii=False)
+
+        # Create Document object with metadata
+        doc = Document(
+            page_content=product_text,
+            metadata={
+                "name": product["name"],
+                "price": product["price"],
+                "url": product["url"],
+                "rating": product["rating"],
+                "review_count": product["review_count"],
+                "timestamp": product["timestamp"]
+            }
+        )
+        documents.append(doc)
+
+    # Add documents to vector store
+    products_vector_db.add_documents(documents)
+
+
+def _merge_late_results(product_name, late_results):
+    """Persist platforms that finished after the early price comparison was answered"""
+    for event in late_results:
+        products = event.get("products") or []
+        if not products:
+            continue
+        try:
+            # background thread: wait for the commit so the log reports rows actually written
+            saved_count = save_products(products, timeout=30)
+            # matched against the stored groups, so late offers join the groups saved earlier
+            save_product_groups(match_products(products))
+            _add_products_to_vector_db(products)
+            logger.info(f"Merged {saved_count} late products from {event.get('crawler')} for '{product_name}'.")
+        except Exception as e:
+            logger.error(f"Error merging late products from {event.get('crawler')}: {e}")
+
+
 def process_user_query(user_query: str) -> str:
     logger.info(f"User query: {user_query}")
     try:
@@ -69,8 +116,15 @@ def process_user_query(user_query: str) -> str:
         # If no relevant results found in vector database, crawl from all platforms
         if "tôi sẽ tìm kiếm" in search_result.lower():
             logger.info(f"Search result: {search_result}")
-            # Crawl từ tất cả platforms thay vì chỉ Tiki
-            all_products = crawl_all_platforms(product_name, limit=None)
+            # Crawl từ tất cả platforms; trả lời ngay khi đủ quorum/deadline,
+            # các platform chậm hơn được gộp vào DB ở nền
+            all_products, late_results = crawl_all_platforms_partial(product_name)
+            threading.Thread(
+                target=_merge_late_results,
+                args=(product_name, late_results),
+                name="merge-late-crawl-results",
+                daemon=True
+            ).start()
 
             # Persist crawled products to SQL database for long-term storage
             try:
@@ -79,9 +133,17 @@ def process_user_query(user_query: str) -> str:
             except Exception as e:
                 logger.error(f"Error saving crawled products to SQL DB: {e}")
 
+            # Group the same product across platforms so the LLM compares offers per product
+            product_groups = match_products(all_products)
+            try:
+                saved_groups = save_product_groups(product_groups)
+                logger.info(f"Persisted {saved_groups} product groups from {len(all_products)} products.")
+            except Exception as e:
+                logger.error(f"Error saving product groups to SQL DB: {e}")
+
             if all_products:
                 # Start price comparison immediately with crawled data
-                context_data = json.dumps(all_products, ensure_ascii=False)
+                context_data = json.dumps(product_groups, ensure_ascii=False)
                 try:
                     comparison_result = _call_chain(price_comparison_chain, {
                         "context": context_data,
@@ -95,29 +157,7 @@ def process_user_query(user_query: str) -> str:
                 
                 # Add new products to vector database
                 try:
-                    # Convert products to Document objects
-                    documents = []
-                    for product in all_products:
-                        # Convert product dict to string for embedding
-                        product_text = json.dumps(product, ensure_ascii=False)
-                        
-                        # Create Document object with metadata
-                        doc = Document(
-                            page_content=product_text,
-                            metadata={
-                                "name": product["name"],
-                                "price": product["price"],
-                                "url": product["url"],
-                                "rating": product["rating"],
-                                "review_count": product["review_count"],
-                                "timestamp": product["timestamp"]
-                            }
-                        )
-                        documents.append(doc)
-
-                    
-                    # Add documents to vector store
-                    products_vector_db.add_documents(documents)
+                    _add_products_to_vector_db(all_products)
                     logger.info("Updated vector database with new products.")
                 except Exception as e:
                     logger.error(f"Error updating vector database: {str(e)}")
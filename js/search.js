@@ -81,6 +81,8 @@ document.addEventListener('DOMContentLoaded', async () => {
         products.forEach(product => {
              // Validate data (optional but recommended)
              const name = product.name || '';
+             // Full-text search trả về snippet (đã escape HTML) với từ khớp bọc trong <mark>
+             const title = product.snippet || name;
              const price = typeof product.price === 'number' ? product.price.toLocaleString('vi-VN') + ' ₫' : (product.price || 'N/A');
              // vendor field intentionally ignored — don't display logo/caption to keep UI clean
              const link = product.url || product.link || '#';
@@ -91,7 +93,7 @@ document.addEventListener('DOMContentLoaded', async () => {
              resultsGrid.innerHTML += `
                 <div class="st-container" style="padding: 12px; box-sizing: border-box;">
                     ${bestDeal ? '<span style="color: green; font-weight: bold; display: block; margin-bottom: 5px;">⭐ Rẻ nhất!</span>' : ''}
-                    <h4 style="margin: 8px 0 6px 0;">${name}</h4>
+                    <h4 style="margin: 8px 0 6px 0;">${title}</h4>
                     <!-- vendor/logo intentionally omitted -->
                     <p style="font-size: 1.25rem; font-weight: bold; color: var(--primary-color); margin: 6px 0 12px 0;">
                         ${price}
@@ -2,7 +2,9 @@
 Sophie Chatbot API - Main Entry Point
 File main.py đã được tách nhỏ thành các module trong thư mục backend/
 """
-from fastapi import FastAPI
+import os
+import sys
+from fastapi import FastAPI, Response
 from typing import Optional
 from fastapi.middleware.cors import CORSMiddleware
 from datetime import datetime
@@ -33,6 +35,8 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    # next-page cursor of the list endpoints (backend/pagination.py)
+    expose_headers=["X-Next-Cursor"],
 )
 
 # Initialize database on startup
@@ -40,8 +44,41 @@ app.add_middleware(
 async def startup_event():
     """Initialize database on startup"""
     init_database()
+    # Open pooled connections now so the first requests don't pay for connect + schema load
+    from backend.db_pool import warm_up_db_pool
+    warm_up_db_pool()
+    # Start the background DB writer now rather than on the first crawl, so batches
+    # spilled by a previous (crashed) process are replayed right away
+    from backend.db_writer import start_db_writer
+    start_db_writer()
+    # Pre-warm browser pool cho crawler (chạy nền, không chặn startup)
+    try:
+        # run_all_crawlers dùng import trực tiếp (from crawler_registry import ...)
+        # nên Crawl_Data phải có trong sys.path, giống chatbot.py
+        crawl_data_dir = os.path.join(os.path.dirname(__file__), 'Crawl_Data')
+        if crawl_data_dir not in sys.path:
+            sys.path.append(crawl_data_dir)
+        from Crawl_Data.run_all_crawlers import warm_up_crawlers
+        warm_up_crawlers()
+    except Exception as e:
+        logger.warning("Crawler warm-up skipped: %s", e)
     logger.info("FastAPI application started")
 
+
+@app.on_event("shutdown")
+async def shutdown_event():
+    """Drain buffered DB writes and close pooled connections before the process exits"""
+    import asyncio
+    from backend.config import DB_WRITER_SHUTDOWN_TIMEOUT
+    from backend.db_writer import db_writer_stats, stop_db_writer
+    drained = await asyncio.to_thread(stop_db_writer, DB_WRITER_SHUTDOWN_TIMEOUT)
+    if drained:
+        logger.info("DB writer drained on shutdown")
+    else:
+        logger.warning("DB writer not drained within %.0fs on shutdown: %s", DB_WRITER_SHUTDOWN_TIMEOUT, db_writer_stats())
+    from backend.db_pool import close_db_pool
+    close_db_pool()
+
 # Register routers
 app.include_router(auth_routes.router, tags=["Authentication"])
 app.include_router(conversation_routes.router, tags=["Conversations"])
@@ -71,13 +108,15 @@ async def health_check():
 
 # Compatibility search endpoint used by the frontend (/search?q=...)
 @app.get("/search")
-async def search_products(q: Optional[str] = None, limit: int = 50, offset: int = 0):
+async def search_products(response: Response, q: Optional[str] = None, limit: int = 50, offset: int = 0,
+                          cursor: Optional[str] = None):
     """Simple proxy endpoint that returns products from the DB.
 
-    This calls into the products router handler so frontend code that
-    requests `/search?q=...` keeps working.
+    This calls into the products router handler (BM25-ranked full-text
+    search with highlighted snippets) so frontend code that requests
+    `/search?q=...` keeps working.
     """
-    return await product_routes.list_products(q=q, limit=limit, offset=offset)
+    return await product_routes.list_products(response, q=q, limit=limit, offset=offset, cursor=cursor)
 
 # Run server
 if __name__ == "__main__":